@@ -0,0 +1,90 @@
+"""
+Generates synthetic queries of a controlled size and shape for benchmarks.
+
+Queries select from columns c0, c1, ... of tables T0, T1, ..., and filter on
+a balanced tree of AND/OR predicates over the same columns:
+
+    select c0, c1 from T0 where (c0 = 3 or c1 in (1, 2)) and (c0 like "a%" or ...)
+"""
+import random
+from collections import namedtuple
+
+QueryShape = namedtuple('QueryShape', [
+    'columns',         # number of selected columns
+    'tables',          # number of tables in FROM (builders only support 1)
+    'where_depth',     # depth of the AND/OR tree in WHERE (0: a single predicate, None: no WHERE)
+    'in_list_length',  # number of values in IN lists (0: no IN predicates)
+    'like_ratio',      # fraction of predicates that are LIKE
+    'between_ratio',   # fraction of predicates that are BETWEEN
+])
+
+DEFAULT_SHAPE = QueryShape(
+    columns=4,
+    tables=1,
+    where_depth=2,
+    in_list_length=5,
+    like_ratio=0.25,
+    between_ratio=0.25)
+
+COMPARISON_OPERATORS = ['=', '!=', '<', '<=', '>', '>=']
+LOGICAL_OPERATORS = ['and', 'or']
+
+
+def column_names(shape):
+    return ['c%d' % i for i in range(shape.columns)]
+
+
+def table_names(shape):
+    return ['T%d' % i for i in range(shape.tables)]
+
+
+def _predicate(shape, rng):
+    column = rng.choice(column_names(shape))
+    r = rng.random()
+
+    if r < shape.like_ratio:
+        return '{} like "{}%"'.format(column, rng.choice('abcdefgh') * rng.randint(1, 3))
+
+    r -= shape.like_ratio
+    if r < shape.between_ratio:
+        begin = rng.randint(0, 1000)
+        return '{} between {} and {}'.format(column, begin, begin + rng.randint(1, 100))
+
+    if shape.in_list_length and rng.random() < 0.5:
+        values = ', '.join(str(rng.randint(0, 1000)) for _ in range(shape.in_list_length))
+        return '{} in ({})'.format(column, values)
+
+    return '{} {} {}'.format(column, rng.choice(COMPARISON_OPERATORS), rng.randint(0, 1000))
+
+
+def _where(shape, depth, rng):
+    if depth == 0:
+        return _predicate(shape, rng)
+
+    return '({} {} {})'.format(
+        _where(shape, depth - 1, rng),
+        rng.choice(LOGICAL_OPERATORS),
+        _where(shape, depth - 1, rng))
+
+
+def generate_query(shape=DEFAULT_SHAPE, rng=random):
+    """
+    Returns a random query string of :shape:, drawing from :rng:
+    """
+    query = 'select {} from {}'.format(
+        ', '.join(column_names(shape)),
+        ', '.join(table_names(shape)))
+
+    if shape.where_depth is not None:
+        query += ' where ' + _where(shape, shape.where_depth, rng)
+
+    return query
+
+
+def generate_corpus(shape=DEFAULT_SHAPE, count=100, seed=0):
+    """
+    Returns :count: query strings of :shape:. The same seed always
+    generates the same corpus.
+    """
+    rng = random.Random(seed)
+    return [generate_query(shape, rng) for _ in range(count)]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Compares visitor method dispatch through the per-class dispatch tables with
+the old per-node 'visit_{}'.format(...) and getattr lookup, on a tree of
+about 10k nodes.
+
+Usage: python -m benchmarks.dispatch_benchmark [--terms N]
+"""
+import argparse
+import timeit
+
+import sqlparse
+from sqlparse.builders.mongo_builder import MongoQueryVisitor
+from sqlparse.nodevisitor import ASTVisitor, walk
+
+
+class LegacyDispatch(object):
+    """
+    Dispatches the way ASTVisitor used to, for comparison
+    """
+    def _dispatch(self, node):
+        method = 'visit_{}'.format(node.__class__.__name__)
+        return getattr(self, method, self.generic_visit)(node)
+
+
+class IdentityVisitor(ASTVisitor):
+    def visit_BinaryOperator(self, node):
+        return node
+
+    def visit_Identifier(self, node):
+        return node
+
+    def visit_IntegerValue(self, node):
+        return node
+
+
+class LegacyIdentityVisitor(LegacyDispatch, IdentityVisitor):
+    pass
+
+
+class LegacyMongoQueryVisitor(LegacyDispatch, MongoQueryVisitor):
+    pass
+
+
+def time_it(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--terms', type=int, default=2500,
+                        help='terms in the AND chain (each is 4 nodes)')
+    parser.add_argument('--number', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    query_string = 'select * from T where ' + ' and '.join('c%d = %d' % (i, i) for i in range(args.terms))
+    where = sqlparse.parse_string(query_string, backend='fast').where[0]
+    tree_nodes = list(walk(where))
+    print('{} nodes'.format(len(tree_nodes)))
+
+    print('{:<20} {:>12} {:>12} {:>9}'.format('', 'table (ms)', 'legacy (ms)', 'speedup'))
+
+    def report(name, table, legacy):
+        print('{:<20} {:>12.3f} {:>12.3f} {:>8.2f}x'.format(name, table * 1000, legacy * 1000, legacy / table))
+
+    # Dispatch alone: one lookup per node
+    visitor, legacy_visitor = IdentityVisitor(), LegacyIdentityVisitor()
+    report('dispatch only',
+           time_it(lambda: [visitor._dispatch(node) for node in tree_nodes], args.number),
+           time_it(lambda: [legacy_visitor._dispatch(node) for node in tree_nodes], args.number))
+
+    # Whole traversal, building a Mongo query
+    visitor, legacy_visitor = MongoQueryVisitor(), LegacyMongoQueryVisitor()
+    report('MongoQueryVisitor',
+           time_it(lambda: visitor.visit(where), args.number),
+           time_it(lambda: legacy_visitor.visit(where), args.number))
+
+
+if __name__ == '__main__':
+    main()
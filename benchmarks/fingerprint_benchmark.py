@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Measures how long sqlparse.fingerprint takes per query string, on its fast
+path (a template that's already in fingerprint_cache, so the query is only
+tokenized) and when every query is parsed (with the fast backend) and
+fingerprinted from its AST, against parsing alone.
+
+Usage: python -m benchmarks.fingerprint_benchmark [--count N] [--repeat N]
+"""
+import argparse
+import time
+
+import sqlparse
+
+from .corpus import generate_corpus
+
+
+def time_calls(func, query_strings, repeat):
+    """
+    Best time to call :func: on every one of :query_strings:, in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query_string in query_strings:
+            func(query_string)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    query_strings = generate_corpus(count=args.count)
+    sqlparse.fingerprint_cache.resize(max(args.count, sqlparse.fingerprint_cache.capacity))
+    templates = len(set(sqlparse.fingerprint(query_string).hash for query_string in query_strings))
+
+    modes = [
+        ('parse (fast)', lambda qs: sqlparse.parse_string(qs, backend='fast')),
+        ('parse + fingerprint', lambda qs: sqlparse.fingerprint(sqlparse.parse_string(qs, backend='fast'))),
+        ('fingerprint (cached)', sqlparse.fingerprint),
+    ]
+
+    print('{} queries, {} fingerprints'.format(args.count, templates))
+    print('{:<22} {:>14}'.format('', 'per query (us)'))
+    for name, func in modes:
+        elapsed = time_calls(func, query_strings, args.repeat)
+        print('{:<22} {:>14.1f}'.format(name, elapsed / args.count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
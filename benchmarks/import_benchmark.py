@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Measures how long `import sqlparse` takes in a fresh interpreter (with
+python -X importtime), and how long it takes to get to a first fast parse,
+the grammar, or each builder. Reports the median over several runs, and the slowest
+modules imported by `import sqlparse`.
+
+Usage: python -m benchmarks.import_benchmark [--runs N] [--top N]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+STATEMENTS = [
+    ('import sqlparse', 'import sqlparse'),
+    ('fast parse', 'import sqlparse; sqlparse.parse_string("select a from b", backend="fast")'),
+    ('grammar', 'import sqlparse.grammar'),
+    ('PythonPredicate', 'from sqlparse.builders import PythonPredicateBuilder'),
+    ('Mongo', 'from sqlparse.builders import MongoQueryBuilder'),
+    ('SqlAlchemy', 'from sqlparse.builders import SqlAlchemyQueryBuilder'),
+    ('all builders', 'from sqlparse.builders import *'),
+]
+
+
+def import_times(code):
+    """
+    Cumulative import time of each top level module imported by :code:, in
+    microseconds, by module name
+    """
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stderr=subprocess.PIPE, check=True, universal_newlines=True).stderr
+
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name[1:].rstrip()] = int(cumulative)  # keeps the indentation of nested imports
+    return times
+
+
+def total_time(times):
+    # Top level imports (not indented)
+    return sum(cumulative for name, cumulative in times.items() if not name.startswith(' '))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10, help='slowest modules to list')
+    args = parser.parse_args(argv)
+
+    print('{:<20} {:>12}'.format('', 'median (ms)'))
+    for name, code in STATEMENTS:
+        # Leave out the modules the interpreter imports at startup
+        baseline = statistics.median(total_time(import_times('pass')) for _ in range(args.runs))
+        median = statistics.median(total_time(import_times(code)) for _ in range(args.runs))
+        print('{:<20} {:>12.1f}'.format(name, (median - baseline) / 1000.0))
+
+    print('\nslowest modules imported by import sqlparse (cumulative ms):')
+    times = import_times('import sqlparse')
+    for name, cumulative in sorted(times.items(), key=lambda item: -item[1])[:args.top]:
+        print('{:>8.1f}  {}'.format(cumulative / 1000.0, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Measures the memory held by parsed queries that are kept resident, as
+returned by the pyparsing grammar, after sqlparse.detach, and as built by the
+fast backend.
+
+Usage: python -m benchmarks.memory_benchmark [--count N]
+"""
+import argparse
+import gc
+import tracemalloc
+
+import sqlparse
+
+
+def filter_query(i):
+    return ('select a, b, c from t{0} where a = {0} and (b in (1, 2, 3) or c like "x{0}%") '
+            'and not d between {0} and {1} and e is not null'.format(i, i + 10))
+
+
+def measure(parse, query_strings):
+    """
+    Returns the number of bytes still allocated after parsing all
+    :query_strings: with :parse: and keeping the results
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        retained = [parse(qs) for qs in query_strings]
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del retained
+    return size
+
+
+MODES = [
+    ('pyparsing', lambda qs: sqlparse.parse_string(qs)),
+    ('pyparsing + detach', lambda qs: sqlparse.parse_string(qs, detach=True)),
+    ('fast', lambda qs: sqlparse.parse_string(qs, backend='fast')),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    query_strings = [filter_query(i) for i in range(args.count)]
+
+    # Warm up, so that one-off allocations (caches, interned strings) aren't counted
+    for _, parse in MODES:
+        parse(query_strings[0])
+
+    print('{:<20} {:>12} {:>12}'.format('mode', 'total (KiB)', 'per query'))
+    for name, parse in MODES:
+        size = measure(parse, query_strings)
+        print('{:<20} {:>12.0f} {:>12.0f}'.format(name, size / 1024.0, size / float(args.count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Compares plain and packrat parsing of deeply nested AND/OR predicates.
+
+Usage: python -m benchmarks.packrat_benchmark [--max-depth N] [--max-plain-depth N]
+"""
+import argparse
+import sys
+import timeit
+
+import sqlparse
+from sqlparse import grammar
+
+
+def nested_query(depth):
+    """
+    select a from b where (c0 = 0 or d0 > 0) and (c1 = 1 or d1 > 1) and ...
+    """
+    predicates = ['(c{0} = {0} or d{0} > {0})'.format(i) for i in range(depth)]
+    return 'select a from b where ' + ' and '.join(predicates)
+
+
+def time_parse(query_string, repeat):
+    return min(timeit.repeat(lambda: sqlparse.parse_string(query_string), number=1, repeat=repeat))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-depth', type=int, default=32)
+    parser.add_argument('--max-plain-depth', type=int, default=6,
+                        help='plain parsing is exponential, so stop timing it past this depth')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    # Deep right-nested predicates recurse heavily inside pyparsing
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    print('{:>6} {:>12} {:>12} {:>9}'.format('depth', 'plain (s)', 'packrat (s)', 'speedup'))
+    depth = 1
+    while depth <= args.max_depth:
+        query_string = nested_query(depth)
+
+        plain = None
+        if depth <= args.max_plain_depth:
+            grammar.disable_packrat()
+            plain = time_parse(query_string, args.repeat)
+
+        grammar.enable_packrat()
+        packrat = time_parse(query_string, args.repeat)
+
+        print('{:>6} {:>12} {:>12.4f} {:>9}'.format(
+            depth,
+            '-' if plain is None else '{:.4f}'.format(plain),
+            packrat,
+            '-' if plain is None else '{:.1f}x'.format(plain / packrat)))
+
+        depth *= 2
+
+    grammar.disable_packrat()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Measures the throughput of predicates compiled by PythonPredicateBuilder
+over generated records, against a hand-written lambda implementing the
+same WHERE clause (with the same null handling), and of the same query
+built by NumpyQueryBuilder over the records as columns (if numpy is
+installed).
+
+Usage: python -m benchmarks.predicate_benchmark [--rows N]
+"""
+import argparse
+import random
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from sqlparse.builders import NumpyQueryBuilder, PythonPredicateBuilder
+
+QUERY = '''
+    select * from User where
+        age between 21 and 65 and
+        country in ("ca", "de", "fr", "uk", "us") and
+        not status = "banned" and
+        (name like "J%" or email like "%@example.com") and
+        deleted_at is null
+'''
+
+
+def handwritten(record):
+    age = record.get('age')
+    country = record.get('country')
+    status = record.get('status')
+    name = record.get('name')
+    email = record.get('email')
+    return (
+        age is not None and 21 <= age <= 65 and
+        country is not None and country in {'ca', 'de', 'fr', 'uk', 'us'} and
+        status is not None and status != 'banned' and
+        ((name is not None and name.startswith('J')) or
+         (email is not None and email.endswith('@example.com'))) and
+        record.get('deleted_at') is None)
+
+
+def generate_records(count, seed=0):
+    rnd = random.Random(seed)
+    names = ['Jane', 'John', 'Alice', 'Bob', None]
+    countries = ['ca', 'de', 'fr', 'uk', 'us', 'jp', 'br', None]
+    statuses = ['active', 'banned', 'pending']
+    domains = ['example.com', 'example.org']
+    return [
+        {
+            'age': rnd.choice([None, rnd.randint(10, 90)]),
+            'country': rnd.choice(countries),
+            'status': rnd.choice(statuses),
+            'name': rnd.choice(names),
+            'email': 'user%d@%s' % (i, rnd.choice(domains)),
+            'deleted_at': None if rnd.random() < 0.9 else '2020-01-01',
+        }
+        for i in range(count)]
+
+
+def time_filter(predicate, records, repeat):
+    best, matches = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matches = sum(1 for record in records if predicate(record))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, matches
+
+
+def to_columns(records):
+    """
+    Columns of :records:, as numpy arrays: floats (with NaN for null) for
+    numbers, and objects for the rest
+    """
+    columns = {}
+    for name in records[0]:
+        values = [record[name] for record in records]
+        if all(value is None or isinstance(value, (int, float)) for value in values):
+            columns[name] = numpy.array([numpy.nan if value is None else value for value in values], dtype=float)
+        else:
+            columns[name] = numpy.array(values, dtype=object)
+    return columns
+
+
+def time_mask(query, columns, repeat):
+    best, matches = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        matches = int(query.mask(columns).sum())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    records = generate_records(args.rows)
+
+    start = time.perf_counter()
+    predicate = PythonPredicateBuilder().parse_and_build(QUERY)
+    print('compiled in {:.3f} ms'.format((time.perf_counter() - start) * 1000))
+
+    print('{:<12} {:>10} {:>14} {:>10}'.format('', 'time (s)', 'rows/s', 'matches'))
+    for name, func in [('compiled', predicate), ('handwritten', handwritten)]:
+        elapsed, matches = time_filter(func, records, args.repeat)
+        print('{:<12} {:>10.3f} {:>14,.0f} {:>10}'.format(name, elapsed, args.rows / elapsed, matches))
+
+    if numpy is not None:
+        query = NumpyQueryBuilder().parse_and_build(QUERY)
+        elapsed, matches = time_mask(query, to_columns(records), args.repeat)
+        print('{:<12} {:>10.3f} {:>14,.0f} {:>10}'.format('numpy', elapsed, args.rows / elapsed, matches))
+
+
+if __name__ == '__main__':
+    main()
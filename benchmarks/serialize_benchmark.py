@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""
+Measures how long it takes to get a parsed query back from its encoding
+with sqlparse.serialize, against re-parsing the query string (with either
+backend, with packrat parsing enabled) and unpickling the detached AST,
+and the size of each encoding.
+
+Usage: python -m benchmarks.serialize_benchmark [--count N] [--repeat N]
+"""
+import argparse
+import pickle
+import time
+
+import sqlparse
+from sqlparse import serialize
+
+from .corpus import generate_corpus
+
+
+def time_loads(loads, items, repeat):
+    """
+    Best time to call :loads: on every one of :items:, in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            loads(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    sqlparse.enable_packrat()
+    query_strings = generate_corpus(count=args.count)
+    asts = [sqlparse.parse_string(qs, detach=True) for qs in query_strings]
+
+    modes = [
+        ('parse (pyparsing)', query_strings, sqlparse.parse_string),
+        ('parse (fast)', query_strings, lambda qs: sqlparse.parse_string(qs, backend='fast')),
+        ('pickle.loads', [pickle.dumps(ast, pickle.HIGHEST_PROTOCOL) for ast in asts], pickle.loads),
+        ('serialize.loads', [serialize.dumps(ast) for ast in asts], serialize.loads),
+    ]
+
+    print('{:<20} {:>14} {:>14}'.format('', 'per query (us)', 'bytes/query'))
+    for name, items, loads in modes:
+        elapsed = time_loads(loads, items, args.repeat)
+        size = sum(len(item.encode('utf-8') if isinstance(item, str) else item) for item in items)
+        print('{:<20} {:>14.1f} {:>14.0f}'.format(name, elapsed / args.count * 1e6, size / float(args.count)))
+
+    elapsed = time_loads(serialize.dumps, asts, args.repeat)
+    print('\nserialize.dumps: {:.1f} us per query'.format(elapsed / args.count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Benchmarks sqlparse.parse_string, MongoQueryBuilder.parse_and_build and
+SqlAlchemyQueryBuilder.parse_and_build on a generated corpus of queries
+(see benchmarks.corpus), reporting throughput, p50/p99 latency and peak
+memory of each as JSON.
+
+Usage: python -m benchmarks.suite [--count N] [--where-depth N] ... [--output results.json]
+"""
+import argparse
+import datetime
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+import pyparsing
+import sqlalchemy
+import sqlalchemy.orm
+import sqlalchemy.ext.declarative
+
+import sqlparse
+from sqlparse.builders import MongoQueryBuilder, SqlAlchemyQueryBuilder
+from . import corpus
+
+TARGETS = ['parse_string', 'mongo', 'sqlalchemy']
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of :sorted_values:
+    """
+    rank = int(math.ceil(fraction * len(sorted_values)))
+    return sorted_values[max(rank - 1, 0)]
+
+
+def measure(func, query_strings, repeat):
+    """
+    Calls :func: with each of :query_strings:, :repeat: times over, and
+    returns its throughput, latency percentiles and peak memory
+    """
+    latencies = []
+    for _ in range(repeat):
+        for query_string in query_strings:
+            start = time.perf_counter()
+            func(query_string)
+            latencies.append(time.perf_counter() - start)
+
+    # tracemalloc slows everything down, so memory is measured in a separate pass
+    tracemalloc.start()
+    try:
+        for query_string in query_strings:
+            func(query_string)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'queries': len(latencies),
+        'throughput_qps': len(latencies) / sum(latencies),
+        'latency_p50_ms': percentile(latencies, 0.50) * 1000,
+        'latency_p99_ms': percentile(latencies, 0.99) * 1000,
+        'peak_memory_bytes': peak,
+    }
+
+
+def sqlalchemy_builder(shape):
+    """
+    Returns a SqlAlchemyQueryBuilder whose model_scope maps each of the
+    corpus tables to a model with the corpus columns
+    """
+    engine = sqlalchemy.create_engine('sqlite://')
+    session = sqlalchemy.orm.sessionmaker(bind=engine)()
+    Base = sqlalchemy.ext.declarative.declarative_base()
+
+    model_scope = {}
+    for table_name in corpus.table_names(shape):
+        attributes = {
+            '__tablename__': table_name,
+            'id': sqlalchemy.Column(sqlalchemy.Integer, primary_key=True),
+        }
+        for column_name in corpus.column_names(shape):
+            attributes[column_name] = sqlalchemy.Column(sqlalchemy.Integer)
+
+        model_scope[table_name] = type(table_name, (Base,), attributes)
+
+    return SqlAlchemyQueryBuilder(session, model_scope=model_scope)
+
+
+def target_func(target, shape, backend):
+    """
+    Returns the function to benchmark for :target:
+    """
+    if target == 'parse_string':
+        return lambda qs: sqlparse.parse_string(qs, backend=backend)
+
+    if target == 'mongo':
+        # Corpus queries are unique, so the plan cache would only add overhead
+        builder = MongoQueryBuilder(plan_cache_size=0)
+    else:
+        builder = sqlalchemy_builder(shape)
+
+    builder.parser_backend = backend
+    return builder.parse_and_build
+
+
+def run(shape, targets=TARGETS, count=100, repeat=3, seed=0, backend='pyparsing', packrat=False):
+    """
+    Benchmarks each of :targets: on a corpus of :count: queries of
+    :shape:, returning a JSON-serializable report
+    """
+    query_strings = corpus.generate_corpus(shape, count, seed)
+
+    if packrat:
+        sqlparse.enable_packrat()
+    else:
+        sqlparse.disable_packrat()
+
+    results = []
+    for target in targets:
+        result = {'target': target}
+        if target != 'parse_string' and (shape.tables != 1 or shape.where_depth is None):
+            result['skipped'] = 'query builders require a single table and a WHERE clause'
+        else:
+            result.update(measure(target_func(target, shape, backend), query_strings, repeat))
+        results.append(result)
+
+    return {
+        'timestamp': datetime.datetime.utcnow().isoformat() + 'Z',
+        'environment': {
+            'sqlparse': sqlparse.__version__,
+            'pyparsing': pyparsing.__version__,
+            'sqlalchemy': sqlalchemy.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'settings': {
+            'count': count,
+            'repeat': repeat,
+            'seed': seed,
+            'backend': backend,
+            'packrat': packrat,
+        },
+        'shape': dict(shape._asdict()),
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100, help='number of queries in the corpus')
+    parser.add_argument('--repeat', type=int, default=3, help='number of timed passes over the corpus')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', choices=sorted(sqlparse.BACKENDS), default='pyparsing')
+    parser.add_argument('--packrat', action='store_true', help='enable packrat parsing')
+    parser.add_argument('--target', dest='targets', action='append', choices=TARGETS,
+                        help='benchmark only this target (can be repeated)')
+    parser.add_argument('--output', help='write JSON results to this file instead of stdout')
+
+    shape = corpus.DEFAULT_SHAPE
+    parser.add_argument('--columns', type=int, default=shape.columns)
+    parser.add_argument('--tables', type=int, default=shape.tables)
+    parser.add_argument('--where-depth', type=int, default=shape.where_depth,
+                        help='depth of the AND/OR tree in WHERE (-1: no WHERE)')
+    parser.add_argument('--in-list-length', type=int, default=shape.in_list_length)
+    parser.add_argument('--like-ratio', type=float, default=shape.like_ratio)
+    parser.add_argument('--between-ratio', type=float, default=shape.between_ratio)
+    args = parser.parse_args(argv)
+
+    shape = corpus.QueryShape(
+        columns=args.columns,
+        tables=args.tables,
+        where_depth=None if args.where_depth < 0 else args.where_depth,
+        in_list_length=args.in_list_length,
+        like_ratio=args.like_ratio,
+        between_ratio=args.between_ratio)
+
+    # Deep right-nested predicates recurse heavily inside pyparsing
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    report = run(
+        shape,
+        targets=args.targets or TARGETS,
+        count=args.count,
+        repeat=args.repeat,
+        seed=args.seed,
+        backend=args.backend,
+        packrat=args.packrat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+    # Summary for humans
+    sys.stderr.write('{:<14} {:>12} {:>10} {:>10} {:>12}\n'.format(
+        'target', 'queries/s', 'p50 (ms)', 'p99 (ms)', 'peak (KiB)'))
+    for result in report['results']:
+        if 'skipped' in result:
+            sys.stderr.write('{:<14} skipped: {}\n'.format(result['target'], result['skipped']))
+            continue
+        sys.stderr.write('{:<14} {:>12.1f} {:>10.3f} {:>10.3f} {:>12.1f}\n'.format(
+            result['target'],
+            result['throughput_qps'],
+            result['latency_p50_ms'],
+            result['latency_p99_ms'],
+            result['peak_memory_bytes'] / 1024.0))
+
+
+if __name__ == '__main__':
+    main()
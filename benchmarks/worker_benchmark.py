@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Measures the cold start of parse_many's worker processes: each run starts a
+fresh interpreter, and times how long it takes to import sqlparse and parse
+one query on each of the workers, with the grammar preloaded before the
+workers are forked (as parse_many does) or built by each worker on its
+first parse.
+
+Usage: python -m benchmarks.worker_benchmark [--workers N] [--runs N]
+"""
+import argparse
+import functools
+import statistics
+import subprocess
+import sys
+import time
+
+QUERY = 'select a, b from c where d = 1 and (e like "f%" or g in (2, 3)) order by a limit 1'
+
+
+def child(workers, preload):
+    """
+    Runs one batch in this (fresh) process, and prints how long it took
+    """
+    start = time.perf_counter()
+
+    import sqlparse
+    from sqlparse.batch import map_ordered
+
+    func = functools.partial(sqlparse.parse_string, backend='pyparsing')
+    preload = functools.partial(sqlparse.preload, 'pyparsing') if preload else None
+    results = list(map_ordered(func, [QUERY] * workers, workers=workers, chunksize=1, preload=preload))
+    assert not any(isinstance(result, sqlparse.BatchError) for result in results)
+
+    print(time.perf_counter() - start)
+
+
+def measure(workers, preload, runs):
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output([
+            sys.executable, '-m', 'benchmarks.worker_benchmark', '--child',
+            '--workers', str(workers)] + (['--preload'] if preload else []))
+        times.append(float(output))
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--preload', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return child(args.workers, args.preload)
+
+    print('{} workers, one query each'.format(args.workers))
+    print('{:<24} {:>12}'.format('', 'median (ms)'))
+    for name, preload in [('built by each worker', False), ('preloaded', True)]:
+        print('{:<24} {:>12.1f}'.format(name, measure(args.workers, preload, args.runs) * 1000))
+
+
+if __name__ == '__main__':
+    main()
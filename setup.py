@@ -28,5 +28,10 @@ setup(
         'pymongo'
     ],
 
+    extras_require={
+        'numpy': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
+    },
+
     test_suite='sqlparse'
 )
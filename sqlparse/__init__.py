@@ -1,4 +1,12 @@
-from . import builders, nodes, visitors, grammar
+import functools
+import importlib
+
+from . import nodes, visitors, transforms, fastparser, serialize
+from .batch import BatchError, map_ordered, DEFAULT_CHUNKSIZE
+from .cache import parse_cache
+from .fingerprinting import Fingerprint, fingerprint, fingerprint_cache
+from .prepared import PreparedQuery
+from .stream import iter_statements, split_statements
 
 
 __version__ = '0.2.0'
@@ -6,13 +14,142 @@ __version__ = '0.2.0'
 __all__ = [
     'builders',
     'nodes',
+    'serialize',
     'visitors',
-    'parse_string'
+    'transforms',
+    'parse_string',
+    'detach',
+    'parse_many',
+    'BatchError',
+    'iter_statements',
+    'split_statements',
+    'PreparedQuery',
+    'parse_cache',
+    'fingerprint',
+    'Fingerprint',
+    'fingerprint_cache',
+    'enable_packrat',
+    'disable_packrat',
+    'preload'
 ]
 
 
-def parse_string(query_string):
+# Imported on first use (see __getattr__), rather than by import sqlparse:
+# the builders import their backends (SqlAlchemy, numpy, ...), and importing
+# the grammar builds all of its pyparsing elements
+_LAZY_MODULES = ('builders', 'grammar')
+
+# Attributes of lazily imported modules, by name
+_LAZY_ATTRIBUTES = {
+    'enable_packrat': 'grammar',
+    'disable_packrat': 'grammar',
+    'detach': 'grammar',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        return importlib.import_module('.' + name, __name__)
+
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is not None:
+        return getattr(importlib.import_module('.' + module_name, __name__), name)
+
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES) | set(_LAZY_ATTRIBUTES))
+
+
+def _grammar():
+    from . import grammar
+    return grammar
+
+
+# Parser implementations selectable with parse_string(..., backend=...)
+BACKENDS = {
+    # pyparsing combinators (sqlparse.grammar); the full grammar
+    'pyparsing': lambda query_string: _grammar().sqlQuery.parseString(query_string),
+    # hand-written tokenizer and recursive descent parser (sqlparse.fastparser);
+    # much faster, but only handles SELECT ... FROM ... WHERE ...
+    'fast': fastparser.parse,
+}
+
+
+def parse_string(query_string, packrat=False, cached=False, backend='pyparsing', detach=False):
     """
     Parses :query_string: into an AST
+
+    :backend: selects the parser implementation (see BACKENDS). Both build the
+    same sqlparse.nodes objects, but 'fast' returns them in a nodes.Statement
+    rather than pyparsing ParseResults.
+
+    If :packrat: is True, packrat (memoized) parsing is enabled for this call,
+    which makes long WHERE clauses parse in roughly linear time. It's the
+    process-wide switch of :enable_packrat:, so it's turned back off after
+    the call if it wasn't on before. Use :enable_packrat: to leave it on.
+
+    If :cached: is True, the AST is looked up in (and added to) :parse_cache:,
+    which is keyed on whitespace normalized query text.
+    Every call returns its own copy of the AST.
+
+    If :detach: is True, pyparsing results are converted into a nodes.Statement
+    (see grammar.detach), which takes far less memory to keep around.
+    """
+    parse_func = BACKENDS.get(backend)
+    if parse_func is None:
+        raise ValueError('Unknown parser backend: %s' % backend)
+
+    restore_packrat = packrat and backend == 'pyparsing' and not _grammar().packrat_enabled()
+    if restore_packrat:
+        _grammar().enable_packrat()
+
+    try:
+        if cached:
+            ast = parse_cache.parse(query_string, parse_func, namespace=backend)
+        else:
+            ast = parse_func(query_string)
+    finally:
+        if restore_packrat:
+            _grammar().disable_packrat()
+
+    if detach and not isinstance(ast, nodes.Statement):
+        ast = _grammar().detach(ast)
+
+    return ast
+
+
+# Query parsed by preload, which goes through the common parts of the grammar
+PRELOAD_QUERY = 'select a, b from c where d = 1 and (e like "f%" or g in (2, 3)) order by a limit 1'
+
+
+def preload(backend='pyparsing'):
+    """
+    Builds the parser for :backend: now, rather than on the first
+    parse_string, and warms it up with a trial parse. For the pyparsing
+    backend, this imports and builds the grammar.
+
+    Processes forked afterwards share the parser instead of each building
+    their own, which is how parse_many and QueryBuilder.build_many keep the
+    start-up cost of their worker processes down.
+    """
+    parse_func = BACKENDS.get(backend)
+    if parse_func is None:
+        raise ValueError('Unknown parser backend: %s' % backend)
+
+    parse_func(PRELOAD_QUERY)
+
+
+def parse_many(query_strings, workers=None, chunksize=DEFAULT_CHUNKSIZE, **kwargs):
+    """
+    Parses every query string in :query_strings: (with parse_string, passing
+    along :kwargs:) on a pool of :workers: processes, yielding ASTs in order.
+
+    Query strings that fail to parse yield a BatchError instead of stopping
+    the batch. See batch.map_ordered for details on workers and chunksize.
+    The parser is preloaded (see preload) before workers start.
     """
-    return grammar.sqlQuery.parseString(query_string)
+    return map_ordered(
+        functools.partial(parse_string, **kwargs), query_strings, workers, chunksize,
+        preload=functools.partial(preload, kwargs.get('backend', 'pyparsing')))
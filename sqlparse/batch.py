@@ -0,0 +1,153 @@
+"""
+Runs a function over a large number of items on a pool of worker processes,
+streaming the results back in order
+"""
+import itertools
+import os
+import pickle
+import sys
+from collections import deque
+
+DEFAULT_CHUNKSIZE = 256
+
+
+class BatchError(object):
+    """
+    Result of an item that raised :exception: instead of returning a value
+    """
+    def __init__(self, index, item, exception):
+        self.index = index
+        self.item = item
+        self.exception = exception
+
+    def __repr__(self):
+        return 'BatchError({}, {!r}, {!r})'.format(self.index, self.item, self.exception)
+
+
+# Function being mapped, set once in each worker process by _init_worker
+_worker_func = None
+
+
+def _init_worker(func, preload=None):
+    global _worker_func
+    _worker_func = func
+
+    if preload is not None:
+        preload()
+
+
+def _run_chunk(chunk, func=None):
+    """
+    Applies func (or the worker's function) to each (index, item) in
+    :chunk:, catching exceptions per item
+    """
+    func = func or _worker_func
+
+    results = []
+    for index, item in chunk:
+        try:
+            results.append(func(item))
+        except Exception as err:
+            results.append(BatchError(index, item, err))
+
+    return results
+
+
+def _run_chunk_pickled(chunk):
+    """
+    Runs _run_chunk in a worker and pickles its results there, so that a
+    result that can't be pickled becomes a BatchError instead of failing
+    the whole chunk (and with it, the batch)
+    """
+    results = _run_chunk(chunk)
+    try:
+        return pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass
+
+    picklable = []
+    for (index, item), result in zip(chunk, results):
+        try:
+            pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        except Exception as err:
+            result = BatchError(index, item, err)
+        picklable.append(result)
+
+    return pickle.dumps(picklable, pickle.HIGHEST_PROTOCOL)
+
+
+def _chunks(iterable, chunksize):
+    items = enumerate(iterable)
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def map_ordered(func, iterable, workers=None, chunksize=DEFAULT_CHUNKSIZE, preload=None):
+    """
+    Yields func(item) for each item in :iterable:, in order. Items that raise
+    an exception yield a BatchError instead, and don't stop the batch.
+
+    Items are sent to :workers: processes (default: one per CPU) in chunks of
+    :chunksize:. Only a few chunks per worker are in flight at a time, so
+    :iterable: is consumed lazily and can be arbitrarily long.
+    If :workers: is 1 or less, everything runs in this process.
+
+    :func: is sent to each worker once, so it (and in turn its items) must
+    be picklable. Bound methods are fine, but changes that :func: makes to
+    its object's state in workers are not seen here. Results that can't be
+    pickled yield a BatchError.
+
+    :preload: is called before workers process any items, to do setup that
+    all of them need (e.g. sqlparse.preload, which builds the grammar). When
+    workers are forked (the default on Linux), it's called once, here,
+    before the pool starts, so that workers share what it built instead of
+    each building their own. Otherwise it's called in each worker as it
+    starts, and must be picklable.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize < 1:
+        raise ValueError('chunksize must be at least 1')
+
+    chunks = _chunks(iterable, chunksize)
+
+    if workers <= 1:
+        for chunk in chunks:
+            for result in _run_chunk(chunk, func):
+                yield result
+        return
+
+    # Imports multiprocessing, which takes a while, so only when it's needed
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    context = multiprocessing.get_context()
+    if preload is not None and context.get_start_method() == 'fork':
+        preload()
+        preload = None
+
+    executor = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(func, preload))
+    pending = deque()
+    try:
+        pending.extend(executor.submit(_run_chunk_pickled, chunk) for chunk in itertools.islice(chunks, workers * 2))
+        while pending:
+            results = pickle.loads(pending.popleft().result())
+
+            # Keep the pool busy while results are consumed
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(executor.submit(_run_chunk_pickled, chunk))
+
+            for result in results:
+                yield result
+    finally:
+        # Chunks that haven't started yet (if the caller stopped early) are
+        # dropped. Before 3.9, cancelling futures already handed to the pool
+        # can hang shutdown, so the (at most workers * 2) pending chunks are
+        # left to finish instead
+        if sys.version_info >= (3, 9):
+            executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            executor.shutdown(wait=True)
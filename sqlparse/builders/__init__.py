@@ -1,9 +1,37 @@
-from .base import QueryBuilder
-from .sqlalchemy_builder import SqlAlchemyQueryBuilder
-from .mongo_builder import MongoQueryBuilder
+import importlib
+
+# Each builder's module is only imported when the builder is first used, so
+# that using one doesn't import the others' backends (SqlAlchemy, numpy, ...)
+_BUILDER_MODULES = {
+    'QueryBuilder': '.base',
+    'SqlAlchemyQueryBuilder': '.sqlalchemy_builder',
+    'SqlAlchemyCoreQueryBuilder': '.sqlalchemy_core_builder',
+    'MongoQueryBuilder': '.mongo_builder',
+    'QuerySizeWarning': '.mongo_builder',
+    'PythonPredicateBuilder': '.python_builder',
+    'NumpyQueryBuilder': '.numpy_builder',
+}
 
 __all__ = [
     'QueryBuilder',
     'SqlAlchemyQueryBuilder',
-    'MongoQueryBuilder'
+    'SqlAlchemyCoreQueryBuilder',
+    'MongoQueryBuilder',
+    'QuerySizeWarning',
+    'PythonPredicateBuilder',
+    'NumpyQueryBuilder'
 ]
+
+
+def __getattr__(name):
+    module_name = _BUILDER_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_BUILDER_MODULES))
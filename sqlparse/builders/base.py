@@ -1,8 +1,13 @@
+import functools
 import logging
 from abc import ABCMeta, abstractmethod
 
 import sqlparse
 import pyparsing
+from sqlparse.batch import map_ordered, DEFAULT_CHUNKSIZE
+from sqlparse.cache import normalize_query
+from sqlparse.optimizer import optimize
+from sqlparse.transforms import flatten_boolean_operators
 
 logger = logging.getLogger(__name__)
 
@@ -11,18 +16,79 @@ class QueryBuilder(object):
     __metaclass__ = ABCMeta
     _primitives = (int, float, str, bool)
 
+    # Look ASTs up in sqlparse.parse_cache instead of always re-parsing?
+    use_parse_cache = False
+
+    # Parser backend passed to sqlparse.parse_string
+    parser_backend = 'pyparsing'
+
+    # Simplify WHERE expressions with sqlparse.optimizer before building queries?
+    optimize = True
+
+    # Attributes that change what a query string is built into, which are part
+    # of the keys of builders' caches of built queries (see _cache_key)
+    CACHE_KEY_SETTINGS = ('parser_backend', 'optimize')
+
     def __init__(self):
         self.model_class = None  # deprecated
         self.model_classes = []
         self.fields = []
 
-    @abstractmethod
     def parse_and_build(self, query_string):
+        return self.build(self._parse(query_string))
+
+    def build_many(self, query_strings, workers=None, chunksize=DEFAULT_CHUNKSIZE):
+        """
+        Parses and builds every query string in :query_strings: on a pool of
+        :workers: processes, yielding queries in order. Query strings that
+        fail yield a sqlparse.BatchError instead of stopping the batch.
+
+        The builder is copied to each worker process, so its per-query state
+        (model_class, fields, etc.) isn't updated. Built queries are sent back
+        pickled, so this only works with multiple workers for builders whose
+        output is picklable (e.g. MongoQueryBuilder); use workers=1 otherwise.
+        The parser is preloaded (see sqlparse.preload) before workers start.
+        """
+        return map_ordered(
+            self.parse_and_build, query_strings, workers, chunksize,
+            preload=functools.partial(sqlparse.preload, self.parser_backend))
+
+    @abstractmethod
+    def build(self, parse_tree):
+        """
+        Builds a query from :parse_tree: (e.g. from sqlparse.parse_string,
+        or PreparedQuery.bind)
+        """
         pass
 
+    def _get_where(self, parse_tree):
+        """
+        WHERE expression of :parse_tree: (None if it has none), with chains
+        of the same AND or OR operator flattened into BooleanOperators, and
+        optimized if self.optimize is set (in which case it may have been
+        folded into a BooleanValue)
+        """
+        if not parse_tree.where:
+            return None
+
+        if self.optimize:
+            return optimize(parse_tree.where[0])
+        return flatten_boolean_operators(parse_tree.where[0])
+
+    def _cache_key(self, query_string):
+        """
+        Key of the query built from :query_string: in a cache of built
+        queries: the normalized query text, and the current value of each
+        setting in CACHE_KEY_SETTINGS
+        """
+        return tuple(getattr(self, name) for name in self.CACHE_KEY_SETTINGS) + (normalize_query(query_string),)
+
     def _parse(self, query_string):
         try:
-            ast = sqlparse.parse_string(query_string)
+            ast = sqlparse.parse_string(
+                query_string,
+                cached=self.use_parse_cache,
+                backend=self.parser_backend)
         except pyparsing.ParseException as err:
             msg = [
                 'Parse Error: %s' % err,
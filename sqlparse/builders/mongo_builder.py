@@ -1,20 +1,60 @@
 #!/usr/bin/env python
+import copy
 import logging
+import warnings
 
-import sqlparse
 from sqlparse import nodes
+from sqlparse.cache import LRUCache
+from sqlparse.like import compile_like, pcre_regex, prefix_range
 from sqlparse.visitors import IdentifierAndValueVisitor
 from .base import QueryBuilder
 
 logger = logging.getLogger(__name__)
 
+# Criteria that match no documents (every document has an _id)
+NO_DOCUMENTS = {'_id': {'$exists': False}}
+
+
+class QuerySizeWarning(UserWarning):
+    """
+    Warns that a built Mongo query is larger than
+    MongoQueryBuilder.max_query_size. Turn it into an exception with
+    warnings.simplefilter('error', QuerySizeWarning).
+    """
+    pass
+
+
+def query_size(criteria, _sizes=None):
+    """
+    Number of operators, fields and values in Mongo :criteria:, as sent to
+    the server. Dicts and lists shared within :criteria: are only counted
+    once, but are counted each time they're used.
+    """
+    if _sizes is None:
+        _sizes = {}
+
+    if isinstance(criteria, dict):
+        items = criteria.values()
+    elif isinstance(criteria, list):
+        items = criteria
+    else:
+        return 1
+
+    size = _sizes.get(id(criteria))
+    if size is None:
+        size = len(criteria) + sum(query_size(item, _sizes) for item in items)
+        _sizes[id(criteria)] = size
+    return size
+
+
+def _is_operator_document(value):
+    return isinstance(value, dict) and bool(value) and all(key.startswith('$') for key in value)
+
 
 class MongoQueryVisitor(IdentifierAndValueVisitor):
     # Map of SQL operators to MongoDB equivalents
     # TODO: Create node classes for these operators, rather than relying on operator.name
     OPERATORS = {
-        'not': '$nor',
-        '!': '$nor',
         '!=': '$ne',
         '<>': '$ne',
         '<': '$lt',
@@ -28,43 +68,120 @@ class MongoQueryVisitor(IdentifierAndValueVisitor):
         'in': '$in',
         'mod': '$mod',
         '%': '$mod',
-        'like': '$regex',
         # Mongo doesn't support: + - * / ** << >>
     }
 
+    NOT_OPERATORS = ('not', '!')
+
+    # Field operators that are negated by another field operator
+    INVERTED_OPERATORS = {
+        '$in': '$nin',
+        '$nin': '$in',
+    }
+
+    def __init__(self, like_ranges=False):
+        # Match LIKE prefixes with $gte/$lt instead of ^prefix regexes?
+        self.like_ranges = like_ranges
+
+    # Negations of the criteria built so far, by id of the criteria (and
+    # criteria by id of their negation), so that each is only built once
+    _negations = None
+
     def visit_UnaryOperator(self, node):
-        op_name = self.OPERATORS.get(node.name)
-        if op_name is None:
-            raise ValueError('Mongo visitor does not implement "%s" unary operator')
+        if node.name not in self.NOT_OPERATORS:
+            raise ValueError('Mongo visitor does not implement "%s" unary operator' % node.name)
 
-        rhs_node = self.visit(node.rhs)
-        if not isinstance(rhs_node, nodes.ListValue):
-            rhs_node = [ rhs_node ]
+        return self.negate(self.visit(node.rhs))
 
-        return { op_name: rhs_node }
+    def negate(self, criteria):
+        """
+        Mongo criteria matching the documents that :criteria: doesn't match,
+        with the negation pushed down to fields ($ne, $nin, $not) where
+        possible, since $nor can't use an index. Negations are shared with
+        any other use of the same criteria, rather than copied.
+        """
+        if self._negations is None:
+            self._negations = {}
+
+        entry = self._negations.get(id(criteria))
+        if entry is not None:
+            return entry[1]
+
+        negated = self._negate(criteria)
+        # Keep both alive while they're in the table, so that ids aren't reused
+        self._negations[id(criteria)] = (criteria, negated)
+        self._negations[id(negated)] = (negated, criteria)
+        return negated
+
+    def _negate(self, criteria):
+        if not criteria:
+            return copy.deepcopy(NO_DOCUMENTS)
+
+        if len(criteria) > 1:
+            # Implicit AND of the fields
+            return {'$or': [self.negate({key: value}) for key, value in criteria.items()]}
+
+        (key, value), = criteria.items()
+        if key == '$and':
+            return {'$or': [self.negate(operand) for operand in value]}
+        elif key == '$or':
+            return {'$and': [self.negate(operand) for operand in value]}
+        elif key == '$nor':
+            return value[0] if len(value) == 1 else {'$or': value}
+        elif key.startswith('$'):
+            return {'$nor': [criteria]}
+
+        # { field: condition }
+        if not _is_operator_document(value):
+            return {key: {'$ne': value}}
+
+        if len(value) == 1:
+            (op_name, operand), = value.items()
+            if op_name == '$ne' and not _is_operator_document(operand):
+                return {key: operand}
+            elif op_name == '$not':
+                return {key: operand}
+            elif op_name in self.INVERTED_OPERATORS:
+                return {key: {self.INVERTED_OPERATORS[op_name]: operand}}
+
+        return {key: {'$not': value}}
+
+    def visit_ListValue(self, node):
+        return [self.visit(value) for value in node.values]
+
+    def visit_BooleanOperator(self, node):
+        op_name = self.OPERATORS[node.name]
+        return {op_name: [self.visit(operand) for operand in node.operands]}
 
     def visit_BinaryOperator(self, node):
         lhs_node = self.visit(node.lhs)
         rhs_node = self.visit(node.rhs)
 
-        if node.name == '=':
+        if node.name in ('=', 'is'):
             # Mongo treats equality struct different from other binary operators
+            # (x IS NULL is { x: null }, which also matches missing fields)
             if isinstance(lhs_node, str):
                 return {lhs_node: rhs_node}
             else:
                 raise ValueError('lhs is an expression: %s' % lhs_node)
 
         elif node.name in ('xor', '^'):
-            # Mongo lacks an XOR operator
+            # Mongo lacks an XOR operator. Each side is used twice, but as the
+            # same objects (see negate), so nested XORs take linear memory to
+            # build, even though their size as sent to the server doubles
+            # with each level (see MongoQueryBuilder.max_query_size).
             return {
-                '$and': [
-                    {'$or': [lhs_node, rhs_node]},
-                    {'$and': [
-                        {'$nor': [lhs_node]},
-                        {'$nor': [rhs_node]}
-                    ]}
+                '$or': [
+                    {'$and': [lhs_node, self.negate(rhs_node)]},
+                    {'$and': [self.negate(lhs_node), rhs_node]}
                 ]}
 
+        elif node.name == 'like':
+            if isinstance(lhs_node, str):
+                return {lhs_node: self._like(rhs_node)}
+            else:
+                raise ValueError('lhs is an expression: %s' % lhs_node)
+
         elif node.name == 'between':
             # Mongo lacks a BETWEEN operator
             return {
@@ -88,15 +205,80 @@ class MongoQueryVisitor(IdentifierAndValueVisitor):
             else:
                 raise ValueError('lhs is an expression: %s' % lhs_node)
 
+    def _like(self, pattern):
+        """
+        Condition matching the same strings as LIKE :pattern:. Patterns with
+        a literal prefix are matched with an anchored regex (or range), which
+        Mongo can use an index for.
+        """
+        like = compile_like(pattern)
+        if like.exact:
+            return like.prefix
+
+        if like.prefix_only and like.prefix and self.like_ranges:
+            lower, upper = prefix_range(like.prefix)
+            if upper is None:
+                return {'$gte': lower}
+            return {'$gte': lower, '$lt': upper}
+
+        condition = {'$regex': pcre_regex(pattern)}
+        if like.dotall:
+            condition['$options'] = 's'
+        return condition
+
 
 class MongoQueryBuilder(QueryBuilder):
     """
     Builds a MongoDB query from a SQL query
+
+    Queries built by parse_and_build are kept in an LRU cache (plan_cache)
+    keyed on normalized query text and the builder's settings, so repeated
+    queries skip parsing and visiting. Pass plan_cache_size=0 to disable it.
+
+    With like_ranges set, LIKE patterns like 'abc%' are matched with
+    {'$gte': 'abc', '$lt': 'abd'} rather than {'$regex': '^abc'}. Both can
+    use an index, but ranges compare with the collection's collation.
+
+    Queries larger than max_query_size (see query_size) warn with a
+    QuerySizeWarning when they're built; None disables the check.
+
+    By default, queries are built as (filter criteria, options) for
+    collection.find(criteria, **options), with ORDER BY, LIMIT and OFFSET
+    in the sort, limit and skip options. With pipeline set, they're built as
+    a list of aggregation pipeline stages for collection.aggregate instead.
     """
+    DEFAULT_PLAN_CACHE_SIZE = 1024
+
+    max_query_size = 10000
+
+    like_ranges = False
+
+    CACHE_KEY_SETTINGS = QueryBuilder.CACHE_KEY_SETTINGS + ('pipeline', 'like_ranges', 'max_query_size')
+
+    def __init__(self, plan_cache_size=DEFAULT_PLAN_CACHE_SIZE, pipeline=False):
+        super(MongoQueryBuilder, self).__init__()
+        self.plan_cache = LRUCache(plan_cache_size) if plan_cache_size else None
+        self.pipeline = pipeline
+
     def parse_and_build(self, query_string):
-        parse_tree = sqlparse.parse_string(query_string)
-        filter_options = {}
+        if self.plan_cache is None:
+            return super(MongoQueryBuilder, self).parse_and_build(query_string)
+
+        key = self._cache_key(query_string)
+        plan = self.plan_cache.get(key)
+        if plan is None:
+            query = super(MongoQueryBuilder, self).parse_and_build(query_string)
+            plan = (query, self.model_class, self.fields)
 
+            # Callers own the returned dicts, so cache a private copy
+            self.plan_cache.put(key, copy.deepcopy(plan))
+            return query
+
+        query, self.model_class, self.fields = copy.deepcopy(plan)
+        self.class_names = [self.model_class]
+        return query
+
+    def build(self, parse_tree):
         # collections
         self.model_class = self._get_collection_name(parse_tree)
         self.class_names = [self.model_class]
@@ -104,19 +286,93 @@ class MongoQueryBuilder(QueryBuilder):
         # fields
         filter_fields = self._get_fields_option(parse_tree)
         self.fields = list(filter_fields.keys())
+
+        filter_criteria = self._get_filter_criteria(parse_tree)
+        sort = self._get_sort(parse_tree)
+        skip, limit = self._get_row_range(parse_tree)
+        if limit == 0:
+            # Mongo takes a limit of 0 to mean no limit
+            filter_criteria, limit = copy.deepcopy(NO_DOCUMENTS), None
+
+        if self.pipeline:
+            return self._build_pipeline(filter_criteria, filter_fields, sort, skip, limit)
+
+        filter_options = {}
         if filter_fields:
             filter_options['fields'] = filter_fields
+        if sort:
+            filter_options['sort'] = sort
+        if skip:
+            filter_options['skip'] = skip
+        if limit is not None:
+            filter_options['limit'] = limit
 
-        return self._get_filter_criteria(parse_tree), filter_options
+        return filter_criteria, filter_options
+
+    def _build_pipeline(self, filter_criteria, filter_fields, sort, skip, limit):
+        """
+        Aggregation pipeline stages for the query. $match comes first, so
+        that it (and the $sort after it) can use an index, and $project
+        comes last, so that documents can be sorted on fields that aren't
+        selected.
+        """
+        pipeline = []
+        if filter_criteria:
+            pipeline.append({'$match': filter_criteria})
+        if sort:
+            pipeline.append({'$sort': dict(sort)})
+        if skip:
+            pipeline.append({'$skip': skip})
+        if limit is not None:
+            pipeline.append({'$limit': limit})
+        if filter_fields:
+            pipeline.append({'$project': filter_fields})
+
+        return pipeline
 
     def _get_filter_criteria(self, parse_tree):
         """
         Filter criteria specified in WHERE
         """
-        filter_criteria =  MongoQueryVisitor().visit(parse_tree.where[0])
+        where = self._get_where(parse_tree)
+        if where is None:
+            return {}
+        elif isinstance(where, nodes.BooleanValue):
+            return {} if where.value else copy.deepcopy(NO_DOCUMENTS)
+
+        filter_criteria = MongoQueryVisitor(like_ranges=self.like_ranges).visit(where)
         # print('WHERE: {}', json.dumps(filter_criteria, indent=4))
+
+        if self.max_query_size is not None:
+            size = query_size(filter_criteria)
+            if size > self.max_query_size:
+                warnings.warn(
+                    'Mongo query has {} operators, fields and values (max_query_size is {})'.format(
+                        size, self.max_query_size),
+                    QuerySizeWarning)
+
         return filter_criteria
 
+    def _get_sort(self, parse_tree):
+        """
+        (field, direction) pairs specified in ORDER BY
+        """
+        if not parse_tree.order:
+            return []
+
+        visitor = IdentifierAndValueVisitor()
+        return [
+            (visitor.visit(sort_key.column), -1 if sort_key.descending else 1)
+            for sort_key in parse_tree.order.values]
+
+    def _get_row_range(self, parse_tree):
+        """
+        (skip, limit) specified in OFFSET and LIMIT (None if not specified)
+        """
+        skip = parse_tree.offset.value if parse_tree.offset else None
+        limit = parse_tree.limit.value if parse_tree.limit else None
+        return skip, limit
+
     def _get_collection_name(self, parse_tree):
         """
         Collections specified in FROM
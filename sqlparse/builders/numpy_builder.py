@@ -0,0 +1,417 @@
+#!/usr/bin/env python
+import logging
+import operator
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:  # optional dependency
+    numpy = None
+
+try:
+    import pandas
+except ImportError:  # optional dependency
+    pandas = None
+
+from sqlparse import nodes
+from sqlparse.like import compile_like, python_regex
+from sqlparse.visitors import IdentifierAndValueVisitor
+from .base import QueryBuilder
+
+logger = logging.getLogger(__name__)
+
+# Condition over every row, as a boolean array of the rows where it's true,
+# and one of the rows where it's unknown (SQL conditions on null are neither
+# true nor false). unknown is None if it's never unknown, which saves the
+# array operations on it for columns that can't hold nulls.
+_Mask = namedtuple('_Mask', ['true', 'unknown'])
+
+# numpy dtype kinds that can't hold nulls: bools, integers, and fixed width strings
+NOT_NULLABLE_KINDS = 'biuSU'
+
+
+def _or_masks(first, second):
+    """
+    first | second, where None is all false
+    """
+    if first is None:
+        return second
+    elif second is None:
+        return first
+    return first | second
+
+
+def _false(mask):
+    """
+    Rows where :mask: is false
+    """
+    if mask.unknown is None:
+        return ~mask.true
+    return ~(mask.true | mask.unknown)
+
+
+class NumpyMaskVisitor(IdentifierAndValueVisitor):
+    """
+    Evaluates a WHERE expression over columnar :data: (a pandas DataFrame,
+    or a dict of equal length numpy arrays) into a boolean array of the rows
+    that match it, with whole column operations: comparisons, & and | for
+    AND and OR, isin for IN. Only the columns used in the expression are
+    read.
+
+    Conditions follow SQL's three-valued logic: a comparison with null (None
+    or NaN) is unknown, so neither it nor its negation matches.
+    """
+    COMPARISON_OPERATORS = {
+        '=': operator.eq,
+        '!=': operator.ne,
+        '<>': operator.ne,
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge,
+    }
+
+    AND_OPERATORS = ('and', '&&')
+    OR_OPERATORS = ('or', '||')
+    XOR_OPERATORS = ('xor', '^')
+    NOT_OPERATORS = ('not', '!')
+
+    def __init__(self, data, length):
+        self.data = data
+        self.length = length
+        self._columns = {}  # array, by column name
+        self._nulls = {}    # null mask (None if there are no nulls), by id of the array
+
+    def visit_Identifier(self, node):
+        column = self._columns.get(node.name)
+        if column is None:
+            try:
+                column = self._columns[node.name] = numpy.asarray(self.data[node.name])
+            except KeyError:
+                raise ValueError('%s is not a column' % node.name)
+
+        return column
+
+    def visit_ListValue(self, node):
+        return [self.visit(value) for value in node.values]
+
+    def visit_RealValue(self, node):
+        # Columns hold floats, which don't compare equal to most Decimals
+        return float(node.value)
+
+    def visit_UnaryOperator(self, node):
+        if node.name not in self.NOT_OPERATORS:
+            raise ValueError('Numpy visitor does not implement "%s" unary operator' % node.name)
+
+        mask = self._mask(self.visit(node.rhs))
+        return _Mask(_false(mask), mask.unknown)
+
+    def visit_BooleanOperator(self, node):
+        masks = [self._mask(self.visit(operand)) for operand in node.operands]
+        combine = self._and if node.name in self.AND_OPERATORS else self._or
+
+        result = masks[0]
+        for mask in masks[1:]:
+            result = combine(result, mask)
+        return result
+
+    def visit_BinaryOperator(self, node):
+        lhs = self.visit(node.lhs)
+        rhs = self.visit(node.rhs)
+
+        if node.name in self.AND_OPERATORS:
+            return self._and(self._mask(lhs), self._mask(rhs))
+        elif node.name in self.OR_OPERATORS:
+            return self._or(self._mask(lhs), self._mask(rhs))
+        elif node.name in self.XOR_OPERATORS:
+            return self._xor(self._mask(lhs), self._mask(rhs))
+
+        if isinstance(lhs, _Mask) or isinstance(rhs, _Mask):
+            raise ValueError('Expected a column or value in "%s"' % node.name)
+
+        if node.name in self.COMPARISON_OPERATORS:
+            return self._compare(self.COMPARISON_OPERATORS[node.name], lhs, rhs)
+        elif node.name == 'between':
+            # Two comparisons, so that nulls are handled as in x >= y AND x <= z
+            return self._and(
+                self._compare(operator.ge, lhs, rhs.begin),
+                self._compare(operator.le, lhs, rhs.end))
+        elif node.name == 'in':
+            return self._in(lhs, rhs)
+        elif node.name == 'like':
+            return self._like(lhs, rhs)
+        elif node.name == 'is':
+            return self._is(lhs, rhs)
+
+        raise ValueError('Numpy visitor does not implement "%s" binary operator' % node.name)
+
+    def _nulls_of(self, value):
+        """
+        Null mask of column or constant :value:, True for a null constant,
+        or None if it can't be null
+        """
+        if not isinstance(value, numpy.ndarray):
+            return True if value is None else None
+        elif value.dtype.kind in NOT_NULLABLE_KINDS:
+            return None
+
+        try:
+            return self._nulls[id(value)]
+        except KeyError:
+            pass
+
+        if pandas is not None:
+            nulls = pandas.isna(value)
+        elif value.dtype.kind == 'f':
+            nulls = numpy.isnan(value)
+        elif value.dtype.kind in 'mM':
+            nulls = numpy.isnat(value)
+        else:
+            nulls = numpy.fromiter((item is None for item in value), bool, len(value))
+
+        if not nulls.any():
+            nulls = None
+        self._nulls[id(value)] = nulls
+        return nulls
+
+    def _unknown(self, *values):
+        """
+        Rows where any of :values: is null (True if one is a null constant,
+        None if none of them can be null)
+        """
+        unknown = None
+        for value in values:
+            nulls = self._nulls_of(value)
+            if nulls is True:
+                return True
+            unknown = _or_masks(unknown, nulls)
+        return unknown
+
+    def _constant(self, value):
+        return _Mask(numpy.full(self.length, value, dtype=bool), None)
+
+    def _all_unknown(self):
+        return _Mask(numpy.zeros(self.length, dtype=bool), numpy.ones(self.length, dtype=bool))
+
+    def _mask(self, result):
+        """
+        Condition for :result:, which may be a column or value used as a
+        condition (e.g. WHERE is_active)
+        """
+        if isinstance(result, _Mask):
+            return result
+        elif not isinstance(result, numpy.ndarray):
+            return self._all_unknown() if result is None else self._constant(bool(result))
+
+        return self._apply(lambda values: values.astype(bool), result)
+
+    def _apply(self, func, column, *constants):
+        """
+        Condition that's func(column values) for the rows where :column: (and
+        any of :constants:) isn't null, and unknown for the rest. :func: is
+        only called with the values that aren't null, so it doesn't need to
+        handle them.
+        """
+        unknown = self._unknown(column, *constants)
+        if unknown is True:
+            return self._all_unknown()
+        elif unknown is None:
+            return _Mask(numpy.asarray(func(column), dtype=bool), None)
+
+        known = ~unknown
+        true = numpy.zeros(self.length, dtype=bool)
+        true[known] = func(column[known])
+        return _Mask(true, unknown)
+
+    def _compare(self, op, lhs, rhs):
+        if not isinstance(lhs, numpy.ndarray):
+            if not isinstance(rhs, numpy.ndarray):
+                return self._mask(op(lhs, rhs) if lhs is not None and rhs is not None else None)
+            return self._apply(lambda values: op(lhs, values), rhs, lhs)
+        elif not isinstance(rhs, numpy.ndarray):
+            return self._apply(lambda values: op(values, rhs), lhs, rhs)
+
+        # Two columns
+        unknown = _or_masks(self._unknown(lhs), self._unknown(rhs))
+        if unknown is None:
+            return _Mask(numpy.asarray(op(lhs, rhs), dtype=bool), None)
+
+        known = ~unknown
+        true = numpy.zeros(self.length, dtype=bool)
+        true[known] = op(lhs[known], rhs[known])
+        return _Mask(true, unknown)
+
+    def _in(self, lhs, values):
+        if not isinstance(values, list) or any(isinstance(value, numpy.ndarray) for value in values):
+            raise ValueError('IN requires a list of values')
+        elif not isinstance(lhs, numpy.ndarray):
+            return self._mask(lhs in values if lhs is not None else None)
+
+        # x IN (..., null) is unknown rather than false when x isn't found
+        members = [value for value in values if value is not None]
+        if lhs.dtype.kind != 'O':
+            mask = self._apply(lambda column: numpy.isin(column, members), lhs)
+        elif pandas is not None:
+            # numpy.isin compares object arrays item by item against each
+            # member, while pandas hashes them
+            mask = self._apply(lambda column: pandas.Series(column, copy=False).isin(members).to_numpy(), lhs)
+        else:
+            members = set(members)
+            mask = self._apply(
+                lambda column: numpy.fromiter((item in members for item in column), bool, len(column)), lhs)
+
+        if len(members) < len(values):
+            return _Mask(mask.true, ~mask.true)
+        return mask
+
+    def _like(self, lhs, pattern):
+        if not isinstance(pattern, str):
+            raise ValueError('LIKE requires a string pattern')
+        elif not isinstance(lhs, numpy.ndarray):
+            return self._mask(bool(python_regex(pattern).search(lhs)) if lhs is not None else None)
+
+        like = compile_like(pattern)
+        if like.exact:
+            return self._compare(operator.eq, lhs, like.prefix)
+        elif like.prefix_only and lhs.dtype.kind == 'U':
+            return self._apply(lambda column: numpy.char.startswith(column, like.prefix), lhs)
+        elif like.prefix_only:
+            prefix = like.prefix
+            return self._apply(
+                lambda column: numpy.fromiter((item.startswith(prefix) for item in column), bool, len(column)), lhs)
+
+        # numpy has no vectorized regex matching
+        search = python_regex(pattern).search
+        return self._apply(
+            lambda column: numpy.fromiter((search(item) is not None for item in column), bool, len(column)), lhs)
+
+    def _is(self, lhs, value):
+        # x IS y is never unknown
+        if isinstance(value, numpy.ndarray) or value not in (None, True, False):
+            raise ValueError('IS requires null, true, false or unknown')
+        elif not isinstance(lhs, numpy.ndarray):
+            return self._constant(lhs is value if value is None else lhs == value)
+
+        nulls = self._nulls_of(lhs)
+        if value is None:
+            return _Mask(nulls.copy(), None) if nulls is not None else self._constant(False)
+
+        mask = self._apply(lambda column: column == value, lhs)
+        return _Mask(mask.true, None)
+
+    def _and(self, lhs, rhs):
+        unknown = _or_masks(lhs.unknown, rhs.unknown)
+        if unknown is not None:
+            # Unknown unless either side is false
+            unknown = unknown & ~(_false(lhs) | _false(rhs))
+        return _Mask(lhs.true & rhs.true, unknown)
+
+    def _or(self, lhs, rhs):
+        true = lhs.true | rhs.true
+        unknown = _or_masks(lhs.unknown, rhs.unknown)
+        if unknown is not None:
+            # Unknown unless either side is true
+            unknown = unknown & ~true
+        return _Mask(true, unknown)
+
+    def _xor(self, lhs, rhs):
+        unknown = _or_masks(lhs.unknown, rhs.unknown)
+        true = lhs.true ^ rhs.true
+        if unknown is not None:
+            true &= ~unknown
+        return _Mask(true, unknown)
+
+
+class NumpyQuery(object):
+    """
+    Query built by NumpyQueryBuilder. Calling it with columnar data (a
+    pandas DataFrame, or a dict of equal length numpy arrays) returns the
+    selected columns of the rows matching WHERE, in the same form: a
+    DataFrame, or a dict of arrays.
+    """
+    def __init__(self, where, fields):
+        self.where = where
+        self.fields = fields  # None for *
+
+    def __call__(self, data):
+        mask = self.mask(data)
+        fields = self.fields if self.fields is not None else list(data.keys())
+
+        if pandas is not None and isinstance(data, pandas.DataFrame):
+            return data.loc[mask, fields] if mask is not None else data.loc[:, fields]
+
+        if mask is None:
+            return dict((name, numpy.asarray(data[name])) for name in fields)
+        return dict((name, numpy.asarray(data[name])[mask]) for name in fields)
+
+    def mask(self, data):
+        """
+        Boolean array of the rows of :data: that match WHERE (None if there's
+        no WHERE, which matches every row)
+        """
+        if self.where is None:
+            return None
+
+        visitor = NumpyMaskVisitor(data, self._length(data))
+        mask = visitor._mask(visitor.visit(self.where))
+        return mask.true
+
+    def _length(self, data):
+        if pandas is not None and isinstance(data, pandas.DataFrame):
+            return len(data)
+
+        for column in data.values():
+            return len(column)
+        return 0
+
+
+class NumpyQueryBuilder(QueryBuilder):
+    """
+    Builds a query that filters columnar data in memory with whole column
+    (vectorized) numpy operations, rather than row by row:
+
+        >>> builder = NumpyQueryBuilder()
+        >>> query = builder.parse_and_build('select name, age from User where age between 21 and 65')
+        >>> adults = query(users_dataframe)
+
+    The data can be a pandas DataFrame or a dict of numpy arrays (see
+    NumpyQuery). Only the columns used in WHERE are read, and only those in
+    SELECT are filtered and returned.
+
+    ORDER BY, LIMIT and OFFSET are left to the caller.
+
+    Requires numpy (pip install sqlparse[numpy]); pandas is optional.
+    """
+    def __init__(self):
+        if numpy is None:
+            raise ImportError('NumpyQueryBuilder requires numpy')
+
+        super(NumpyQueryBuilder, self).__init__()
+
+    def build(self, parse_tree):
+        tables = [str(table.name) for table in parse_tree.tables.values] if parse_tree.tables else []
+        self.model_class = tables[0] if tables else None
+        self.model_classes = tables
+
+        fields = self._get_fields(parse_tree)
+        self.fields = list(fields) if fields is not None else []
+
+        where = self._get_where(parse_tree)
+        logger.debug('WHERE: %r', where)
+        return NumpyQuery(where, fields)
+
+    def _get_fields(self, parse_tree):
+        """
+        Columns specified in SELECT (None for *)
+        """
+        fields = IdentifierAndValueVisitor().visit(parse_tree.columns)
+        if not isinstance(fields, list):
+            raise ValueError('SELECT must be a list')
+
+        if '*' in fields:
+            return None
+
+        for field in fields:
+            if not isinstance(field, nodes.Identifier):
+                raise NotImplementedError('Only identifiers can be used in SELECT clause')
+        return [field.name for field in fields]
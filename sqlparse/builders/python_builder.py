@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+import logging
+from collections import namedtuple
+
+from sqlparse.cache import LRUCache
+from sqlparse.like import compile_like, python_regex
+from sqlparse.nodevisitor import ASTVisitor
+from sqlparse.visitors import IdentifierAndValueVisitor
+from .base import QueryBuilder
+
+logger = logging.getLogger(__name__)
+
+# Value in the predicate: a field of the record (a local variable), or a
+# constant (with its value)
+_Operand = namedtuple('_Operand', ['source', 'is_constant', 'value'])
+
+# Condition in the predicate, as a pair of expressions: one that's true when
+# the condition is true, and one that's true when it's false. SQL conditions
+# on null are neither (they're unknown), so NOT can't just negate the first.
+_Condition = namedtuple('_Condition', ['true', 'false'])
+
+ALWAYS = _Condition('True', 'False')
+NEVER = _Condition('False', 'True')
+UNKNOWN = _Condition('False', 'False')
+
+
+class PythonPredicateVisitor(ASTVisitor):
+    """
+    Generates the source of a Python predicate from a WHERE expression, for
+    compile_predicate. Each field is read from the record once, into a local
+    variable, and constants (sets for IN, regexes for LIKE) are bound as
+    globals of the predicate.
+
+    Conditions follow SQL's three-valued logic: a comparison with null is
+    unknown, so neither it nor its negation matches.
+    """
+    COMPARISON_OPERATORS = {
+        '=': '==',
+        '!=': '!=',
+        '<>': '!=',
+        '<': '<',
+        '<=': '<=',
+        '>': '>',
+        '>=': '>=',
+    }
+
+    AND_OPERATORS = ('and', '&&')
+    OR_OPERATORS = ('or', '||')
+    XOR_OPERATORS = ('xor', '^')
+    NOT_OPERATORS = ('not', '!')
+
+    def __init__(self):
+        self.fields = {}      # local variable, by field name
+        self.constants = {}   # value, by global name
+        self.statements = []  # assignments evaluated before the condition
+
+    def source(self, where):
+        """
+        Source of a predicate(record) function matching :where:
+        """
+        condition = self._condition(self.visit(where))
+
+        lines = ['def predicate(record):']
+        if self.fields:
+            lines.append('    get = record.get')
+        lines.extend('    %s = get(%r)' % (variable, name) for name, variable in self.fields.items())
+        lines.extend('    ' + statement for statement in self.statements)
+        lines.append('    return True if %s else False' % condition.true)
+        return '\n'.join(lines)
+
+    def visit_Identifier(self, node):
+        variable = self.fields.get(node.name)
+        if variable is None:
+            variable = self.fields[node.name] = 'f%d' % len(self.fields)
+        return _Operand(variable, False, None)
+
+    def visit_Value(self, node):
+        # Numbers, strings, booleans and null are written into the source as literals
+        value = IdentifierAndValueVisitor().visit(node)
+        return _Operand(repr(value), True, value)
+
+    def visit_RealValue(self, node):
+        # Records hold floats, which don't compare equal to most Decimals
+        value = float(node.value)
+        return _Operand(repr(value), True, value)
+
+    def visit_ListValue(self, node):
+        return [self.visit(value) for value in node.values]
+
+    def visit_RangeValue(self, node):
+        return self.visit(node.begin), self.visit(node.end)
+
+    def visit_Placeholder(self, node):
+        return IdentifierAndValueVisitor().visit(node)  # raises
+
+    def visit_UnaryOperator(self, node):
+        if node.name not in self.NOT_OPERATORS:
+            raise ValueError('Python predicate visitor does not implement "%s" unary operator' % node.name)
+
+        condition = self._condition(self.visit(node.rhs))
+        return _Condition(condition.false, condition.true)
+
+    def visit_BooleanOperator(self, node):
+        conditions = [self._condition(self.visit(operand)) for operand in node.operands]
+        if node.name in self.AND_OPERATORS:
+            return self._and(conditions)
+        return self._or(conditions)
+
+    def visit_BinaryOperator(self, node):
+        lhs = self.visit(node.lhs)
+        rhs = self.visit(node.rhs)
+
+        if node.name in self.AND_OPERATORS:
+            return self._and([self._condition(lhs), self._condition(rhs)])
+        elif node.name in self.OR_OPERATORS:
+            return self._or([self._condition(lhs), self._condition(rhs)])
+        elif node.name in self.XOR_OPERATORS:
+            return self._xor(self._condition(lhs), self._condition(rhs))
+
+        lhs = self._operand(lhs)
+        if node.name in self.COMPARISON_OPERATORS:
+            return self._compare(lhs, self.COMPARISON_OPERATORS[node.name], self._operand(rhs))
+        elif node.name == 'in':
+            return self._in(lhs, rhs)
+        elif node.name == 'between':
+            return self._between(lhs, *rhs)
+        elif node.name == 'like':
+            return self._like(lhs, self._operand(rhs))
+        elif node.name == 'is':
+            return self._is(lhs, self._operand(rhs))
+
+        raise ValueError('Python predicate visitor does not implement "%s" binary operator' % node.name)
+
+    def _operand(self, result):
+        if not isinstance(result, _Operand):
+            raise ValueError('Expected a field or value, not %r' % (result,))
+        return result
+
+    def _condition(self, result):
+        """
+        Condition for :result:, which may be a field or value used as a
+        condition (e.g. WHERE is_active)
+        """
+        if isinstance(result, _Condition):
+            return result
+
+        operand = self._operand(result)
+        if operand.is_constant:
+            if operand.value is None:
+                return UNKNOWN
+            return ALWAYS if operand.value else NEVER
+
+        return _Condition(
+            '(%s is not None and %s)' % (operand.source, operand.source),
+            '(%s is not None and not %s)' % (operand.source, operand.source))
+
+    def _constant(self, value):
+        """
+        Global name bound to :value: in the predicate
+        """
+        name = '_c%d' % len(self.constants)
+        self.constants[name] = value
+        return name
+
+    def _guarded(self, operands, expression):
+        """
+        Condition for boolean :expression: of :operands:, which is unknown
+        if any of them is null
+        """
+        checks = []
+        for operand in operands:
+            if operand.is_constant:
+                if operand.value is None:
+                    return UNKNOWN
+            elif operand.source not in checks:
+                checks.append(operand.source)
+
+        checks = ['%s is not None' % source for source in checks]
+        return _Condition(
+            '(%s)' % ' and '.join(checks + [expression]),
+            '(%s)' % ' and '.join(checks + ['not (%s)' % expression]))
+
+    def _and(self, conditions):
+        return _Condition(
+            '(%s)' % ' and '.join(condition.true for condition in conditions),
+            '(%s)' % ' or '.join(condition.false for condition in conditions))
+
+    def _or(self, conditions):
+        return _Condition(
+            '(%s)' % ' or '.join(condition.true for condition in conditions),
+            '(%s)' % ' and '.join(condition.false for condition in conditions))
+
+    def _xor(self, lhs, rhs):
+        # Each side is needed twice, so it's evaluated once, ahead of the
+        # condition (into True, False or None for unknown), rather than
+        # copied into the source: nested XORs would double it at each level
+        values = []
+        for condition in (lhs, rhs):
+            variable = 'v%d' % len(self.statements)
+            self.statements.append('%s = True if %s else False if %s else None' % (
+                variable, condition.true, condition.false))
+            values.append(variable)
+
+        known = '%s is not None and %s is not None' % tuple(values)
+        return _Condition(
+            '(%s and %s != %s)' % ((known,) + tuple(values)),
+            '(%s and %s == %s)' % ((known,) + tuple(values)))
+
+    def _compare(self, lhs, op_name, rhs):
+        return self._guarded([lhs, rhs], '%s %s %s' % (lhs.source, op_name, rhs.source))
+
+    def _in(self, lhs, values):
+        if not isinstance(values, list):
+            raise ValueError('IN requires a list')
+        elif not all(value.is_constant for value in values):
+            # x IN (y, z) is x = y OR x = z
+            return self._or([self._compare(lhs, '==', self._operand(value)) for value in values])
+
+        # x IN (..., null) is unknown rather than false when x isn't found
+        members = frozenset(value.value for value in values if value.value is not None)
+        condition = self._guarded([lhs], '%s in %s' % (lhs.source, self._constant(members)))
+        if any(value.value is None for value in values):
+            return _Condition(condition.true, 'False')
+        return condition
+
+    def _between(self, lhs, begin, end):
+        if begin.is_constant and end.is_constant and begin.value is not None and end.value is not None:
+            return self._guarded([lhs], '%s <= %s <= %s' % (begin.source, lhs.source, end.source))
+        return self._and([self._compare(lhs, '>=', begin), self._compare(lhs, '<=', end)])
+
+    def _like(self, lhs, pattern):
+        if not pattern.is_constant or not isinstance(pattern.value, str):
+            raise ValueError('LIKE requires a string pattern')
+
+        like = compile_like(pattern.value)
+        if like.exact:
+            return self._guarded([lhs], '%s == %r' % (lhs.source, like.prefix))
+        elif like.prefix_only:
+            return self._guarded([lhs], '%s.startswith(%r)' % (lhs.source, like.prefix))
+
+        search = python_regex(pattern.value).search
+        return self._guarded([lhs], '%s(%s) is not None' % (self._constant(search), lhs.source))
+
+    def _is(self, lhs, value):
+        # x IS y is never unknown
+        if not value.is_constant:
+            raise ValueError('IS requires null, true, false or unknown')
+        elif value.value is None:
+            expression = '%s is None' % lhs.source
+        else:
+            expression = '%s is not None and %s == %r' % (lhs.source, lhs.source, value.value)
+
+        return _Condition('(%s)' % expression, '(not (%s))' % expression)
+
+
+def compile_predicate(where):
+    """
+    Compiles WHERE expression :where: (None matches everything) into a
+    function that takes a record (a dict, or anything else with a .get
+    method) and returns whether it matches. Missing fields are null.
+
+    The function's source is kept in its source attribute.
+    """
+    visitor = PythonPredicateVisitor()
+    source = visitor.source(where) if where is not None else 'def predicate(record):\n    return True'
+    logger.debug('Predicate:\n%s', source)
+
+    namespace = dict(visitor.constants, __builtins__={})
+    exec(compile(source, '<predicate>', 'exec'), namespace)
+
+    predicate = namespace['predicate']
+    predicate.source = source
+    return predicate
+
+
+class PythonPredicateBuilder(QueryBuilder):
+    """
+    Builds a Python predicate from the WHERE clause of a SQL query, for
+    filtering records in memory (e.g. cache entries, or a stream of rows)
+    without a database:
+
+        >>> builder = PythonPredicateBuilder()
+        >>> predicate = builder.parse_and_build('select * from User where age > 21 and name like "J%"')
+        >>> adults = filter(predicate, users)
+
+    Records are dicts, or anything else with a .get method. The predicate is
+    compiled once per query (see compile_predicate), and predicates built by
+    parse_and_build are kept in an LRU cache (predicate_cache) keyed on
+    normalized query text and the builder's settings. Pass
+    predicate_cache_size=0 to disable it.
+
+    ORDER BY, LIMIT and OFFSET are left to the caller.
+    """
+    DEFAULT_PREDICATE_CACHE_SIZE = 1024
+
+    def __init__(self, predicate_cache_size=DEFAULT_PREDICATE_CACHE_SIZE):
+        super(PythonPredicateBuilder, self).__init__()
+        self.predicate_cache = LRUCache(predicate_cache_size) if predicate_cache_size else None
+
+    def parse_and_build(self, query_string):
+        if self.predicate_cache is None:
+            return super(PythonPredicateBuilder, self).parse_and_build(query_string)
+
+        key = self._cache_key(query_string)
+        entry = self.predicate_cache.get(key)
+        if entry is None:
+            predicate = super(PythonPredicateBuilder, self).parse_and_build(query_string)
+            self.predicate_cache.put(key, (predicate, self.model_class, list(self.fields)))
+            return predicate
+
+        predicate, self.model_class, self.fields = entry
+        self.model_classes = [self.model_class] if self.model_class else []
+        self.fields = list(self.fields)
+        return predicate
+
+    def build(self, parse_tree):
+        tables = [str(table.name) for table in parse_tree.tables.values] if parse_tree.tables else []
+        self.model_class = tables[0] if tables else None
+        self.model_classes = tables
+        self.fields = self._get_fields(parse_tree)
+
+        return compile_predicate(self._get_where(parse_tree))
+
+    def _get_fields(self, parse_tree):
+        """
+        Fields specified in SELECT (none for *)
+        """
+        fields = IdentifierAndValueVisitor().visit(parse_tree.columns)
+        if not isinstance(fields, list):
+            raise ValueError('SELECT must be a list')
+
+        if '*' in fields:
+            return []
+        return [field.name for field in fields]
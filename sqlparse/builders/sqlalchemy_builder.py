@@ -2,17 +2,84 @@
 import operator
 import logging
 import inspect
+import threading
+import weakref
 
 import sqlalchemy
+import sqlalchemy.exc
+import sqlalchemy.orm
 from sqlalchemy.orm.session import Session
 
-from sqlparse import nodes
+from sqlparse import like, nodes
 from sqlparse.visitors import IdentifierAndValueVisitor
 from .base import QueryBuilder
 
 logger = logging.getLogger(__name__)
 
 
+class ModelMetadata(object):
+    """
+    Mapped properties of a SqlAlchemy model class, read from its mapper once
+    """
+    def __init__(self, model_class):
+        try:
+            mapper = sqlalchemy.inspect(model_class)
+        except sqlalchemy.exc.NoInspectionAvailable:
+            raise ValueError('%s is not a mapped SqlAlchemy class' % model_class.__name__)
+
+        self.model_class = model_class
+        self.mapper = mapper
+
+        # Names of all mapped properties (columns, relationships, etc.)
+        self.property_names = frozenset(p.key for p in mapper.iterate_properties)
+
+        # Class attributes that can be used in query expressions, by property name
+        self.attributes = dict((name, getattr(model_class, name)) for name in self.property_names)
+
+        # Column objects, by property name
+        self.columns = dict((p.key, p.columns[0]) for p in mapper.column_attrs)
+
+        # RelationshipProperty objects, by property name
+        self.relationships = dict((r.key, r) for r in mapper.relationships)
+
+
+class ModelRegistry(object):
+    """
+    Thread-safe cache of ModelMetadata for each model class.
+
+    Call invalidate() after mappers are reconfigured (e.g. properties are
+    added to a mapped class), so their metadata is read again.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = weakref.WeakKeyDictionary()
+
+    def get(self, model_class):
+        """
+        Returns ModelMetadata for :model_class:, reading it from the mapper on first use
+        """
+        with self._lock:
+            metadata = self._models.get(model_class)
+            if metadata is None:
+                metadata = self._models[model_class] = ModelMetadata(model_class)
+
+            return metadata
+
+    def invalidate(self, model_class=None):
+        """
+        Forgets the metadata of :model_class:, or of all model classes if None
+        """
+        with self._lock:
+            if model_class is None:
+                self._models.clear()
+            else:
+                self._models.pop(model_class, None)
+
+
+# Shared by SqlAlchemyQueryBuilder and SqlAlchemyQueryVisitor by default
+model_registry = ModelRegistry()
+
+
 class SqlAlchemyQueryVisitor(IdentifierAndValueVisitor):
     BINARY_OPERATORS = {
         '=': operator.eq,
@@ -28,7 +95,8 @@ class SqlAlchemyQueryVisitor(IdentifierAndValueVisitor):
         '||': sqlalchemy.or_,
         'in': lambda lhs, rhs: lhs.in_(rhs),
         'between': lambda lhs, rhs: lhs.between(rhs.begin, rhs.end),
-        'like': lambda lhs, rhs: lhs.like(rhs),
+        'like': lambda lhs, rhs: lhs.like(rhs, escape=like.ESCAPE),  # same escape as MySQL and Postgres
+        'is': lambda lhs, rhs: lhs.is_(rhs),
         #'ilike': lambda lhs, rhs: lhs.ilike(rhs),  # TODO: implement in grammar
 
         '+': operator.add,
@@ -49,8 +117,9 @@ class SqlAlchemyQueryVisitor(IdentifierAndValueVisitor):
         '+':   operator.pos
     }
 
-    def __init__(self, model_class):
+    def __init__(self, model_class, model_registry=model_registry):
         self.model_class = model_class
+        self.model_metadata = model_registry.get(model_class)
 
     def visit_UnaryOperator(self, node):
         op_func = self.UNARY_OPERATORS.get(node.name)
@@ -59,6 +128,10 @@ class SqlAlchemyQueryVisitor(IdentifierAndValueVisitor):
 
         return op_func(self.visit(node.rhs))
 
+    def visit_BooleanOperator(self, node):
+        op_func = self.BINARY_OPERATORS[node.name]
+        return op_func(*[self.visit(operand) for operand in node.operands])
+
     def visit_BinaryOperator(self, node):
         # XOR operator
         if node.name in ('xor', '^'):
@@ -78,21 +151,40 @@ class SqlAlchemyQueryVisitor(IdentifierAndValueVisitor):
 
             return op_func(self.visit(node.lhs), self.visit(node.rhs))
 
+    def visit_ListValue(self, node):
+        return [self.visit(value) for value in node.values]
+
+    def visit_BooleanValue(self, node):
+        return sqlalchemy.true() if node.value else sqlalchemy.false()
+
+    def visit_NullValue(self, node):
+        return sqlalchemy.null()
+
     def visit_Identifier(self, node):
-        # Ensure property is mapped in SqlAlchemy (and thus can be queried)
-        mapped_properties = set([p.key for p in self.model_class.__mapper__.iterate_properties])
-        if node.name not in mapped_properties:
+        # Class property that can be used in SqlAlchemy query expressions
+        # (only mapped properties can be queried)
+        attribute = self.model_metadata.attributes.get(node.name)
+        if attribute is None:
             raise ValueError('%s property is not a mapped relation, and can not be queried with SqlAlchemy' % node.name)
 
-        # Class property that can be used in SqlAlchemy query expressions
-        return getattr(self.model_class, node.name)
+        return attribute
 
 
 class SqlAlchemyQueryBuilder(QueryBuilder):
     """
     Builds a SqlAlchemy query from a SQL query
+
+    Only the columns in SELECT are loaded, as set by projection:
+        'load_only': model instances, with the other columns deferred (the
+                     primary key is always loaded)
+        'with_entities': rows of the selected columns, rather than instances
+        None: model instances, with every column loaded
     """
-    def __init__(self, session, model_scope=None):
+    PROJECTIONS = ('load_only', 'with_entities', None)
+
+    projection = 'load_only'
+
+    def __init__(self, session, model_scope=None, model_registry=model_registry):
         super(SqlAlchemyQueryBuilder, self).__init__()
 
         if session is None:
@@ -107,19 +199,26 @@ class SqlAlchemyQueryBuilder(QueryBuilder):
             model_scope = globals()
 
         self.model_scope = model_scope
+        self.model_registry = model_registry
 
-    def parse_and_build(self, query_string):
-        parse_tree = self._parse(query_string)
-
+    def build(self, parse_tree):
         self.model_class = self._get_model_class(parse_tree)
 
         self.fields = self._get_projection(parse_tree)
-        query = self.session.query(self.model_class)
+        query = self._apply_projection(self.session.query(self.model_class), self.model_class, self.fields)
 
         criteria = self._get_filter_criteria(self.model_class, parse_tree)
         if criteria is not None:
             query = query.filter(criteria)
 
+        order_by = self._get_order_by(self.model_class, parse_tree)
+        if order_by:
+            query = query.order_by(*order_by)
+        if parse_tree.limit:
+            query = query.limit(parse_tree.limit.value)
+        if parse_tree.offset:
+            query = query.offset(parse_tree.offset.value)
+
         return query
 
     def _get_model_class(self, parse_tree):
@@ -140,23 +239,72 @@ class SqlAlchemyQueryBuilder(QueryBuilder):
         elif not inspect.isclass(klass):
             raise ValueError('Model class %s is not a class' % class_name)
 
+        # Raises ValueError for classes that aren't mapped
+        self.model_registry.get(klass)
+
         return klass
 
     def _get_projection(self, parse_tree):
+        """
+        Names of the columns in SELECT (all mapped columns for *)
+        """
         projection = IdentifierAndValueVisitor().visit(parse_tree.columns)
         # print('SELECT: {}', projection)
         if not isinstance(projection, list):
             raise ValueError('SELECT must be a list')
 
+        model_metadata = self.model_registry.get(self.model_class)
         fields = []
         for field in projection:
-            if not isinstance(field, nodes.Identifier):
+            if field == '*':
+                fields.extend(model_metadata.columns)
+            elif not isinstance(field, nodes.Identifier):
                 raise NotImplementedError('Only identifiers can be used in SELECT clause')
-            fields.append(field.name)
+            else:
+                fields.append(field.name)
 
         return fields
 
+    def _apply_projection(self, query, model_class, fields):
+        """
+        Narrows :query: of :model_class: down to the columns named in
+        :fields:, as set by self.projection
+        """
+        if self.projection not in self.PROJECTIONS:
+            raise ValueError('Unknown projection: %s' % self.projection)
+        elif self.projection is None:
+            return query
+
+        model_metadata = self.model_registry.get(model_class)
+        for name in fields:
+            if name not in model_metadata.columns:
+                raise ValueError('%s is not a mapped column, and can not be selected with SqlAlchemy' % name)
+
+        attributes = [model_metadata.attributes[name] for name in fields]
+        if self.projection == 'with_entities':
+            return query.with_entities(*attributes)
+        elif set(fields) == set(model_metadata.columns):
+            # Nothing to defer
+            return query
+        return query.options(sqlalchemy.orm.load_only(*attributes))
+
+    def _get_order_by(self, model_class, parse_tree):
+        if not parse_tree.order:
+            return []
+
+        visitor = SqlAlchemyQueryVisitor(model_class, self.model_registry)
+        order_by = []
+        for sort_key in parse_tree.order.values:
+            attribute = visitor.visit(sort_key.column)
+            order_by.append(attribute.desc() if sort_key.descending else attribute.asc())
+
+        return order_by
+
     def _get_filter_criteria(self, model_class, parse_tree):
-        filter_criteria =  SqlAlchemyQueryVisitor(model_class).visit(parse_tree.where[0])
-        print('WHERE: {}', filter_criteria)
+        where = self._get_where(parse_tree)
+        if where is None:
+            return None
+
+        filter_criteria = SqlAlchemyQueryVisitor(model_class, self.model_registry).visit(where)
+        logger.debug('WHERE: %s', filter_criteria)
         return filter_criteria
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+import logging
+
+import sqlalchemy
+
+from sqlparse import nodes
+from sqlparse.cache import LRUCache
+from sqlparse.nodevisitor import walk
+from sqlparse.visitors import IdentifierAndValueVisitor
+from .base import QueryBuilder
+from .sqlalchemy_builder import SqlAlchemyQueryVisitor, model_registry
+
+logger = logging.getLogger(__name__)
+
+
+def _positional_name(position):
+    """
+    Name of the bind parameter of the positional placeholder at :position:
+    """
+    return 'p%d' % position
+
+
+class SqlAlchemyCoreQueryVisitor(SqlAlchemyQueryVisitor):
+    """
+    Builds SqlAlchemy Core expressions, with identifiers resolved to the
+    Column objects in :columns: (by name). Placeholders become bind
+    parameters, named after the placeholder, whose values are given when
+    the statement is executed. Positional placeholders are named p0, p1,
+    ... by their position in :positions: (by id of the placeholder). A
+    placeholder that is a whole IN list, as in IN (:names), is an expanding
+    bind parameter, which takes a list of values.
+    """
+    def __init__(self, columns, positions=None):
+        self.columns = columns
+        self.positions = positions or {}
+
+    def visit_Identifier(self, node):
+        column = self.columns.get(node.name)
+        if column is None:
+            raise ValueError('%s is not a column, and can not be queried with SqlAlchemy' % node.name)
+
+        return column
+
+    def visit_ListValue(self, node):
+        if len(node.values) == 1 and isinstance(node.values[0], nodes.Placeholder):
+            return self._bindparam(node.values[0], expanding=True)
+        return super(SqlAlchemyCoreQueryVisitor, self).visit_ListValue(node)
+
+    def visit_Placeholder(self, node):
+        return self._bindparam(node)
+
+    def _bindparam(self, node, expanding=False):
+        name = node.name if node.name is not None else _positional_name(self.positions[id(node)])
+        return sqlalchemy.bindparam(name, expanding=expanding)
+
+
+class SqlAlchemyCoreQueryBuilder(QueryBuilder):
+    """
+    Builds a SqlAlchemy Core select() statement from a SQL query, selecting
+    only the columns in SELECT. Unlike SqlAlchemyQueryBuilder, it doesn't
+    need a session, and rows aren't loaded into model instances:
+
+        >>> builder = SqlAlchemyCoreQueryBuilder({'User': users_table})
+        >>> rows = connection.execute(builder.parse_and_build('select id, name from User'))
+
+    :tables: maps names used in FROM to Table objects or mapped classes
+    (whose mapped columns are selected by property name).
+
+    Statements built by parse_and_build are kept in an LRU cache
+    (statement_cache) keyed on normalized query text and the builder's
+    settings, and repeated queries return the same statement object, which
+    must be treated as read-only. SqlAlchemy caches the compiled form of
+    each statement object in a connection's compiled_cache execution option,
+    so executing the same statement again also skips compiling it.
+    Placeholders are left in as bind parameters (see
+    SqlAlchemyCoreQueryVisitor), so that one statement serves every value.
+    Pass statement_cache_size=0 to disable the cache.
+    """
+    DEFAULT_STATEMENT_CACHE_SIZE = 1024
+
+    def __init__(self, tables, model_registry=model_registry,
+                 statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE):
+        super(SqlAlchemyCoreQueryBuilder, self).__init__()
+
+        if tables is None:
+            raise ValueError('tables is required')
+
+        self.tables = tables
+        self.model_registry = model_registry
+        self.statement_cache = LRUCache(statement_cache_size) if statement_cache_size else None
+
+    def parse_and_build(self, query_string):
+        if self.statement_cache is None:
+            return super(SqlAlchemyCoreQueryBuilder, self).parse_and_build(query_string)
+
+        key = self._cache_key(query_string)
+        entry = self.statement_cache.get(key)
+        if entry is None:
+            statement = super(SqlAlchemyCoreQueryBuilder, self).parse_and_build(query_string)
+            self.statement_cache.put(key, (statement, self.model_class, list(self.fields)))
+            return statement
+
+        statement, self.model_class, self.fields = entry
+        self.model_classes = [self.model_class]
+        self.fields = list(self.fields)
+        return statement
+
+    def build(self, parse_tree):
+        self.model_class = self._get_table(parse_tree)
+        self.model_classes = [self.model_class]
+        columns = self._get_columns(self.model_class)
+
+        self.fields = self._get_projection(parse_tree, columns)
+        statement = sqlalchemy.select([columns[name] for name in self.fields])
+
+        visitor = SqlAlchemyCoreQueryVisitor(columns, self._get_positions(parse_tree))
+        where = self._get_where(parse_tree)
+        if where is not None:
+            criteria = visitor.visit(where)
+            logger.debug('WHERE: %s', criteria)
+            statement = statement.where(criteria)
+
+        if parse_tree.order:
+            order_by = []
+            for sort_key in parse_tree.order.values:
+                column = visitor.visit(sort_key.column)
+                order_by.append(column.desc() if sort_key.descending else column.asc())
+            statement = statement.order_by(*order_by)
+        if parse_tree.limit:
+            statement = statement.limit(parse_tree.limit.value)
+        if parse_tree.offset:
+            statement = statement.offset(parse_tree.offset.value)
+
+        return statement
+
+    def _get_positions(self, parse_tree):
+        """
+        Positions of the positional placeholders in WHERE, by id, in query
+        order (read before optimizing, which may reorder them). Raises a
+        ValueError if a named placeholder has the name of a positional one's
+        bind parameter, as they would be bound to the same value.
+        """
+        if not parse_tree.where:
+            return {}
+
+        placeholders = [node for node in walk(parse_tree.where[0]) if isinstance(node, nodes.Placeholder)]
+        positional = [node for node in placeholders if node.name is None]
+        names = set(node.name for node in placeholders if node.name is not None)
+        for index in range(len(positional)):
+            if _positional_name(index) in names:
+                raise ValueError(':%s has the same name as the bind parameter of positional placeholder %d' % (
+                    _positional_name(index), index))
+
+        return dict((id(node), index) for index, node in enumerate(positional))
+
+    def _get_table(self, parse_tree):
+        names = [v.name for v in parse_tree.tables.values] if parse_tree.tables else []
+        if len(names) == 0:
+            raise ValueError('Table name required in FROM clause')
+
+        # TODO: support joins and aliases
+        if len(names) > 1:
+            raise NotImplementedError('SqlAlchemy Core queries currently only support a single table')
+
+        table = self.tables.get(names[0])
+        if table is None:
+            raise ValueError('Table %s not found in tables' % names[0])
+
+        return table
+
+    def _get_columns(self, table):
+        """
+        Column objects of :table: (a Table or mapped class), by name, in
+        table order
+        """
+        if isinstance(table, sqlalchemy.sql.FromClause):
+            return dict(table.columns.items())
+
+        # Raises ValueError for classes that aren't mapped
+        return self.model_registry.get(table).columns
+
+    def _get_projection(self, parse_tree, columns):
+        projection = IdentifierAndValueVisitor().visit(parse_tree.columns)
+        if not isinstance(projection, list):
+            raise ValueError('SELECT must be a list')
+
+        fields = []
+        for field in projection:
+            if field == '*':
+                fields.extend(columns)
+            elif not isinstance(field, nodes.Identifier):
+                raise NotImplementedError('Only identifiers can be used in SELECT clause')
+            elif field.name not in columns:
+                raise ValueError('%s is not a column, and can not be selected with SqlAlchemy' % field.name)
+            else:
+                fields.append(field.name)
+
+        return fields
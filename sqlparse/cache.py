@@ -0,0 +1,141 @@
+import pickle
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+DEFAULT_CAPACITY = 1024
+
+CacheStats = namedtuple('CacheStats', ['hits', 'misses', 'size', 'capacity'])
+
+
+class LRUCache(object):
+    """
+    Thread-safe least-recently-used cache with hit/miss counters
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.capacity = None
+        self.resize(capacity)
+
+    def __getstate__(self):
+        # Pickles (e.g. for worker processes) as an empty cache of the same capacity
+        return {'capacity': self.capacity}
+
+    def __setstate__(self, state):
+        self.__init__(state['capacity'])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value cached for :key: (marking it as recently used),
+        or :default: on a miss
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Caches :value: under :key:, evicting the least recently used entry
+        if the cache is full
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, capacity):
+        """
+        Changes the maximum number of entries held
+        """
+        if capacity < 1:
+            raise ValueError('cache capacity must be at least 1')
+
+        with self._lock:
+            self.capacity = capacity
+            self._evict()
+
+    def clear(self):
+        """
+        Drops all entries and resets the hit/miss counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return CacheStats(self.hits, self.misses, len(self._entries), self.capacity)
+
+    def _evict(self):
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+
+# Words keep their case: keywords are case-insensitive, but whether a word is
+# a keyword depends on where it is (e.g. "Is" in "where Is = 1" is a column),
+# so folding them could give two different queries the same key.
+_QUERY_TOKEN_RE = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*') |
+    (?P<space>\s*(?:(?:--|\#)[^\n]*\s*)+|\s+)
+''', re.VERBOSE)
+
+
+def _normalize_token(match):
+    if match.lastgroup == 'space':
+        return ' '
+    return match.group()
+
+
+def normalize_query(query_string):
+    """
+    Normalizes :query_string: for use as a cache key: comments and runs of
+    whitespace collapse to a single space. Everything else is kept as is.
+    """
+    return _QUERY_TOKEN_RE.sub(_normalize_token, query_string).strip()
+
+
+class ParseCache(LRUCache):
+    """
+    LRU cache of parsed ASTs, keyed on normalized query text.
+
+    ASTs are stored pickled, so every read returns a private copy that the
+    caller is free to modify without corrupting the cached tree.
+    """
+    def parse(self, query_string, parse_func, namespace=None):
+        """
+        Returns a copy of the cached AST for :query_string:, calling
+        :parse_func: with :query_string: to build it on a miss.
+        Parse errors are raised and not cached.
+
+        :namespace: keeps ASTs built by different parsers apart.
+        """
+        key = (namespace, normalize_query(query_string))
+
+        data = self.get(key)
+        if data is None:
+            ast = parse_func(query_string)
+            self.put(key, pickle.dumps(ast, pickle.HIGHEST_PROTOCOL))
+            return ast
+
+        return pickle.loads(data)
+
+
+# Shared by sqlparse.parse_string(..., cached=True)
+parse_cache = ParseCache()
@@ -0,0 +1,303 @@
+"""
+Hand-written tokenizer and recursive descent parser for the subset of the SQL
+grammar that's used on hot paths:
+
+    SELECT [ DISTINCT | ALL ] columns
+        [ FROM tables [ WHERE expression ] [ ORDER BY keys ] [ LIMIT n [ OFFSET m ] ] ]
+
+It builds the same sqlparse.nodes objects as the pyparsing grammar (including
+the same right-nested, equal-precedence AND/OR/XOR chains), wrapped in a
+nodes.Statement that has the same columns, tables, where, order, limit,
+offset and options attributes as the ParseResults returned by
+grammar.sqlQuery.
+
+Set operations (UNION, INTERSECT, EXCEPT) are not supported.
+"""
+import re
+
+from . import nodes
+
+_TOKEN_RE = re.compile(r'''
+    (?P<space>\s+|(?:--|\#)[^\n]*) |
+    (?P<string>
+        "(?:[^"\n\r\\]|""|\\(?:[^x]|x[0-9a-fA-F]+))*" |
+        '(?:[^'\n\r\\]|''|\\(?:[^x]|x[0-9a-fA-F]+))*') |
+    (?P<number>[+-]?(?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?|[+-]?\d+(?:[eE]-?\d+)?) |
+    (?P<word>[A-Za-z][A-Za-z0-9_$]*(?:\.[A-Za-z][A-Za-z0-9_$]*)*) |
+    (?P<placeholder>\?|:[A-Za-z_][A-Za-z0-9_]*) |
+    (?P<op><=>|<=|>=|!=|<>|&&|\|\||[=<>!(),*])
+''', re.VERBOSE)
+
+# Token tuple fields
+KIND, TEXT, KEY, LOC = range(4)
+
+EQUALITY_OPERATORS = frozenset(['<=>', '=', '!=', '<>', '<', '>', '>=', '<='])
+LOGICAL_OPERATORS = frozenset(['and', '&&', 'or', '||', 'xor'])
+NOT_OPERATORS = frozenset(['not', '!'])
+IS_VALUES = frozenset(['null', 'true', 'false', 'unknown'])
+
+
+def _parse_exception(query_string, loc, msg):
+    # Errors are raised as pyparsing's ParseException, for the same handling
+    # as the grammar's errors, but pyparsing is only imported once one is
+    from pyparsing import ParseException
+    return ParseException(query_string, loc, msg)
+
+
+def tokenize(query_string):
+    """
+    Splits :query_string: into (kind, text, key, loc) tuples, where key is the
+    lowercased text of words (for case insensitive keyword matching).
+    Whitespace and comments are dropped, and an 'end' token is appended.
+    """
+    tokens = []
+    match = _TOKEN_RE.match
+    loc = 0
+    end = len(query_string)
+
+    while loc < end:
+        m = match(query_string, loc)
+        if m is None:
+            raise _parse_exception(query_string, loc, 'Unexpected character %r' % query_string[loc])
+
+        kind = m.lastgroup
+        if kind != 'space':
+            text = m.group()
+            tokens.append((kind, text, text.lower() if kind == 'word' else text, loc))
+        loc = m.end()
+
+    tokens.append(('end', '', '', end))
+    return tokens
+
+
+def number_value(text):
+    """
+    IntegerValue or RealValue for the text of a number token
+    """
+    if '.' in text or 'e' in text or 'E' in text:
+        return nodes.RealValue([text])
+    return nodes.IntegerValue([text])
+
+
+class Parser(object):
+    """
+    Parses a single query string
+    """
+    def __init__(self, query_string):
+        self.query_string = query_string
+        self.tokens = tokenize(query_string)
+        self.pos = 0
+
+    @property
+    def token(self):
+        return self.tokens[self.pos]
+
+    def parse(self):
+        self._expect_keyword('select')
+
+        options = ''
+        if self.token[KEY] in ('distinct', 'all') and self.token[KIND] == 'word':
+            options = self._advance()[KEY]
+
+        columns = self._column_list()
+        tables = ''
+        where = ''
+        order = ''
+        limit = ''
+        offset = ''
+
+        if self._accept_keyword('from'):
+            tables = self._table_list()
+            if self._accept_keyword('where'):
+                where = [self._expression()]
+            if self._accept_keyword('order'):
+                self._expect_keyword('by')
+                order = self._sort_key_list()
+            if self._accept_keyword('limit'):
+                limit = self._row_count()
+                if self._accept_keyword('offset'):
+                    offset = self._row_count()
+
+        if self.token[KIND] != 'end':
+            self._error('Expected end of text')
+
+        return nodes.Statement(
+            options=options, columns=columns, tables=tables, where=where,
+            order=order, limit=limit, offset=offset)
+
+    def _column_list(self):
+        columns = []
+        while True:
+            if self.token[TEXT] == '*':
+                columns.append(self._advance()[TEXT])
+            else:
+                columns.append(self._identifier())
+
+            if not self._accept_op(','):
+                return nodes.ListValue([columns])
+
+    def _table_list(self):
+        tables = [self._identifier()]
+        while self._accept_op(','):
+            tables.append(self._identifier())
+
+        return nodes.ListValue([tables])
+
+    def _sort_key_list(self):
+        sort_keys = []
+        while True:
+            tokens = [self._identifier()]
+            if self.token[KEY] in ('asc', 'desc') and self.token[KIND] == 'word':
+                tokens.append(self._advance()[KEY])
+            sort_keys.append(nodes.SortKey([tokens]))
+
+            if not self._accept_op(','):
+                return nodes.ListValue([sort_keys])
+
+    def _row_count(self):
+        if self.token[KIND] != 'number' or not self.token[TEXT].isdigit():
+            self._error('Expected row count')
+
+        return nodes.IntegerValue([self._advance()[TEXT]])
+
+    def _expression(self):
+        """
+        cond { ( AND | OR | XOR ) cond }, folded into a right-nested chain
+        """
+        operands = [self._condition()]
+        operators = []
+        while self.token[KEY] in LOGICAL_OPERATORS:
+            operators.append(self._advance()[KEY])
+            operands.append(self._condition())
+
+        node = operands.pop()
+        while operators:
+            node = nodes.BinaryOperator([[operands.pop(), operators.pop(), node]])
+
+        return node
+
+    def _condition(self):
+        if self.token[KEY] in NOT_OPERATORS:
+            op_name = self._advance()[KEY]
+            return nodes.UnaryOperator([[op_name, self._condition()]])
+
+        if self._accept_op('('):
+            expr = self._expression()
+            self._expect_op(')')
+            return expr
+
+        column = self._identifier()
+        key = self.token[KEY]
+
+        # x = y, x != y, etc.
+        if key in EQUALITY_OPERATORS:
+            op_name = self._advance()[TEXT]
+            return nodes.BinaryOperator([[column, op_name, self._column_rval()]])
+
+        # x [NOT] LIKE 'y', x [NOT] BETWEEN y AND z
+        op_tokens = []
+        if key in NOT_OPERATORS and self.tokens[self.pos + 1][KEY] in ('like', 'between'):
+            op_tokens.append(self._advance()[KEY])
+            key = self.token[KEY]
+
+        if key == 'like':
+            op_tokens.append(self._advance()[KEY])
+            kind = self.token[KIND]
+            if kind == 'string':
+                pattern = nodes.StringValue([self._advance()[TEXT]])
+            elif kind == 'placeholder':
+                pattern = nodes.Placeholder([self._advance()[TEXT]])
+            else:
+                self._error('Expected string or placeholder')
+            return nodes.negatable_operator([[column] + op_tokens + [pattern]])
+
+        if key == 'between':
+            op_tokens.append(self._advance()[KEY])
+            begin = self._column_rval()
+            self._expect_keyword('and')
+            end = self._column_rval()
+            return nodes.negatable_operator([[column] + op_tokens + [nodes.RangeValue([[begin, end]])]])
+
+        # x IS [NOT] NULL, x IS [NOT] TRUE, etc.
+        if key == 'is':
+            op_tokens.append(self._advance()[KEY])
+            if self.token[KEY] in NOT_OPERATORS:
+                op_tokens.append(self._advance()[KEY])
+            if self.token[KEY] not in IS_VALUES or self.token[KIND] != 'word':
+                self._error('Expected null, true, false or unknown')
+
+            value = self._advance()[KEY]
+            if value in ('null', 'unknown'):
+                value = nodes.NullValue()
+            else:
+                value = nodes.BooleanValue([value])
+            return nodes.negatable_operator([[column] + op_tokens + [value]])
+
+        # x IN (y, z, ...)
+        if key == 'in':
+            self._advance()
+            self._expect_op('(')
+            values = [self._column_rval()]
+            while self._accept_op(','):
+                values.append(self._column_rval())
+            self._expect_op(')')
+            return nodes.BinaryOperator([[column, 'in', nodes.ListValue([values])]])
+
+        self._error('Expected operator')
+
+    def _column_rval(self):
+        kind, text = self.token[KIND], self.token[TEXT]
+        if kind == 'number':
+            self._advance()
+            return number_value(text)
+
+        elif kind == 'string':
+            self._advance()
+            return nodes.StringValue([text])
+
+        elif kind == 'placeholder':
+            self._advance()
+            return nodes.Placeholder([text])
+
+        return self._identifier()
+
+    def _identifier(self):
+        if self.token[KIND] != 'word':
+            self._error('Expected identifier')
+
+        return nodes.Identifier([[self._advance()[TEXT]]])
+
+    def _advance(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _accept_keyword(self, keyword):
+        if self.token[KIND] == 'word' and self.token[KEY] == keyword:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_keyword(self, keyword):
+        if not self._accept_keyword(keyword):
+            self._error('Expected "%s"' % keyword)
+
+    def _accept_op(self, op):
+        if self.token[KIND] == 'op' and self.token[TEXT] == op:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect_op(self, op):
+        if not self._accept_op(op):
+            self._error('Expected "%s"' % op)
+
+    def _error(self, msg):
+        raise _parse_exception(self.query_string, self.token[LOC], msg)
+
+
+def parse(query_string):
+    """
+    Parses :query_string: into a nodes.Statement
+    """
+    return Parser(query_string).parse()
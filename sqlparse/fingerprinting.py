@@ -0,0 +1,307 @@
+"""
+Structural fingerprints of queries: queries that only differ in their
+literal values (and in the order of the operands of AND, OR, XOR and
+symmetric comparisons) have the same fingerprint, for cache keying, rate
+limiting or aggregating slow queries.
+
+    >>> fingerprint('select * from User where age > 30 and name in ("a", "b")')
+    Fingerprint(hash='...', normalized='select * from User where age > ? and name in (?)', parameters=[30, ['a', 'b']])
+
+The normalized query is a valid query, with a ? placeholder in place of each
+literal (or list of literals in IN), so a plan compiled for a fingerprint can
+be shared by all of its queries, e.g. with PreparedQuery:
+
+    >>> query = fingerprint(query_string)
+    >>> PreparedQuery(query.normalized).build(builder, *query.parameters)
+
+A query's own ? placeholders become named placeholders in the normalized
+query, :__positional0, :__positional1, ... in the order of the query, so
+that they aren't mixed up with the literals' (or each other, when operands
+are sorted).
+"""
+import hashlib
+from collections import namedtuple
+
+import sqlparse
+from . import fastparser, nodes
+from .fastparser import KIND, TEXT
+from .cache import LRUCache
+from .nodevisitor import ASTVisitor, walk
+from .transforms import flatten_boolean_operators
+
+Fingerprint = namedtuple('Fingerprint', [
+    'hash',        # hex digest of normalized
+    'normalized',  # query text, with literals replaced by ? placeholders
+    'parameters',  # values of the placeholders, in order (lists for IN lists)
+])
+
+# Literal nodes replaced by placeholders
+LITERAL_TYPES = (nodes.StringValue, nodes.IntegerValue, nodes.RealValue)
+
+# Tokens of literals (see fastparser.tokenize)
+LITERAL_KINDS = ('string', 'number')
+
+# Placeholders standing in for the literals of a query string, in the
+# template parsed by fingerprint's fast path (see _template)
+LITERAL_PLACEHOLDER_PREFIX = '__literal'
+
+# Named placeholders standing in for a query's own positional placeholders,
+# in normalized queries
+POSITIONAL_PLACEHOLDER_PREFIX = '__positional'
+
+# Fingerprints of templates, by template, with the indexes of the template's
+# literals as parameters
+fingerprint_cache = LRUCache()
+
+# Stands in for the ? of literals in the text of fragments, until it's
+# normalized, so that they're told apart from a query's own ? placeholders
+# (also when sorting, and in the hash)
+LITERAL_MARKER = '\0'
+
+# Part of a normalized query, and the values of its placeholders
+_Fragment = namedtuple('_Fragment', ['text', 'parameters'])
+
+
+class FingerprintVisitor(ASTVisitor):
+    """
+    Renders a WHERE expression (with its AND and OR chains flattened) as
+    normalized query text, with a LITERAL_MARKER for each literal, or list
+    of literals in an IN list. Operands of commutative operators are sorted by
+    their text (keeping their order when it's the same).
+
+    Literal placeholders of a template (see _template) are replaced as well,
+    with the index of their literal as the value. Positional placeholders
+    are named after their position in :positions: (by id of the placeholder).
+    """
+    # Canonical spellings of operators
+    OPERATOR_NAMES = {
+        '<>': '!=',
+        '&&': 'and',
+        '||': 'or',
+        '!': 'not',
+    }
+
+    # Binary operators whose operands can be swapped
+    SYMMETRIC_OPERATORS = frozenset(['=', '!=', '<=>'])
+    LOGICAL_OPERATORS = frozenset(['and', 'or', 'xor'])
+
+    def __init__(self, positions=None):
+        self.positions = positions or {}
+
+    def visit_Identifier(self, node):
+        return _Fragment(node.name, [])
+
+    def visit_Value(self, node):
+        # true, false, null
+        return _Fragment(repr(node), [])
+
+    def visit_StringValue(self, node):
+        return _Fragment(LITERAL_MARKER, [node.value])
+
+    visit_IntegerValue = visit_StringValue
+    visit_RealValue = visit_StringValue
+
+    def visit_Placeholder(self, node):
+        index = _literal_index(node)
+        if index is not None:
+            return _Fragment(LITERAL_MARKER, [index])
+        elif node.name is None:
+            return _Fragment(':%s%d' % (POSITIONAL_PLACEHOLDER_PREFIX, self.positions[id(node)]), [])
+        return _Fragment(repr(node), [])
+
+    def visit_ListValue(self, node):
+        if node.values and all(_is_literal(value) for value in node.values):
+            index = _literal_index(node.values[0])
+            if index is not None:
+                # A template's IN list, already collapsed into one literal
+                return _Fragment('(%s)' % LITERAL_MARKER, [index])
+            return _Fragment('(%s)' % LITERAL_MARKER, [[value.value for value in node.values]])
+
+        fragments = [self.visit(value) for value in node.values]
+        return _Fragment(
+            '(%s)' % ', '.join(fragment.text for fragment in fragments),
+            [parameter for fragment in fragments for parameter in fragment.parameters])
+
+    def visit_RangeValue(self, node):
+        begin, end = self.visit(node.begin), self.visit(node.end)
+        return _Fragment('%s and %s' % (begin.text, end.text), begin.parameters + end.parameters)
+
+    def visit_UnaryOperator(self, node):
+        name = self._name(node)
+        rhs = self.visit(node.rhs)
+        return _Fragment('%s (%s)' % (name, rhs.text), rhs.parameters)
+
+    def visit_BooleanOperator(self, node):
+        return self._join(self._name(node), [self._operand(operand) for operand in node.operands])
+
+    def visit_BinaryOperator(self, node):
+        name = self._name(node)
+        if name in self.LOGICAL_OPERATORS:
+            return self._join(name, [self._operand(node.lhs), self._operand(node.rhs)])
+
+        lhs, rhs = self.visit(node.lhs), self.visit(node.rhs)
+        if (name in self.SYMMETRIC_OPERATORS and
+                isinstance(node.lhs, nodes.Identifier) and isinstance(node.rhs, nodes.Identifier) and
+                rhs.text < lhs.text):
+            lhs, rhs = rhs, lhs
+
+        return _Fragment('%s %s %s' % (lhs.text, name, rhs.text), lhs.parameters + rhs.parameters)
+
+    def _name(self, node):
+        return self.OPERATOR_NAMES.get(node.name, node.name)
+
+    def _operand(self, node):
+        """
+        Fragment of an operand of a logical operator, in parentheses if it's
+        a logical operator itself
+        """
+        fragment = self.visit(node)
+        if isinstance(node, nodes.BooleanOperator) or (
+                isinstance(node, nodes.BinaryOperator) and self._name(node) in self.LOGICAL_OPERATORS):
+            return _Fragment('(%s)' % fragment.text, fragment.parameters)
+        return fragment
+
+    def _join(self, name, fragments):
+        fragments = sorted(fragments, key=lambda fragment: fragment.text)
+        return _Fragment(
+            (' %s ' % name).join(fragment.text for fragment in fragments),
+            [parameter for fragment in fragments for parameter in fragment.parameters])
+
+
+def _is_literal(node):
+    return isinstance(node, LITERAL_TYPES) or _literal_index(node) is not None
+
+
+def _literal_index(node):
+    """
+    Index of the literal that :node: stands in for, if it's a literal
+    placeholder of a template, otherwise None
+    """
+    if isinstance(node, nodes.Placeholder) and node.name and node.name.startswith(LITERAL_PLACEHOLDER_PREFIX):
+        return int(node.name[len(LITERAL_PLACEHOLDER_PREFIX):])
+    return None
+
+
+def _normalize(ast):
+    """
+    Normalized query text of :ast: (from sqlparse.parse_string, with either
+    backend), with LITERAL_MARKERs, and the values of its placeholders
+    """
+    parts = ['select']
+    if ast.options:
+        parts.append(ast.options.lower())
+    parts.append(', '.join(str(column) for column in ast.columns.values))
+
+    parameters = []
+    if ast.tables:
+        parts.append('from ' + ', '.join(table.name for table in ast.tables.values))
+    if ast.where:
+        where = flatten_boolean_operators(ast.where[0])
+        positional = [node for node in walk(where) if isinstance(node, nodes.Placeholder) and node.name is None]
+        where = FingerprintVisitor(dict((id(node), index) for index, node in enumerate(positional))).visit(where)
+        parts.append('where ' + where.text)
+        parameters = where.parameters
+    if ast.order:
+        parts.append('order by ' + ', '.join(repr(sort_key) for sort_key in ast.order.values))
+    if ast.limit:
+        parts.append('limit %r' % ast.limit)
+        if ast.offset:
+            parts.append('offset %r' % ast.offset)
+
+    return ' '.join(parts), parameters
+
+
+def _fingerprint(text, parameters):
+    """
+    Fingerprint of the normalized query :text: (with LITERAL_MARKERs)
+    """
+    digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    return Fingerprint(digest, text.replace(LITERAL_MARKER, '?'), parameters)
+
+
+def _literal_value(kind, text):
+    if kind == 'string':
+        return nodes.StringValue([text]).value
+    return fastparser.number_value(text).value
+
+
+def _template(query_string):
+    """
+    Splits :query_string: into a template, where each literal (or IN list of
+    literals) is replaced by a :__literal<index> placeholder, and the values
+    of its literals. Only tokenizes the query. Words keep their case, as
+    a word spelled like a keyword can be an identifier (see
+    cache.normalize_query).
+
+    Numbers after LIMIT and OFFSET are part of the template.
+    """
+    tokens = fastparser.tokenize(query_string)
+    parts = []
+    literals = []
+    previous_key = None
+
+    pos = 0
+    end = len(tokens) - 1  # without the 'end' token
+    while pos < end:
+        kind, text, key, _ = tokens[pos]
+
+        if kind in LITERAL_KINDS and previous_key not in ('limit', 'offset'):
+            parts.append(':%s%d' % (LITERAL_PLACEHOLDER_PREFIX, len(literals)))
+            literals.append(_literal_value(kind, text))
+
+        elif text == '(' and previous_key == 'in':
+            # ( literal, literal, ... ) collapses into a single list literal
+            values = []
+            close = pos + 1
+            while tokens[close][KIND] in LITERAL_KINDS:
+                values.append(_literal_value(tokens[close][KIND], tokens[close][TEXT]))
+                close += 1
+                if tokens[close][TEXT] != ',':
+                    break
+                close += 1
+            else:
+                values = None  # empty, or not only literals
+
+            if values and tokens[close][TEXT] == ')':
+                parts.append('(:%s%d)' % (LITERAL_PLACEHOLDER_PREFIX, len(literals)))
+                literals.append(values)
+                pos = close
+            else:
+                parts.append(text)
+
+        else:
+            parts.append(text)
+
+        previous_key = key
+        pos += 1
+
+    return ' '.join(parts), literals
+
+
+def fingerprint(ast_or_string, backend='fast'):
+    """
+    Fingerprint of a query: a query string, or a parsed query (from
+    sqlparse.parse_string, with either backend, detached or not).
+
+    Query strings take a fast path: they're only tokenized, with their
+    literals taken out, and the rest looked up in :fingerprint_cache:. They
+    are only parsed (with :backend:) the first time a fingerprint is seen.
+    """
+    if not isinstance(ast_or_string, str):
+        return _fingerprint(*_normalize(ast_or_string))
+
+    template, literals = _template(ast_or_string)
+    entry = fingerprint_cache.get(template)
+    if entry is None:
+        try:
+            ast = sqlparse.parse_string(template, backend=backend)
+        except Exception:
+            # Raises the error for the query itself, if it doesn't parse
+            # either; otherwise fingerprint it without the cache
+            return fingerprint(sqlparse.parse_string(ast_or_string, backend=backend))
+
+        entry = _fingerprint(*_normalize(ast))
+        fingerprint_cache.put(template, entry)
+
+    # The cached entry's parameters are the indexes of the template's literals
+    return entry._replace(parameters=[literals[index] for index in entry.parameters])
@@ -22,7 +22,7 @@ from pyparsing import \
     Word, Literal, CaselessLiteral, Regex, \
     alphas, nums, alphanums, quotedString, \
     restOfLine, quotedString, delimitedList, \
-    ParseResults, ParseException
+    ParseResults, ParseException, ParserElement
 
 from .nodes import *
 
@@ -47,10 +47,13 @@ PIVOT = CaselessLiteral('pivot')
 PIVOT_IN = CaselessLiteral('in')
 PIVOT_FOR = CaselessLiteral('for')
 
-ORDER_BY = CaselessLiteral('order by')
+ORDER_BY = CaselessLiteral('order') + CaselessLiteral('by')
 ORDER_ASC = CaselessLiteral('asc')
 ORDER_DESC = CaselessLiteral('desc')
 
+LIMIT = CaselessLiteral('limit')
+OFFSET = CaselessLiteral('offset')
+
 # Special values
 VAL_NULL = CaselessLiteral('null')
 VAL_TRUE = CaselessLiteral('true')
@@ -184,9 +187,16 @@ intNumber = (
 
 number = intNumber ^ realNumber
 
+# ? (positional) or :name (named), bound to values by PreparedQuery
+placeholder = (
+    Literal('?') |
+    Regex(r':[A-Za-z_][A-Za-z0-9_]*')
+).setParseAction(Placeholder).setName('placeholder')
+
 atom = (
     number |
-    stringValue('string')  # normalize quotes
+    stringValue('string') |  # normalize quotes
+    placeholder('placeholder')
 )
 
 groupSubSelectStmt = Group(R_PAREN + selectStmt + R_PAREN)  # todo: subselect must have a LIMIT in this context
@@ -198,7 +208,13 @@ columnRval = (
 )
 
 likePattern = (
-    stringValue('value')
+    stringValue('value') |
+    placeholder('value')
+)
+
+isValue = (
+    (VAL_NULL | VAL_UNKNOWN).setParseAction(NullValue) |
+    (VAL_TRUE | VAL_FALSE).setParseAction(BooleanValue)
 )
 
 inOperand = Suppress(L_PAREN) + Group(delimitedList(columnRval))('value').setParseAction(ListValue) + Suppress(R_PAREN)
@@ -211,13 +227,9 @@ whereCond = Forward()
 whereCond << (
     Group(LOGOP_NOT + whereCond)('op').setParseAction(UnaryOperator) |
     Group(columnName('column') + equalityOp('op') + columnRval).setParseAction(BinaryOperator) |  # x = y, x != y, etc.
-    Group(columnName('column') + likeOp('op') + likePattern).setParseAction(BinaryOperator) |
-    Group(columnName('column') + betweenOp('op') + Group(columnRval + OP_BETWEEN_AND + columnRval)('range').setParseAction(RangeValue)).setParseAction(BinaryOperator) |  # x between y and z, x not between y and z
-    Group(columnName('column') + Group(
-        OP_IS +
-        Optional(LOGOP_NOT))('op') +
-        (VAL_NULL | VAL_TRUE | VAL_FALSE | VAL_UNKNOWN)('value')
-    ) |  # x is null, x is not null
+    Group(columnName('column') + likeOp('op') + likePattern).setParseAction(negatable_operator) |  # x like y, x not like y
+    Group(columnName('column') + betweenOp('op') + Group(columnRval + OP_BETWEEN_AND + columnRval)('range').setParseAction(RangeValue)).setParseAction(negatable_operator) |  # x between y and z, x not between y and z
+    Group(columnName('column') + OP_IS('op') + Optional(LOGOP_NOT) + isValue('value')).setParseAction(negatable_operator) |  # x is null, x is not null
     Group(columnName('column') + OP_IN('op') + inOperand).setParseAction(BinaryOperator) |
     # Group( columnName('column') + Combine( LOGOP_NOT + OP_IN )('op') + inOperand ) |
     (L_PAREN + whereExpr('expr') + R_PAREN)
@@ -266,12 +278,15 @@ whereClause = Optional(Suppress(WHERE) + whereExpr)('where')
 
 # TODO: GROUP BY
 # TODO: HAVING
-# TODO: LIMIT, OFFSET
-
 # ORDER BY x, y ASC, d DESC, ...
 orderDirection = ORDER_ASC | ORDER_DESC
-orderByColumnList = Group(delimitedList(columnName('column') + Optional(orderDirection)('direction')))
-orderByClause = Optional(Suppress(ORDER_BY) + orderByColumnList('order'))  # todo: asc, desc
+sortKey = Group(columnName('column') + Optional(orderDirection)('direction')).setParseAction(SortKey)
+orderByColumnList = Group(delimitedList(sortKey)).setParseAction(ListValue)
+orderByClause = Optional(Suppress(ORDER_BY) + orderByColumnList('order'))
+
+# LIMIT x [ OFFSET y ]
+rowCount = Word(nums).setParseAction(IntegerValue).setName('row count')
+limitClause = Optional(Suppress(LIMIT) + rowCount('limit') + Optional(Suppress(OFFSET) + rowCount('offset')))
 
 selectStmt << (
     Suppress(SELECT) +
@@ -279,9 +294,10 @@ selectStmt << (
     Optional(
         fromClause +
         # pivotClause +
-        whereClause
+        whereClause +
+        orderByClause +
+        limitClause
     )
-    # orderByClause
 )
 
 # UNION ( ALL )
@@ -297,3 +313,80 @@ sqlQuery = selectStmts + StringEnd()
 commentStart = Suppress(oneOf('-- #'))
 comment = commentStart + restOfLine
 sqlQuery.ignore(comment)
+
+
+################################
+# Packrat parsing
+################################
+
+# whereExpr/whereCond are a recursive tangle of longest-match (^) alternatives,
+# so without memoization the same sub-expressions are re-parsed over and over.
+DEFAULT_PACKRAT_CACHE_SIZE = 8192
+
+
+def enable_packrat(cache_size=DEFAULT_PACKRAT_CACHE_SIZE):
+    """
+    Enables packrat (memoized) parsing, with a cache bounded to :cache_size:
+    entries (None for an unbounded cache).
+
+    NOTE: packrat mode is a pyparsing-wide setting, so it also applies to any
+    other pyparsing grammar used by this process.
+    """
+    if ParserElement._packratEnabled:
+        # Re-enable so that a new cache_size takes effect
+        disable_packrat()
+
+    ParserElement.enablePackrat(cache_size)
+
+
+def disable_packrat():
+    """
+    Disables packrat parsing (the default)
+    """
+    ParserElement._packratEnabled = False
+    ParserElement._parse = ParserElement._parseNoCache
+    ParserElement.packrat_cache = {}
+
+
+def packrat_enabled():
+    """
+    Is packrat parsing currently enabled?
+    """
+    return ParserElement._packratEnabled
+
+
+################################
+# Detaching from pyparsing
+################################
+
+def _detach_value(value):
+    if isinstance(value, (ParseResults, list)):
+        return [_detach_value(v) for v in value]
+    elif isinstance(value, ASTNode):
+        _detach_node(value)
+    return value
+
+
+def _detach_node(node):
+    """
+    Replaces ParseResults held by :node: (and its descendants) in place
+    """
+    for name in node._fields:
+        setattr(node, name, _detach_value(getattr(node, name)))
+
+
+def detach(parse_results):
+    """
+    Converts :parse_results: from sqlQuery into a nodes.Statement, replacing
+    the pyparsing ParseResults wrapped around the tree with plain lists.
+    The detached tree is much smaller and cheaper to pickle.
+
+    Anything that's not a ParseResults (e.g. a Statement from the fast
+    parser backend) is returned as is.
+    """
+    if not isinstance(parse_results, ParseResults):
+        return parse_results
+
+    return Statement(**dict(
+        (name, _detach_value(value))
+        for name, value in parse_results.items()))
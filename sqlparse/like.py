@@ -0,0 +1,156 @@
+"""
+Compiles SQL LIKE patterns, in which % matches any sequence of characters,
+_ matches any one character, and \\ escapes the next character, into
+anchored regular expressions and literal prefixes that builders can turn
+into index-friendly queries:
+
+    'abc'     exact match              -> x = 'abc'
+    'abc%'    prefix match             -> ^abc, or 'abc' <= x < 'abd'
+    'a_c%d'   prefix and wildcards     -> ^a.c.*d$
+    '%abc'    suffix match             -> abc$
+"""
+import re
+from collections import namedtuple
+
+from .cache import LRUCache
+
+ESCAPE = '\\'
+
+# Highest code point, and the surrogates, which can't be encoded on their own
+MAX_CHAR = 0x10FFFF
+SURROGATES = (0xD800, 0xDFFF)
+
+LikePattern = namedtuple('LikePattern', [
+    'prefix',       # literal characters before the first wildcard
+    'exact',        # no wildcards at all: matches prefix only
+    'prefix_only',  # only % wildcards after the prefix: matches anything starting with prefix
+    'regex',        # anchored regular expression matching the same strings
+    'dotall',       # regex has wildcards, so . has to match newlines too
+])
+
+# Compiled patterns, by (pattern, escape)
+like_cache = LRUCache()
+
+
+def _tokenize(pattern, escape):
+    """
+    Yields (is_wildcard, character) for each character of :pattern:
+    """
+    chars = iter(pattern)
+    for char in chars:
+        if char == escape:
+            # A trailing escape character stands for itself
+            yield False, next(chars, escape)
+        elif char in ('%', '_'):
+            yield True, char
+        else:
+            yield False, char
+
+
+def _compile(pattern, escape):
+    tokens = list(_tokenize(pattern, escape))
+
+    # Literal prefix
+    prefix = []
+    for is_wildcard, char in tokens:
+        if is_wildcard:
+            break
+        prefix.append(char)
+    prefix = ''.join(prefix)
+
+    rest = tokens[len(prefix):]
+    exact = not rest
+    prefix_only = not exact and all(token == (True, '%') for token in rest)
+
+    # Leading and trailing % don't need to be matched: leaving them out
+    # unanchors that end (a trailing one leaves a plain ^prefix for Mongo to
+    # match against index keys)
+    anchored_start = anchored_end = True
+    while rest and rest[-1] == (True, '%'):
+        rest.pop()
+        anchored_end = False
+    while not prefix and rest and rest[0] == (True, '%'):
+        rest.pop(0)
+        anchored_start = False
+
+    parts = ['^' + re.escape(prefix)] if anchored_start else []
+    dotall = False
+    for is_wildcard, char in rest:
+        if not is_wildcard:
+            parts.append(re.escape(char))
+        elif char == '_':
+            parts.append('.')
+            dotall = True
+        elif not parts or parts[-1] != '.*':
+            parts.append('.*')
+            dotall = True
+
+    if anchored_end:
+        parts.append('$')
+
+    return LikePattern(prefix, exact, prefix_only, ''.join(parts), dotall)
+
+
+def compile_like(pattern, escape=ESCAPE):
+    """
+    Returns the LikePattern for SQL LIKE :pattern:, whose wildcards can be
+    escaped with :escape:. Compiled patterns are kept in :like_cache:.
+    """
+    key = (pattern, escape)
+    compiled = like_cache.get(key)
+    if compiled is None:
+        compiled = _compile(pattern, escape)
+        like_cache.put(key, compiled)
+    return compiled
+
+
+def _anchor_end(regex, anchor):
+    """
+    :regex: with its trailing $ (if it's an anchor, not an escaped $)
+    replaced by :anchor:
+    """
+    if regex.endswith('$'):
+        body = regex[:-1]
+        backslashes = len(body) - len(body.rstrip('\\'))
+        if backslashes % 2 == 0:
+            return body + anchor
+    return regex
+
+
+def python_regex(pattern, escape=ESCAPE):
+    """
+    Compiled Python regular expression that searches for the same strings as
+    LIKE :pattern: matches. The LikePattern regex ends in $, which in Python
+    (as in PCRE) also matches before a trailing newline, so it's anchored
+    with \\Z instead.
+    """
+    like = compile_like(pattern, escape)
+    return re.compile(_anchor_end(like.regex, r'\Z'), re.DOTALL if like.dotall else 0)
+
+
+def pcre_regex(pattern, escape=ESCAPE):
+    """
+    PCRE regular expression (as used by Mongo's $regex) that searches for the
+    same strings as LIKE :pattern: matches: the LikePattern regex, anchored
+    with \\z, PCRE's end of string (its \\Z, like $, also matches before a
+    trailing newline).
+    """
+    return _anchor_end(compile_like(pattern, escape).regex, r'\z')
+
+
+def prefix_range(prefix):
+    """
+    Returns (lower, upper) such that a string starts with :prefix: if and
+    only if lower <= string < upper, comparing code points. upper is None if
+    there's no such string (every character of :prefix: is the highest code
+    point), in which case lower <= string is enough.
+    """
+    chars = list(prefix)
+    while chars:
+        code = ord(chars.pop()) + 1
+        if SURROGATES[0] <= code <= SURROGATES[1]:
+            code = SURROGATES[1] + 1
+        if code <= MAX_CHAR:
+            return prefix, ''.join(chars) + chr(code)
+
+    return prefix, None
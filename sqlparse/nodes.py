@@ -6,10 +6,17 @@ class ASTNode(object):
     """
     Node in abstract syntax tree
     """
+    __slots__ = ()
+
+    # Attributes holding child nodes (or lists of them), in visiting order
+    _fields = ()
+
     __metaclass__ = ABCMeta
 
 
 class Value(ASTNode):
+    __slots__ = ()
+
     __metaclass__ = ABCMeta
 
 
@@ -18,17 +25,27 @@ class StringValue(Value):
     'value'
     "value"
     """
+    __slots__ = ('value',)
+
     def __init__(self, tokens):
         self.value = tokens[0][1:-1]
 
+    def __repr__(self):
+        return '"{}"'.format(self.value)
+
 
 class IntegerValue(Value):
     """
     ... -1 0 1 2 ...
     """
+    __slots__ = ('value',)
+
     def __init__(self, tokens):
         self.value = int(tokens[0])
 
+    def __repr__(self):
+        return str(self.value)
+
 
 class RealValue(Value):
     """
@@ -38,15 +55,51 @@ class RealValue(Value):
     1.2e3
     1.2e-3
     """
+    __slots__ = ('value',)
+
     def __init__(self, tokens):
         self.value = Decimal(tokens[0])
 
+    def __repr__(self):
+        return str(self.value)
+
+
+class BooleanValue(Value):
+    """
+    true false
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, tokens):
+        self.value = tokens[0].lower() == 'true'
+
+    def __repr__(self):
+        return 'true' if self.value else 'false'
+
+
+class NullValue(Value):
+    """
+    null unknown
+    """
+    __slots__ = ()
+
+    value = None
+
+    def __init__(self, tokens=None):
+        pass
+
+    def __repr__(self):
+        return 'null'
+
 
 class ListValue(Value):
     """
     [x,y,...]
     (x,y,...)
     """
+    __slots__ = ('values', 'frozen')
+    _fields = ('values',)
+
     def __init__(self, tokens):
         self.values = list(tokens[0])
         self.frozen = False
@@ -61,6 +114,9 @@ class RangeValue(Value):
     (x...y)
     between x and y
     """
+    __slots__ = ('begin', 'end')
+    _fields = ('begin', 'end')
+
     def __init__(self, tokens):
         self.begin, self.end = tokens[0]
 
@@ -68,19 +124,58 @@ class RangeValue(Value):
         return "{}...{}".format(self.begin, self.end)
 
 
+class Placeholder(Value):
+    """
+    ?      (positional)
+    :name  (named)
+    """
+    __slots__ = ('name', 'index')
+
+    def __init__(self, tokens):
+        text = tokens[0]
+        self.name = text[1:] if text.startswith(':') else None
+        self.index = None  # position among positional placeholders (see PreparedQuery)
+
+    def __repr__(self):
+        return '?' if self.name is None else ':' + self.name
+
+
 class Identifier(ASTNode):
     """
 
     """
+    __slots__ = ('name',)
+
     def __init__(self, tokens):
         self.name = tokens[0][0]
 
+    def __repr__(self):
+        return self.name
+
 
 class ModelIdentifier(Identifier):
-    pass
+    __slots__ = ()
+
+
+class SortKey(ASTNode):
+    """
+    x [ ASC | DESC ], in ORDER BY
+    """
+    __slots__ = ('column', 'descending')
+    _fields = ('column',)
+
+    def __init__(self, tokens):
+        self.column = tokens[0][0]
+        self.descending = len(tokens[0]) > 1 and tokens[0][1].lower() == 'desc'
+
+    def __repr__(self):
+        return '{} {}'.format(self.column, 'desc' if self.descending else 'asc')
 
 
 class ProjectionExpression(ASTNode):
+    __slots__ = ('projection',)
+    _fields = ('projection',)
+
     def __init__(self, tokens):
         self.projection = tokens[0]
 
@@ -90,6 +185,9 @@ class PredicateExpression(ASTNode):
     Expression that can be used for filtering, such as in a SELECT, WHERE,
     ON clause, or HAVING function
     """
+    __slots__ = ('expression',)
+    _fields = ('expression',)
+
     def __init__(self, tokens):
         self.expression = tokens[0]
 
@@ -100,6 +198,9 @@ class Function(ASTNode):
 
     f(x,y)
     """
+    __slots__ = ('name', 'args')
+    _fields = ('args',)
+
     __metaclass__ = ABCMeta
 
     def __init__(self, tokens):
@@ -112,9 +213,20 @@ class UnaryOperator(Function):
     -x +x ~x
     not
     """
+    __slots__ = ('rhs',)
+    _fields = ('rhs',)
+
     def __init__(self, tokens):
         super(UnaryOperator, self).__init__(tokens)
-        self.rhs = self.args
+
+    # args is the operand, and always the same as rhs
+    @property
+    def args(self):
+        return self.rhs
+
+    @args.setter
+    def args(self, value):
+        self.rhs = value
 
     def __repr__(self):
         return '({} {})'.format(self.name, self.args)
@@ -125,16 +237,111 @@ class BinaryOperator(Function):
     x+y x-y x*y x**y x^y x/y
     | & << <<< >> >>> or xor and in
     """
+    __slots__ = ('lhs', 'rhs')
+    _fields = ('lhs', 'rhs')
+
     def __init__(self, tokens):
         self.lhs, self.name, self.rhs = tokens[0]
-        self.args = (self.lhs, self.rhs)
         # super(BinaryOperator, self).__init__()
 
+    # args is always (lhs, rhs)
+    @property
+    def args(self):
+        return (self.lhs, self.rhs)
+
+    @args.setter
+    def args(self, value):
+        self.lhs, self.rhs = value
+
     def __repr__(self):
         return '({} {} {})'.format(self.name, self.lhs, self.rhs)
 
 
+class BooleanOperator(Function):
+    """
+    x and y and z ...
+    x or y or z ...
+
+    Chain of the same AND or OR operator, with its operands in one list
+    (see transforms.flatten_boolean_operators)
+    """
+    __slots__ = ('operands',)
+    _fields = ('operands',)
+
+    def __init__(self, tokens):
+        super(BooleanOperator, self).__init__(tokens)
+        if not isinstance(self.operands, list):
+            self.operands = list(self.operands)
+
+    # args is always the operands
+    @property
+    def args(self):
+        return self.operands
+
+    @args.setter
+    def args(self, value):
+        self.operands = value
+
+    def __repr__(self):
+        return '({} {})'.format(self.name, ' '.join(repr(operand) for operand in self.operands))
+
+
+NOT_OPERATORS = ('not', '!')
+
+
+def negatable_operator(tokens):
+    """
+    Builds a BinaryOperator from [[lhs, op, rhs]] tokens, or its negation
+    from [[lhs, 'not', op, rhs]] or [[lhs, op, 'not', rhs]] tokens: x NOT LIKE y
+    is not (x LIKE y), x NOT BETWEEN y AND z is not (x BETWEEN y AND z), and
+    x IS NOT y is not (x IS y)
+    """
+    operator_tokens = list(tokens[0])
+    if len(operator_tokens) == 4:
+        lhs, first, second, rhs = operator_tokens
+        if first in NOT_OPERATORS:
+            not_name, op_name = first, second
+        else:
+            op_name, not_name = first, second
+        return UnaryOperator([[not_name, BinaryOperator([[lhs, op_name, rhs]])]])
+    return BinaryOperator([operator_tokens])
+
+
+def to_node(value):
+    """
+    Wraps python :value: in the equivalent Value node
+    (lists and tuples become a ListValue)
+    """
+    if isinstance(value, ASTNode):
+        return value
+    elif isinstance(value, (list, tuple)):
+        return ListValue([[to_node(v) for v in value]])
+    elif isinstance(value, str):
+        # StringValue strips the quotes from its token
+        return StringValue(['"{}"'.format(value)])
+    elif isinstance(value, int):  # including bool, as in SQL
+        return IntegerValue([str(int(value))])
+    elif isinstance(value, (float, Decimal)):
+        return RealValue([str(value)])
+
+    raise TypeError('Can not convert %s to a value node' % type(value).__name__)
+
+
 class Statement(ASTNode):
+    """
+    Parsed query, detached from pyparsing (see grammar.detach).
+    Clauses that weren't in the query are '', as with ParseResults.
+    """
+    _fields = ('columns', 'tables', 'where', 'order', 'limit', 'offset')
+
+    options = ''
+    columns = ''
+    tables = ''
+    where = ''
+    order = ''
+    limit = ''
+    offset = ''
+
     def __init__(self, **kwargs):
         for k, v in kwargs.items():
             setattr(self, k, v)
@@ -24,8 +24,108 @@
 
 __author__ = 'Ruslan Spivak <ruslan.spivak@gmail.com>'
 
+import copy
 
-class ASTVisitor(object):
+from .nodes import ASTNode
+
+# Visitors walk trees with an explicit stack rather than recursion, so that
+# machine-generated predicates with thousands of terms don't hit the
+# recursion limit.
+
+PRE_ORDER = 'pre'
+POST_ORDER = 'post'
+
+
+def iter_child_nodes(node):
+    """
+    Yields the direct child nodes of :node: (from the attributes named in
+    its _fields), in order
+    """
+    for name in node._fields:
+        value = getattr(node, name)
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                if isinstance(item, ASTNode):
+                    yield item
+
+
+def walk(node, order=PRE_ORDER):
+    """
+    Yields :node: and all of its descendant nodes, parents before their
+    children (PRE_ORDER) or children before their parents (POST_ORDER).
+    Siblings are yielded in order either way.
+    """
+    if order == PRE_ORDER:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(iter_child_nodes(node))))
+
+    elif order == POST_ORDER:
+        # (node, were its children pushed?)
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                yield node
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(list(iter_child_nodes(node))))
+
+    else:
+        raise ValueError('Unknown traversal order: %s' % order)
+
+
+class _Failure(object):
+    """
+    Exception raised while visiting a node ahead of its parent
+    """
+    __slots__ = ('exception',)
+
+    def __init__(self, exception):
+        self.exception = exception
+
+
+class Dispatcher(object):
+    """
+    Finds the visit_<ClassName> method for each class of node, falling back
+    to the methods for its base classes (e.g. a ModelIdentifier is visited
+    by visit_Identifier if there's no visit_ModelIdentifier).
+
+    Methods are looked up once per node class, and kept in a table for each
+    visitor class. Methods must be defined on the class (not set on
+    instances), before its first visit.
+    """
+    _dispatch_table = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super(Dispatcher, cls).__init_subclass__(**kwargs)
+        cls._dispatch_table = {}
+
+    @classmethod
+    def _lookup(cls, node_class):
+        """
+        Returns the (unbound) visit method for :node_class:, or None
+        """
+        try:
+            return cls._dispatch_table[node_class]
+        except KeyError:
+            pass
+
+        method = None
+        for klass in node_class.__mro__:
+            method = getattr(cls, 'visit_' + klass.__name__, None)
+            if method is not None:
+                break
+
+        cls._dispatch_table[node_class] = method
+        return method
+
+
+class ASTVisitor(Dispatcher):
     """Base class for custom AST node visitors.
 
     Example:
@@ -59,9 +159,64 @@ class ASTVisitor(object):
 
     """
 
+    # Visit the descendants of each node (bottom up, with an explicit stack)
+    # before the node itself, so that the self.visit(child) calls made by
+    # visit_<ClassName> methods return a result that's already known instead
+    # of recursing.
+    #
+    # Exceptions raised by descendants are only raised if (and when) their
+    # parent visits them. Visitors whose result for a node depends on where it
+    # is visited from (e.g. state set by its parent) should set this to False.
+    iterative = True
+
+    # Results of descendants visited ahead of their parents, by node id
+    _visited = None
+
     def visit(self, node):
-        method = 'visit_{}'.format(node.__class__.__name__)
-        return getattr(self, method, self.generic_visit)(node)
+        visited = self._visited
+        if visited is not None:
+            result = visited.pop(id(node), None)
+            if result is not None:
+                if isinstance(result, _Failure):
+                    raise result.exception
+                return result[0]
+
+        if not self.iterative or not isinstance(node, ASTNode) or not node._fields:
+            return self._dispatch(node)
+
+        outermost = visited is None
+        if outermost:
+            self._visited = visited = {}
+
+        try:
+            # Descendants that have children of their own (visiting a leaf
+            # doesn't recurse), parents first. Children are pushed in order,
+            # so the reverse of this puts children first, in order.
+            inner = []
+            stack = list(iter_child_nodes(node))
+            while stack:
+                descendant = stack.pop()
+                if descendant._fields:
+                    inner.append(descendant)
+                    stack.extend(iter_child_nodes(descendant))
+
+            for descendant in reversed(inner):
+                try:
+                    # Wrapped, to tell a visited None apart from no result
+                    visited[id(descendant)] = (self._dispatch(descendant),)
+                except Exception as err:
+                    visited[id(descendant)] = _Failure(err)
+
+            return self._dispatch(node)
+        finally:
+            if outermost:
+                self._visited = None
+
+    def _dispatch(self, node):
+        method = self._lookup(node.__class__)
+        if method is None:
+            return self.generic_visit(node)
+        return method(self, node)
 
     def generic_visit(self, node):
         for child in node:
@@ -72,11 +227,87 @@ class NodeVisitor(object):
     """Simple node visitor."""
 
     def visit(self, node):
-        """Returns a generator that walks all children recursively."""
-        for child in node:
-            yield child
-            for subchild in self.visit(child):
-                yield subchild
+        """
+        Returns a generator that walks all children (and their children, etc.)
+        of :node:, parents first. :node: is an ASTNode, or a list or
+        ParseResults of them.
+        """
+        stack = [iter(self._children(node))]
+        while stack:
+            for child in stack[-1]:
+                yield child
+                stack.append(iter(self._children(child)))
+                break
+            else:
+                stack.pop()
+
+    def _children(self, node):
+        if isinstance(node, ASTNode):
+            return iter_child_nodes(node)
+        elif isinstance(node, str):
+            return ()
+        try:
+            return iter(node)
+        except TypeError:
+            return ()
+
+
+class NodeTransformer(Dispatcher):
+    """
+    Rewrites trees bottom up: visit_<ClassName> methods are called with a
+    node whose children have already been transformed, and return the node
+    to replace it with (or the node itself to keep it). Nodes without a
+    visit method are kept.
+
+    Nodes are never modified, so trees can be shared (e.g. with a
+    PreparedQuery or the parse cache): a node whose children were replaced
+    is copied first.
+    """
+    def visit(self, node):
+        if not isinstance(node, ASTNode):
+            return node
+
+        # (node, its children, or None if they haven't been pushed yet)
+        stack = [(node, None)]
+        results = []  # transformed nodes, popped by their parents
+        while stack:
+            node, children = stack.pop()
+            if children is None:
+                children = list(iter_child_nodes(node))
+                if children:
+                    stack.append((node, children))
+                    stack.extend((child, None) for child in reversed(children))
+                    continue
+
+            if children:
+                transformed = results[-len(children):]
+                del results[-len(children):]
+                node = self._replace_children(node, children, transformed)
+
+            results.append(self._dispatch(node))
+
+        return results[0]
+
+    def _dispatch(self, node):
+        method = self._lookup(node.__class__)
+        return node if method is None else method(self, node)
+
+    def _replace_children(self, node, children, transformed):
+        if all(old is new for old, new in zip(children, transformed)):
+            return node
+
+        replacements = iter(transformed)
+        node = copy.copy(node)
+        for name in node._fields:
+            value = getattr(node, name)
+            if isinstance(value, ASTNode):
+                setattr(node, name, next(replacements))
+            elif isinstance(value, (list, tuple)):
+                setattr(node, name, type(value)(
+                    next(replacements) if isinstance(item, ASTNode) else item
+                    for item in value))
+
+        return node
 
 
 def visit(node):
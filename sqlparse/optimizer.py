@@ -0,0 +1,436 @@
+"""
+Logical optimizations of WHERE expressions, run by the query builders
+before building a query (see QueryBuilder.optimize):
+
+    - constant folding: comparisons of literals, and TRUE/FALSE operands of
+      AND, OR, XOR and NOT
+    - double negation removal: not not x -> x
+    - De Morgan pushdown: not (x and y) -> not x or not y, down to
+      comparisons, which are inverted: not x < 1 -> x >= 1
+    - x = a or x = b or x in (c, d) -> x in (a, b, c, d)
+    - merging ranges on the same column: x >= 1 and x <= 5 and x between 2 and 9
+      -> x between 2 and 5, and x between 1 and 5 or x between 3 and 8
+      -> x between 1 and 8
+    - removing duplicate operands of AND and OR
+    - contradictions, such as x = 1 and x = 2, or x between 5 and 1 -> FALSE
+
+All of these keep the meaning of the expression under SQL's three-valued
+logic (where comparisons with NULL are neither true nor false), except for
+contradictions: they're UNKNOWN rather than FALSE for NULL, so they're only
+folded where that makes no difference (outside of NOT and XOR).
+"""
+import operator
+
+from . import nodes
+from .nodevisitor import NodeTransformer
+from .transforms import BOOLEAN_OPERATORS, flatten_boolean_operators
+
+NOT_OPERATORS = frozenset(['not', '!'])
+
+COMPARISONS = {
+    '=': operator.eq,
+    '<=>': operator.eq,  # same as = for literals, which are never NULL
+    '!=': operator.ne,
+    '<>': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+# Comparison that's true when the key is false, and vice versa (both are
+# UNKNOWN for NULL). Not so for <=>, which is never UNKNOWN.
+INVERTED_COMPARISONS = {
+    '=': '!=',
+    '!=': '=',
+    '<>': '=',
+    '<': '>=',
+    '<=': '>',
+    '>': '<=',
+    '>=': '<',
+}
+
+# Comparisons that bound a range: operator -> (is it a lower bound?, is it inclusive?)
+RANGE_COMPARISONS = {
+    '>': (True, False),
+    '>=': (True, True),
+    '<': (False, False),
+    '<=': (False, True),
+}
+
+TRUE = 'true'
+FALSE = 'false'
+
+
+def _boolean(value):
+    return nodes.BooleanValue([TRUE if value else FALSE])
+
+
+def _literal(node):
+    """
+    Returns ('number' or 'string', value) for literal :node:, or None
+    """
+    if isinstance(node, (nodes.IntegerValue, nodes.RealValue)):
+        return 'number', node.value
+    elif isinstance(node, nodes.StringValue):
+        return 'string', node.value
+    return None
+
+
+def _number(node):
+    """
+    Returns the value of number literal :node:, or None
+    """
+    if isinstance(node, (nodes.IntegerValue, nodes.RealValue)):
+        return node.value
+    return None
+
+
+def _column(node):
+    """
+    Returns the name of the column :node: compares to something, or None
+    """
+    if isinstance(node, nodes.BinaryOperator) and isinstance(node.lhs, nodes.Identifier):
+        return node.lhs.name
+    return None
+
+
+def _key(node):
+    """
+    Structural key of :node:, that's equal for equivalent trees
+    """
+    if isinstance(node, nodes.Placeholder):
+        return 'placeholder', id(node)  # bound separately
+    elif isinstance(node, (nodes.StringValue, nodes.IntegerValue, nodes.RealValue, nodes.BooleanValue, nodes.NullValue)):
+        return type(node).__name__, node.value
+    elif isinstance(node, nodes.Identifier):
+        return 'identifier', node.name
+    elif isinstance(node, nodes.RangeValue):
+        return 'range', _key(node.begin), _key(node.end)
+    elif isinstance(node, nodes.ListValue):
+        return ('list',) + tuple(_key(value) for value in node.values)
+    elif isinstance(node, nodes.BooleanOperator):
+        # AND and OR are commutative
+        return 'BooleanOperator', node.name, frozenset(_key(operand) for operand in node.operands)
+    elif isinstance(node, nodes.Function):
+        args = node.args if isinstance(node.args, (list, tuple)) else [node.args]
+        return (type(node).__name__, node.name) + tuple(_key(arg) for arg in args)
+    elif isinstance(node, (list, tuple)):
+        return ('list',) + tuple(_key(item) for item in node)
+    return type(node).__name__, node
+
+
+def _between(column, begin, end):
+    return nodes.BinaryOperator([[column, 'between', nodes.RangeValue([[begin, end]])]])
+
+
+def _comparison(column, op_name, value):
+    return nodes.BinaryOperator([[column, op_name, value]])
+
+
+class Optimizer(NodeTransformer):
+    """
+    Rewrites that keep the meaning of any expression (see module docs)
+    """
+    def visit_UnaryOperator(self, node):
+        if node.name in NOT_OPERATORS:
+            return self._negate(node.rhs)
+        return node
+
+    def visit_BinaryOperator(self, node):
+        if node.name in BOOLEAN_OPERATORS:
+            return self.visit_BooleanOperator(nodes.BooleanOperator([[
+                BOOLEAN_OPERATORS[node.name], [node.lhs, node.rhs]]]))
+
+        if node.name in ('xor', '^'):
+            return self._fold_xor(node)
+
+        # Comparison of literals
+        op_func = COMPARISONS.get(node.name)
+        lhs, rhs = _literal(node.lhs), _literal(node.rhs)
+        if op_func is not None and lhs is not None and rhs is not None and lhs[0] == rhs[0]:
+            return _boolean(op_func(lhs[1], rhs[1]))
+
+        return node
+
+    def visit_BooleanOperator(self, node):
+        operands = []
+        for operand in node.operands:
+            # Chains made by De Morgan pushdown
+            if isinstance(operand, nodes.BooleanOperator) and operand.name == node.name:
+                operands.extend(operand.operands)
+            else:
+                operands.append(operand)
+
+        operands = self._fold_constants(node.name, operands)
+        if isinstance(operands, nodes.BooleanValue):
+            return operands
+
+        operands = self._remove_duplicates(operands)
+        if node.name == 'or':
+            operands = self._merge_equalities(operands)
+            operands = self._merge_range_unions(operands)
+        else:
+            operands = self._merge_range_bounds(operands)
+
+        if len(operands) == 1:
+            return operands[0]
+        return nodes.BooleanOperator([[node.name, operands]])
+
+    def _negate(self, node):
+        """
+        not :node:, pushed down as far as it goes
+        """
+        if isinstance(node, nodes.BooleanValue):
+            return _boolean(not node.value)
+
+        elif isinstance(node, nodes.UnaryOperator) and node.name in NOT_OPERATORS:
+            return node.rhs
+
+        elif isinstance(node, nodes.BooleanOperator):
+            # De Morgan
+            return self.visit_BooleanOperator(nodes.BooleanOperator([[
+                'or' if node.name == 'and' else 'and',
+                [self._negate(operand) for operand in node.operands]]]))
+
+        elif isinstance(node, nodes.BinaryOperator) and node.name in INVERTED_COMPARISONS:
+            return _comparison(node.lhs, INVERTED_COMPARISONS[node.name], node.rhs)
+
+        return nodes.UnaryOperator([['not', node]])
+
+    def _fold_xor(self, node):
+        for constant, other in ((node.lhs, node.rhs), (node.rhs, node.lhs)):
+            if isinstance(constant, nodes.BooleanValue):
+                return self._negate(other) if constant.value else other
+        return node
+
+    def _fold_constants(self, op_name, operands):
+        """
+        Drops TRUE from AND (FALSE from OR), returning the BooleanValue the
+        whole operator folds to if there's nothing left, or FALSE in an AND
+        (TRUE in an OR)
+        """
+        identity = op_name == 'and'
+        remaining = []
+        for operand in operands:
+            if isinstance(operand, nodes.BooleanValue):
+                if operand.value != identity:
+                    return operand
+            else:
+                remaining.append(operand)
+
+        if not remaining:
+            return _boolean(identity)
+        return remaining
+
+    def _remove_duplicates(self, operands):
+        seen = set()
+        unique = []
+        for operand in operands:
+            key = _key(operand)
+            if key not in seen:
+                seen.add(key)
+                unique.append(operand)
+
+        return unique
+
+    def _merge_equalities(self, operands):
+        """
+        x = a or x in (b, c) or ... -> x in (a, b, c, ...), in place of the first
+        """
+        groups = {}  # column name -> [operand indexes]
+        for index, operand in enumerate(operands):
+            column = _column(operand)
+            if column is None:
+                continue
+
+            if operand.name == '=' and _literal(operand.rhs) is not None:
+                groups.setdefault(column, []).append(index)
+            elif (operand.name == 'in' and isinstance(operand.rhs, nodes.ListValue) and
+                    all(_literal(value) is not None for value in operand.rhs.values)):
+                groups.setdefault(column, []).append(index)
+
+        replacements = {}
+        for indexes in groups.values():
+            if len(indexes) < 2:
+                continue
+
+            values = []
+            seen = set()
+            for index in indexes:
+                operand = operands[index]
+                for value in (operand.rhs.values if operand.name == 'in' else [operand.rhs]):
+                    if _key(value) not in seen:
+                        seen.add(_key(value))
+                        values.append(value)
+
+            column = operands[indexes[0]].lhs
+            if len(values) == 1:
+                merged = _comparison(column, '=', values[0])
+            else:
+                merged = nodes.BinaryOperator([[column, 'in', nodes.ListValue([values])]])
+
+            replacements[indexes[0]] = merged
+            for index in indexes[1:]:
+                replacements[index] = None
+
+        return self._replace(operands, replacements)
+
+    def _merge_range_unions(self, operands):
+        """
+        x between 1 and 5 or x between 3 and 8 -> x between 1 and 8, in place
+        of the first
+        """
+        groups = {}  # column name -> [[begin, end, begin node, end node, operand index]]
+        for index, operand in enumerate(operands):
+            if _column(operand) is not None and operand.name == 'between':
+                begin, end = _number(operand.rhs.begin), _number(operand.rhs.end)
+                if begin is not None and end is not None and begin <= end:
+                    groups.setdefault(_column(operand), []).append(
+                        [begin, end, operand.rhs.begin, operand.rhs.end, index])
+
+        replacements = {}
+        for ranges in groups.values():
+            indexes = sorted(r[-1] for r in ranges)
+
+            ranges.sort(key=lambda r: (r[0], r[1]))
+            merged = [ranges[0]]
+            for current in ranges[1:]:
+                previous = merged[-1]
+                if current[0] <= previous[1]:
+                    # Overlapping
+                    if current[1] > previous[1]:
+                        previous[1], previous[3] = current[1], current[3]
+                else:
+                    merged.append(current)
+
+            if len(merged) == len(ranges):
+                continue
+
+            column = operands[indexes[0]].lhs
+            replacements[indexes[0]] = [_between(column, r[2], r[3]) for r in merged]
+            for index in indexes[1:]:
+                replacements[index] = None
+
+        return self._replace(operands, replacements)
+
+    def _merge_range_bounds(self, operands):
+        """
+        x >= 1 and x < 5 and x between 2 and 9 -> x between 2 and 5 (or, when
+        a bound is exclusive, x >= 2 and x < 5), in place of the first
+        """
+        groups = {}  # column name -> [(is lower, value, inclusive, value node, operand index)]
+        for index, operand in enumerate(operands):
+            column = _column(operand)
+            if column is None:
+                continue
+
+            if operand.name in RANGE_COMPARISONS and _number(operand.rhs) is not None:
+                lower, inclusive = RANGE_COMPARISONS[operand.name]
+                groups.setdefault(column, []).append((lower, _number(operand.rhs), inclusive, operand.rhs, index))
+
+            elif operand.name == 'between':
+                begin, end = _number(operand.rhs.begin), _number(operand.rhs.end)
+                if begin is not None and end is not None:
+                    bounds = groups.setdefault(column, [])
+                    bounds.append((True, begin, True, operand.rhs.begin, index))
+                    bounds.append((False, end, True, operand.rhs.end, index))
+
+        replacements = {}
+        for bounds in groups.values():
+            indexes = sorted(set(bound[-1] for bound in bounds))
+            if len(indexes) < 2:
+                continue
+
+            # Tightest bounds: the highest lower bound and the lowest upper
+            # bound, exclusive before inclusive on a tie
+            lower = max((b for b in bounds if b[0]), key=lambda b: (b[1], not b[2]), default=None)
+            upper = min((b for b in bounds if not b[0]), key=lambda b: (b[1], b[2]), default=None)
+
+            column = operands[indexes[0]].lhs
+            if lower is not None and upper is not None and lower[2] and upper[2]:
+                replacement = [_between(column, lower[3], upper[3])]
+            else:
+                replacement = []
+                if lower is not None:
+                    replacement.append(_comparison(column, '>=' if lower[2] else '>', lower[3]))
+                if upper is not None:
+                    replacement.append(_comparison(column, '<=' if upper[2] else '<', upper[3]))
+
+            replacements[indexes[0]] = replacement
+            for index in indexes[1:]:
+                replacements[index] = None
+
+        return self._replace(operands, replacements)
+
+    def _replace(self, operands, replacements):
+        """
+        Replaces operands[index] with each node (or list of nodes) in
+        :replacements:, by index. None removes the operand.
+        """
+        if not replacements:
+            return operands
+
+        result = []
+        for index, operand in enumerate(operands):
+            if index not in replacements:
+                result.append(operand)
+            elif isinstance(replacements[index], list):
+                result.extend(replacements[index])
+            elif replacements[index] is not None:
+                result.append(replacements[index])
+
+        return result
+
+
+def _is_contradiction(conjuncts):
+    """
+    Can :conjuncts: (operands of an AND) never all be true?
+    """
+    equalities = {}  # column name -> literal
+    for conjunct in conjuncts:
+        column = _column(conjunct)
+        if column is None:
+            continue
+
+        if conjunct.name == 'between':
+            begin, end = _number(conjunct.rhs.begin), _number(conjunct.rhs.end)
+            if begin is not None and end is not None and begin > end:
+                return True
+
+        elif conjunct.name == '=' and _literal(conjunct.rhs) is not None:
+            literal = _literal(conjunct.rhs)
+            other = equalities.setdefault(column, literal)
+            if other[0] == literal[0] and other[1] != literal[1]:
+                return True
+
+    return False
+
+
+def _fold_contradictions(node):
+    """
+    Replaces contradictions in :node: with FALSE where FALSE and UNKNOWN mean
+    the same thing (in a WHERE clause, and under AND and OR)
+    """
+    if isinstance(node, nodes.BooleanOperator):
+        operands = [_fold_contradictions(operand) for operand in node.operands]
+        if node.name == 'and' and _is_contradiction(operands):
+            return _boolean(False)
+
+        if any(o is not n for o, n in zip(operands, node.operands)):
+            return Optimizer().visit_BooleanOperator(nodes.BooleanOperator([[node.name, operands]]))
+        return node
+
+    if _is_contradiction([node]):
+        return _boolean(False)
+    return node
+
+
+def optimize(where):
+    """
+    Returns an optimized equivalent of WHERE expression :where: (which is left
+    unchanged). AND and OR chains are flattened into BooleanOperators, and
+    the whole expression may fold to a BooleanValue.
+    """
+    where = Optimizer().visit(flatten_boolean_operators(where))
+    return _fold_contradictions(where)
@@ -0,0 +1,133 @@
+import copy
+
+import sqlparse
+from . import nodes
+
+
+class PreparedQuery(object):
+    """
+    Query that's parsed once, and then has values bound to its ? (positional)
+    and :name (named) placeholders each time it's built:
+
+    >>> query = PreparedQuery('select * from User where age > ? and name = :name')
+    >>> criteria, options = query.build(MongoQueryBuilder(), 30, name='Chris')
+
+    A list bound to a placeholder in an IN list is spliced into it:
+
+    >>> query = PreparedQuery('select * from User where id in (?)')
+    >>> sqlalchemy_query = query.build(sqlalchemy_builder, [1, 2, 3])
+    """
+    def __init__(self, query_string, backend='pyparsing'):
+        self.query_string = query_string
+        self.parse_tree = sqlparse.parse_string(query_string, backend=backend)
+        self.where = self.parse_tree.where[0] if self.parse_tree.where else None
+
+        # Placeholders in query order, and ids of the nodes above them
+        # (only those nodes are copied when binding)
+        self.placeholders = []
+        self._bound_paths = set()
+        if self.where is not None:
+            self._find_placeholders(self.where)
+
+        positional = [p for p in self.placeholders if p.name is None]
+        for index, placeholder in enumerate(positional):
+            placeholder.index = index
+
+        self.positional_count = len(positional)
+        self.names = frozenset(p.name for p in self.placeholders if p.name is not None)
+
+    def bind(self, *args, **kwargs):
+        """
+        Returns a parse tree with :args: bound to the positional placeholders
+        and :kwargs: bound to the named ones, ready for QueryBuilder.build.
+
+        Subtrees without placeholders are shared with the prepared parse tree,
+        so the result must be treated as read-only.
+        """
+        if len(args) != self.positional_count:
+            raise ValueError('Query has %d positional placeholders, but %d values were given' %
+                             (self.positional_count, len(args)))
+
+        missing = self.names.difference(kwargs)
+        if missing:
+            raise ValueError('No values given for placeholders: %s' % ', '.join(sorted(missing)))
+
+        unknown = set(kwargs).difference(self.names)
+        if unknown:
+            raise ValueError('Query has no placeholders named: %s' % ', '.join(sorted(unknown)))
+
+        where = ''
+        if self.where is not None:
+            where = [self._bind(self.where, args, kwargs)]
+
+        return nodes.Statement(
+            options=self.parse_tree.options,
+            columns=self.parse_tree.columns,
+            tables=self.parse_tree.tables,
+            where=where,
+            order=self.parse_tree.order,
+            limit=self.parse_tree.limit,
+            offset=self.parse_tree.offset)
+
+    def build(self, builder, *args, **kwargs):
+        """
+        Binds :args: and :kwargs: (see bind) and builds a query with :builder:,
+        without re-parsing the query string
+        """
+        return builder.build(self.bind(*args, **kwargs))
+
+    def _find_placeholders(self, node):
+        """
+        Collects the placeholders under :node:, returning True if there were any
+        """
+        if isinstance(node, nodes.Placeholder):
+            self.placeholders.append(node)
+            found = True
+        elif isinstance(node, nodes.BinaryOperator):
+            found = self._find_placeholders(node.lhs) | self._find_placeholders(node.rhs)
+        elif isinstance(node, nodes.UnaryOperator):
+            found = self._find_placeholders(node.rhs)
+        elif isinstance(node, nodes.RangeValue):
+            found = self._find_placeholders(node.begin) | self._find_placeholders(node.end)
+        elif isinstance(node, nodes.ListValue):
+            found = False
+            for value in node.values:
+                found |= self._find_placeholders(value)
+        else:
+            found = False
+
+        if found:
+            self._bound_paths.add(id(node))
+
+        return found
+
+    def _bind(self, node, args, kwargs):
+        if id(node) not in self._bound_paths:
+            return node
+
+        if isinstance(node, nodes.Placeholder):
+            value = args[node.index] if node.name is None else kwargs[node.name]
+            return nodes.to_node(value)
+
+        bound = copy.copy(node)
+        if isinstance(node, nodes.BinaryOperator):
+            bound.lhs = self._bind(node.lhs, args, kwargs)
+            bound.rhs = self._bind(node.rhs, args, kwargs)
+
+        elif isinstance(node, nodes.UnaryOperator):
+            bound.rhs = self._bind(node.rhs, args, kwargs)
+
+        elif isinstance(node, nodes.RangeValue):
+            bound.begin = self._bind(node.begin, args, kwargs)
+            bound.end = self._bind(node.end, args, kwargs)
+
+        elif isinstance(node, nodes.ListValue):
+            bound.values = []
+            for value in node.values:
+                bound_value = self._bind(value, args, kwargs)
+                if isinstance(value, nodes.Placeholder) and isinstance(bound_value, nodes.ListValue):
+                    bound.values.extend(bound_value.values)
+                else:
+                    bound.values.append(bound_value)
+
+        return bound
@@ -0,0 +1,496 @@
+"""
+Compact binary encoding of parsed queries (sqlparse.nodes trees), for
+caching them or sending them to other processes without re-parsing.
+
+The encoding is tag-length-value: every value is a one byte tag, followed
+by its fields. Integers and lengths are variable length (7 bits per byte,
+least significant first), and every string is only written out once:
+later occurrences refer back to it by index. loads rebuilds the node
+objects directly, without going through their constructors or pyparsing.
+
+    data = serialize.dumps(sqlparse.parse_string(query_string))
+    ast = serialize.loads(data)  # a nodes.Statement
+"""
+from decimal import Decimal
+
+from .nodes import (
+    BinaryOperator, BooleanOperator, BooleanValue, Function, Identifier, IntegerValue, ListValue,
+    ModelIdentifier, NullValue, Placeholder, PredicateExpression, ProjectionExpression, RangeValue,
+    RealValue, SortKey, Statement, StringValue, UnaryOperator,
+)
+
+# Leading bytes of every encoding; the last one is the format version
+MAGIC = b'SQP'
+VERSION = 1
+HEADER = MAGIC + bytes([VERSION])
+
+# Value tags
+(
+    NONE, STRING, LIST,
+    STRING_VALUE, INTEGER_VALUE, REAL_VALUE, TRUE, FALSE, NULL, LIST_VALUE, RANGE_VALUE,
+    PLACEHOLDER, IDENTIFIER, MODEL_IDENTIFIER, SORT_KEY, PROJECTION_EXPRESSION,
+    PREDICATE_EXPRESSION, FUNCTION, UNARY_OPERATOR, BINARY_OPERATOR, BOOLEAN_OPERATOR,
+    STATEMENT,
+) = range(22)
+
+_new = object.__new__
+
+
+################################
+# Encoding
+################################
+
+class _Writer(object):
+    def __init__(self):
+        self.buffer = bytearray(HEADER)
+        self.strings = {}
+
+    def uint(self, number):
+        buffer = self.buffer
+        while number > 0x7f:
+            buffer.append(number & 0x7f | 0x80)
+            number >>= 7
+        buffer.append(number)
+
+    def int(self, number):
+        # zigzag encoding, so that small negative numbers stay short
+        self.uint(number << 1 if number >= 0 else (-number << 1) - 1)
+
+    def string(self, string):
+        index = self.strings.get(string)
+        if index is not None:
+            self.uint(index << 1 | 1)
+            return
+
+        self.strings[string] = len(self.strings)
+        data = string.encode('utf-8')
+        self.uint(len(data) << 1)
+        self.buffer += data
+
+    def optional_string(self, string):
+        if string is None:
+            self.buffer.append(0)
+        else:
+            self.buffer.append(1)
+            self.string(string)
+
+    def value(self, value):
+        encode = _ENCODERS.get(type(value))
+        if encode is None:
+            encode = _encode_other
+        encode(self, value)
+
+
+def _encode_none(writer, value):
+    writer.buffer.append(NONE)
+
+
+def _encode_str(writer, value):
+    writer.buffer.append(STRING)
+    writer.string(value)
+
+
+def _encode_list(writer, values):
+    writer.buffer.append(LIST)
+    writer.uint(len(values))
+    for value in values:
+        writer.value(value)
+
+
+def _encode_string_value(writer, node):
+    writer.buffer.append(STRING_VALUE)
+    writer.string(node.value)
+
+
+def _encode_integer_value(writer, node):
+    writer.buffer.append(INTEGER_VALUE)
+    writer.int(node.value)
+
+
+def _encode_real_value(writer, node):
+    writer.buffer.append(REAL_VALUE)
+    writer.string(str(node.value))
+
+
+def _encode_boolean_value(writer, node):
+    writer.buffer.append(TRUE if node.value else FALSE)
+
+
+def _encode_null_value(writer, node):
+    writer.buffer.append(NULL)
+
+
+def _encode_list_value(writer, node):
+    writer.buffer.append(LIST_VALUE)
+    writer.buffer.append(1 if node.frozen else 0)
+    writer.uint(len(node.values))
+    for value in node.values:
+        writer.value(value)
+
+
+def _encode_range_value(writer, node):
+    writer.buffer.append(RANGE_VALUE)
+    writer.value(node.begin)
+    writer.value(node.end)
+
+
+def _encode_placeholder(writer, node):
+    writer.buffer.append(PLACEHOLDER)
+    writer.optional_string(node.name)
+    writer.uint(0 if node.index is None else node.index + 1)
+
+
+def _encode_identifier(writer, node):
+    writer.buffer.append(IDENTIFIER)
+    writer.string(node.name)
+
+
+def _encode_model_identifier(writer, node):
+    writer.buffer.append(MODEL_IDENTIFIER)
+    writer.string(node.name)
+
+
+def _encode_sort_key(writer, node):
+    writer.buffer.append(SORT_KEY)
+    writer.buffer.append(1 if node.descending else 0)
+    writer.value(node.column)
+
+
+def _encode_projection_expression(writer, node):
+    writer.buffer.append(PROJECTION_EXPRESSION)
+    writer.value(node.projection)
+
+
+def _encode_predicate_expression(writer, node):
+    writer.buffer.append(PREDICATE_EXPRESSION)
+    writer.value(node.expression)
+
+
+def _encode_function(writer, node):
+    writer.buffer.append(FUNCTION)
+    writer.string(node.name)
+    writer.value(node.args)
+
+
+def _encode_unary_operator(writer, node):
+    writer.buffer.append(UNARY_OPERATOR)
+    writer.string(node.name)
+    writer.value(node.rhs)
+
+
+def _encode_binary_operator(writer, node):
+    writer.buffer.append(BINARY_OPERATOR)
+    writer.string(node.name)
+    writer.value(node.lhs)
+    writer.value(node.rhs)
+
+
+def _encode_boolean_operator(writer, node):
+    writer.buffer.append(BOOLEAN_OPERATOR)
+    writer.string(node.name)
+    writer.uint(len(node.operands))
+    for operand in node.operands:
+        writer.value(operand)
+
+
+def _encode_statement(writer, node):
+    # Only the clauses set on the statement; the rest are the class' ''
+    writer.buffer.append(STATEMENT)
+    writer.uint(len(node.__dict__))
+    for name, value in node.__dict__.items():
+        writer.string(name)
+        writer.value(value)
+
+
+def _encode_other(writer, value):
+    # pyparsing results: a parsed query (with named clauses) is detached into
+    # a Statement, and anything else is encoded as a list
+    from pyparsing import ParseResults
+
+    if isinstance(value, ParseResults):
+        if value.haskeys():
+            from .grammar import detach
+            _encode_statement(writer, detach(value))
+        else:
+            _encode_list(writer, list(value))
+    elif isinstance(value, tuple):
+        _encode_list(writer, value)
+    else:
+        raise TypeError('Can not serialize %s' % type(value).__name__)
+
+
+_ENCODERS = {
+    type(None): _encode_none,
+    str: _encode_str,
+    list: _encode_list,
+    StringValue: _encode_string_value,
+    IntegerValue: _encode_integer_value,
+    RealValue: _encode_real_value,
+    BooleanValue: _encode_boolean_value,
+    NullValue: _encode_null_value,
+    ListValue: _encode_list_value,
+    RangeValue: _encode_range_value,
+    Placeholder: _encode_placeholder,
+    Identifier: _encode_identifier,
+    ModelIdentifier: _encode_model_identifier,
+    SortKey: _encode_sort_key,
+    ProjectionExpression: _encode_projection_expression,
+    PredicateExpression: _encode_predicate_expression,
+    Function: _encode_function,
+    UnaryOperator: _encode_unary_operator,
+    BinaryOperator: _encode_binary_operator,
+    BooleanOperator: _encode_boolean_operator,
+    Statement: _encode_statement,
+}
+
+
+def dumps(ast):
+    """
+    Encodes :ast: as bytes: a parsed query (from sqlparse.parse_string, with
+    either backend, detached or not), or any node or list of nodes in it.
+
+    pyparsing results are encoded as their detached form (see
+    grammar.detach), so loads returns a nodes.Statement for them.
+    Raises TypeError for values that aren't part of a parse tree.
+    """
+    writer = _Writer()
+    writer.value(ast)
+    return bytes(writer.buffer)
+
+
+################################
+# Decoding
+################################
+
+class _Reader(object):
+    __slots__ = ('data', 'pos', 'strings')
+
+    def __init__(self, data, pos):
+        self.data = data
+        self.pos = pos
+        self.strings = []
+
+    def uint(self):
+        data = self.data
+        pos = self.pos
+        byte = data[pos]
+        pos += 1
+        if byte < 0x80:  # most numbers (lengths, string indexes) fit in one byte
+            self.pos = pos
+            return byte
+
+        number = byte & 0x7f
+        shift = 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            number |= (byte & 0x7f) << shift
+            shift += 7
+        self.pos = pos
+        return number
+
+    def int(self):
+        number = self.uint()
+        return -((number + 1) >> 1) if number & 1 else number >> 1
+
+    def flag(self):
+        flag = self.data[self.pos]
+        self.pos += 1
+        return flag == 1
+
+    def string(self):
+        header = self.data[self.pos]
+        if header < 0x80:
+            self.pos += 1
+        else:
+            header = self.uint()
+        if header & 1:
+            return self.strings[header >> 1]
+
+        start = self.pos
+        end = self.pos = start + (header >> 1)
+        if end > len(self.data):
+            raise IndexError('string runs past the end of the data')
+
+        string = self.data[start:end].decode('utf-8')
+        self.strings.append(string)
+        return string
+
+    def optional_string(self):
+        return self.string() if self.flag() else None
+
+    def value(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        return _DECODERS[tag](self)
+
+
+def _decode_none(reader):
+    return None
+
+
+def _decode_str(reader):
+    return reader.string()
+
+
+def _decode_list(reader):
+    value = reader.value
+    return [value() for _ in range(reader.uint())]
+
+
+def _decode_string_value(reader):
+    node = _new(StringValue)
+    node.value = reader.string()
+    return node
+
+
+def _decode_integer_value(reader):
+    node = _new(IntegerValue)
+    node.value = reader.int()
+    return node
+
+
+def _decode_real_value(reader):
+    node = _new(RealValue)
+    node.value = Decimal(reader.string())
+    return node
+
+
+def _decode_true(reader):
+    node = _new(BooleanValue)
+    node.value = True
+    return node
+
+
+def _decode_false(reader):
+    node = _new(BooleanValue)
+    node.value = False
+    return node
+
+
+def _decode_null(reader):
+    return _new(NullValue)
+
+
+def _decode_list_value(reader):
+    node = _new(ListValue)
+    node.frozen = reader.flag()
+    node.values = _decode_list(reader)
+    return node
+
+
+def _decode_range_value(reader):
+    node = _new(RangeValue)
+    node.begin = reader.value()
+    node.end = reader.value()
+    return node
+
+
+def _decode_placeholder(reader):
+    node = _new(Placeholder)
+    node.name = reader.optional_string()
+    index = reader.uint()
+    node.index = index - 1 if index else None
+    return node
+
+
+def _decode_identifier(reader):
+    node = _new(Identifier)
+    node.name = reader.string()
+    return node
+
+
+def _decode_model_identifier(reader):
+    node = _new(ModelIdentifier)
+    node.name = reader.string()
+    return node
+
+
+def _decode_sort_key(reader):
+    node = _new(SortKey)
+    node.descending = reader.flag()
+    node.column = reader.value()
+    return node
+
+
+def _decode_projection_expression(reader):
+    node = _new(ProjectionExpression)
+    node.projection = reader.value()
+    return node
+
+
+def _decode_predicate_expression(reader):
+    node = _new(PredicateExpression)
+    node.expression = reader.value()
+    return node
+
+
+def _decode_function(reader):
+    node = _new(Function)
+    node.name = reader.string()
+    node.args = reader.value()
+    return node
+
+
+def _decode_unary_operator(reader):
+    node = _new(UnaryOperator)
+    node.name = reader.string()
+    node.rhs = reader.value()
+    return node
+
+
+def _decode_binary_operator(reader):
+    node = _new(BinaryOperator)
+    node.name = reader.string()
+    node.lhs = reader.value()
+    node.rhs = reader.value()
+    return node
+
+
+def _decode_boolean_operator(reader):
+    node = _new(BooleanOperator)
+    node.name = reader.string()
+    node.operands = _decode_list(reader)
+    return node
+
+
+def _decode_statement(reader):
+    node = _new(Statement)
+    for _ in range(reader.uint()):
+        name = reader.string()
+        setattr(node, name, reader.value())
+    return node
+
+
+# Decoders, by tag
+_DECODERS = [
+    _decode_none, _decode_str, _decode_list,
+    _decode_string_value, _decode_integer_value, _decode_real_value, _decode_true, _decode_false,
+    _decode_null, _decode_list_value, _decode_range_value, _decode_placeholder, _decode_identifier,
+    _decode_model_identifier, _decode_sort_key, _decode_projection_expression,
+    _decode_predicate_expression, _decode_function, _decode_unary_operator, _decode_binary_operator,
+    _decode_boolean_operator, _decode_statement,
+]
+
+
+def loads(data):
+    """
+    Decodes a parse tree encoded by dumps from :data: (bytes, or any other
+    bytes-like object). Raises ValueError if :data: isn't a valid encoding,
+    or was written by a newer version of the format.
+    """
+    data = bytes(data)
+    if data[:len(MAGIC)] != MAGIC or len(data) <= len(HEADER):
+        raise ValueError('Not a serialized parse tree')
+    if data[len(MAGIC)] != VERSION:
+        raise ValueError('Unsupported serialization format version: %d' % data[len(MAGIC)])
+
+    reader = _Reader(data, len(HEADER))
+    try:
+        ast = reader.value()
+    except (IndexError, UnicodeDecodeError, ArithmeticError) as err:
+        raise ValueError('Corrupt serialized parse tree: %s' % err)
+
+    if reader.pos != len(data):
+        raise ValueError('Corrupt serialized parse tree: %d trailing bytes' % (len(data) - reader.pos))
+    return ast
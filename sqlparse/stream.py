@@ -0,0 +1,143 @@
+"""
+Splits SQL scripts into statements and parses them one at a time, reading the
+script incrementally so that arbitrarily large files can be processed in
+constant memory (bounded by the size of the largest statement)
+"""
+import codecs
+import re
+
+import sqlparse
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Things that matter outside of quotes and comments. A trailing '-' might be
+# the start of a '--' comment that continues in the next chunk.
+_UNQUOTED_RE = re.compile(r'''[;'"#]|--|-\Z''')
+
+# Escapes and closing quotes in quoted strings. A trailing backslash escapes
+# the first character of the next chunk.
+_QUOTED_RES = {
+    "'": re.compile(r"\\.|\\\Z|'", re.DOTALL),
+    '"': re.compile(r'\\.|\\\Z|"', re.DOTALL),
+}
+
+_COMMENT = '#'
+
+
+def _read_chunks(source, chunk_size, encoding):
+    """
+    Yields text from :source: in chunks of up to :chunk_size: characters
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+
+    decoder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            break
+
+        if isinstance(chunk, bytes):
+            # Multi-byte characters may be split between chunks
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)()
+            chunk = decoder.decode(chunk)
+
+        yield chunk
+
+    if decoder is not None:
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+
+def split_statements(source, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8'):
+    """
+    Yields the text of each statement in :source:, which is a string, a text
+    or binary file object, or a memory-mapped file (bytes are decoded with
+    :encoding:). Statements end at semicolons outside of quoted strings and
+    comments. Statements that contain nothing but whitespace and comments
+    are skipped.
+    """
+    state = None  # None, a quote character, or _COMMENT
+    has_content = False
+    parts = []  # current statement text
+    pending = ''  # text carried over to the next chunk
+
+    for chunk in _read_chunks(source, chunk_size, encoding):
+        text = pending + chunk
+        pending = ''
+        start = pos = 0
+        end = len(text)
+
+        while pos < end:
+            if state is None:
+                m = _UNQUOTED_RE.search(text, pos)
+                if not has_content and text[pos:end if m is None else m.start()].strip():
+                    has_content = True
+                if m is None:
+                    pos = end
+                    break
+
+                token = m.group()
+                if token == '-':
+                    # Need the next chunk to tell whether this starts a comment
+                    pending = text[m.start():]
+                    end = m.start()
+                    break
+                elif token == ';':
+                    parts.append(text[start:m.start()])
+                    if has_content:
+                        yield ''.join(parts).strip()
+                    parts = []
+                    has_content = False
+                    start = pos = m.end()
+                elif token in _QUOTED_RES:
+                    state = token
+                    has_content = True
+                    pos = m.end()
+                else:
+                    state = _COMMENT
+                    pos = m.end()
+
+            elif state == _COMMENT:
+                newline = text.find('\n', pos)
+                if newline < 0:
+                    pos = end
+                else:
+                    state = None
+                    pos = newline + 1
+
+            else:
+                m = _QUOTED_RES[state].search(text, pos)
+                if m is None:
+                    pos = end
+                elif m.group() == '\\':
+                    pending = text[m.start():]
+                    end = m.start()
+                    break
+                else:
+                    if m.group() == state:
+                        state = None
+                    pos = m.end()
+
+        parts.append(text[start:end])
+
+    parts.append(pending)
+    if has_content or pending.strip():
+        yield ''.join(parts).strip()
+
+
+def iter_statements(source, chunk_size=DEFAULT_CHUNK_SIZE, encoding='utf-8', **kwargs):
+    """
+    Parses each statement in :source: (see split_statements) with
+    sqlparse.parse_string, passing along :kwargs:, yielding one AST at a time.
+
+    Parse errors are raised. To collect them per statement instead (or to
+    parse on several processes), use:
+    sqlparse.parse_many(split_statements(source), ...)
+    """
+    for statement in split_statements(source, chunk_size, encoding):
+        yield sqlparse.parse_string(statement, **kwargs)
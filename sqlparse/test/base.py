@@ -13,6 +13,9 @@ class ParserTestCase(unittest.TestCase):
     # Print results XML to console?
     PRINT_PARSE_RESULTS = bool(os.environ.get('PRINT_PARSE_RESULTS', False))
 
+    # Parser backend passed to sqlparse.parse_string
+    BACKEND = 'pyparsing'
+
     def assertParses(self, input_str: str, expect_error: bool = False):
         """
         parses :input_str: and assets the parse succeeded
@@ -35,9 +38,9 @@ class ParserTestCase(unittest.TestCase):
             if self.PRINT_PARSE_RESULTS and not expect_error:
                 print("\n{}".format(input_str))
 
-            tokens = sqlparse.parse_string(input_str)
+            tokens = sqlparse.parse_string(input_str, backend=self.BACKEND)
             if self.PRINT_PARSE_RESULTS and not expect_error:
-                print(tokens.asXML('query'))
+                print(tokens.asXML('query') if hasattr(tokens, 'asXML') else tokens)
                 #print tokens.where.dump()
 
             #print tokens.where.dump()
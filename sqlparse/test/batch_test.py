@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import unittest
+
+from pyparsing import ParseException
+
+import sqlparse
+from sqlparse.batch import map_ordered
+from sqlparse.builders import MongoQueryBuilder
+
+
+def square(x):
+    if x < 0:
+        raise ValueError('negative')
+    return x * x
+
+
+def lock_if_odd(x):
+    return threading.Lock() if x % 2 else x
+
+
+# pids of the processes preload_pid was called in
+preloaded = []
+
+
+def preload_pid():
+    preloaded.append(os.getpid())
+
+
+def preloaded_pids(x):
+    return list(preloaded)
+
+
+class MapOrderedTest(unittest.TestCase):
+    def test_in_process(self):
+        self.assertEqual([0, 1, 4, 9], list(map_ordered(square, range(4), workers=1, chunksize=3)))
+
+    def test_worker_processes(self):
+        self.assertEqual([x * x for x in range(100)], list(map_ordered(square, range(100), workers=2, chunksize=7)))
+
+    def test_errors(self):
+        results = list(map_ordered(square, [2, -1, 3], workers=2, chunksize=1))
+
+        self.assertEqual(4, results[0])
+        self.assertIsInstance(results[1], sqlparse.BatchError)
+        self.assertEqual(1, results[1].index)
+        self.assertEqual(-1, results[1].item)
+        self.assertIsInstance(results[1].exception, ValueError)
+        self.assertEqual(9, results[2])
+
+    def test_unpicklable_results(self):
+        results = list(map_ordered(lock_if_odd, range(6), workers=2, chunksize=2))
+
+        self.assertEqual([0, 2, 4], results[::2])
+        for index, result in zip([1, 3, 5], results[1::2]):
+            self.assertIsInstance(result, sqlparse.BatchError)
+            self.assertEqual(index, result.index)
+            self.assertIsInstance(result.exception, TypeError)
+
+    def test_lazy(self):
+        def items():
+            yield 1
+            yield 2
+            raise AssertionError('consumed too far')
+
+        self.assertEqual(1, next(map_ordered(square, items(), workers=1, chunksize=1)))
+
+    def test_preload(self):
+        del preloaded[:]
+        results = list(map_ordered(preloaded_pids, range(4), workers=2, chunksize=1, preload=preload_pid))
+
+        for pids in results:
+            self.assertEqual(1, len(pids))
+        if multiprocessing.get_start_method() == 'fork':
+            # Called once, before forking, and workers inherit its work
+            self.assertEqual([os.getpid()], preloaded)
+            self.assertEqual([[os.getpid()]] * 4, results)
+
+    def test_stop_early(self):
+        results = map_ordered(square, range(1000), workers=2, chunksize=1)
+        self.assertEqual([0, 1, 4], [next(results) for _ in range(3)])
+        results.close()
+
+    def test_invalid_chunksize(self):
+        self.assertRaises(ValueError, list, map_ordered(square, [1], chunksize=0))
+
+
+class ParseManyTest(unittest.TestCase):
+    def test_parse_many(self):
+        query_strings = [
+            'select a from b where c = 1',
+            'select a from',
+            'select a from b where c = 2 or d = 3',
+        ]
+
+        for backend in ('pyparsing', 'fast'):
+            results = list(sqlparse.parse_many(query_strings, workers=2, chunksize=1, backend=backend))
+
+            self.assertEqual('(= c 1)', repr(results[0].where[0]))
+            self.assertIsInstance(results[1], sqlparse.BatchError)
+            self.assertIsInstance(results[1].exception, ParseException)
+            self.assertEqual('(or (= c 2) (= d 3))', repr(results[2].where[0]))
+
+    def test_preload_backend(self):
+        sqlparse.preload('fast')
+        sqlparse.preload('pyparsing')
+        self.assertRaises(ValueError, sqlparse.preload, 'nope')
+
+    def test_build_many(self):
+        builder = MongoQueryBuilder()
+        query_strings = ['select * from User where a = {}'.format(i) for i in range(20)] + ['select']
+
+        results = list(builder.build_many(query_strings, workers=2, chunksize=4))
+
+        self.assertEqual([({'a': i}, {}) for i in range(20)], results[:20])
+        self.assertIsInstance(results[20], sqlparse.BatchError)
+
+    def test_builder_pickles_with_empty_cache(self):
+        builder = MongoQueryBuilder(plan_cache_size=10)
+        builder.parse_and_build('select * from User where a = 1')
+
+        copied = pickle.loads(pickle.dumps(builder))
+        self.assertEqual(10, copied.plan_cache.capacity)
+        self.assertEqual(0, len(copied.plan_cache))
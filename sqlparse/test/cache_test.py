@@ -0,0 +1,109 @@
+import threading
+import unittest
+
+import sqlparse
+from sqlparse.cache import LRUCache, ParseCache, normalize_query
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(capacity=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))  # b is now least recently used
+        cache.put('c', 3)
+
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(2, len(cache))
+
+    def test_stats(self):
+        cache = LRUCache(capacity=10)
+        cache.put('a', 1)
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+
+        stats = cache.stats()
+        self.assertEqual(2, stats.hits)
+        self.assertEqual(1, stats.misses)
+        self.assertEqual(1, stats.size)
+        self.assertEqual(10, stats.capacity)
+
+        cache.clear()
+        self.assertEqual((0, 0, 0, 10), tuple(cache.stats()))
+
+    def test_resize(self):
+        cache = LRUCache(capacity=3)
+        for key in 'abc':
+            cache.put(key, key)
+        cache.resize(1)
+        self.assertEqual(['c'], [k for k in 'abc' if k in cache])
+
+        self.assertRaises(ValueError, cache.resize, 0)
+
+    def test_concurrent_access(self):
+        cache = LRUCache(capacity=50)
+
+        def worker(offset):
+            for i in range(1000):
+                cache.put(offset + i % 100, i)
+                cache.get(offset + (i + 1) % 100)
+
+        threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = cache.stats()
+        self.assertEqual(4000, stats.hits + stats.misses)
+        self.assertEqual(50, stats.size)
+
+
+class ParseCacheTest(unittest.TestCase):
+    def test_normalize_query(self):
+        self.assertEqual(
+            'SELECT a FROM User WHERE b = "X  Y" AND c IN (1, 2)',
+            normalize_query('  SELECT a\n  FROM User -- comment\n WHERE b = "X  Y"   AND c IN (1, 2)  '))
+
+        # words (identifiers and keywords) and strings keep their case
+        self.assertNotEqual(normalize_query('select a from User'), normalize_query('select a from user'))
+        self.assertNotEqual(normalize_query('select a from b where Is = 1'), normalize_query('select a from b where is = 1'))
+        self.assertNotEqual(normalize_query("select a from b where c = 'x'"), normalize_query("select a from b where c = 'X'"))
+
+    def test_hit_on_equivalent_query(self):
+        cache = ParseCache()
+        cache.parse('select a from b where c = 1', sqlparse.parse_string)
+        ast = cache.parse('select a   from b\nwhere c = 1 -- comment', sqlparse.parse_string)
+
+        self.assertEqual('(= c 1)', repr(ast.where[0]))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_identifier_spelled_like_keyword(self):
+        # "Is", "Xor", etc. are columns here, so their case matters
+        for backend in ['pyparsing', 'fast']:
+            sqlparse.parse_cache.clear()
+            for name in ['is', 'Is', 'xor', 'Xor', 'unknown', 'Unknown']:
+                ast = sqlparse.parse_string('select a from b where %s = 1' % name, cached=True, backend=backend)
+                self.assertEqual('(= %s 1)' % name, repr(ast.where[0]), backend)
+
+    def test_copy_on_read(self):
+        cache = ParseCache()
+        query_string = 'select a from b where c = 1'
+
+        first = cache.parse(query_string, sqlparse.parse_string)
+        first.where[0].rhs.value = 2
+
+        second = cache.parse(query_string, sqlparse.parse_string)
+        self.assertEqual(1, second.where[0].rhs.value)
+        self.assertIsNot(first.where[0], second.where[0])
+
+    def test_parse_string(self):
+        sqlparse.parse_cache.clear()
+        sqlparse.parse_string('select a from b where c = 1', cached=True)
+        ast = sqlparse.parse_string('select a from b where c = 1', cached=True)
+
+        self.assertEqual('(= c 1)', repr(ast.where[0]))
+        self.assertEqual(1, sqlparse.parse_cache.hits)
@@ -0,0 +1,117 @@
+import unittest
+
+from pyparsing import ParseException
+
+import sqlparse
+from sqlparse import fastparser, nodes
+
+
+def dump(node):
+    """
+    Renders a parse tree with node class names, for comparing trees
+    """
+    if isinstance(node, nodes.BinaryOperator):
+        return 'Binary({} {} {})'.format(node.name, dump(node.lhs), dump(node.rhs))
+    elif isinstance(node, nodes.UnaryOperator):
+        return 'Unary({} {})'.format(node.name, dump(node.rhs))
+    elif isinstance(node, nodes.ListValue):
+        return 'List({})'.format(' '.join(map(dump, node.values)))
+    elif isinstance(node, nodes.RangeValue):
+        return 'Range({} {})'.format(dump(node.begin), dump(node.end))
+    elif isinstance(node, nodes.SortKey):
+        return 'SortKey({} {})'.format(dump(node.column), node.descending)
+    elif isinstance(node, nodes.Identifier):
+        return 'Identifier({})'.format(node.name)
+    elif isinstance(node, nodes.Value):
+        return '{}({!r})'.format(node.__class__.__name__, node.value)
+    elif isinstance(node, str):
+        return repr(node)
+    return '[{}]'.format(' '.join(map(dump, node)))
+
+
+class FastParserTest(unittest.TestCase):
+    VALID_QUERIES = [
+        'select * from xyzzy, ABC',
+        'select all a,b,c from sys.blah ,Table2',
+        'select distinct a from b where c = 1',
+        'SeLeCt * fRoM SYS.XYZZY where q is not null and q >= 1e2',
+        'select a from b where c = 1 and d = 2 or e = "f" xor g <=> 1',
+        'select a from b where c is null && d is true || e is not unknown',
+        'select a from b where b.a = "test" and c != \'it\'\'s\' and d <> 1',
+        'select a from b where c > 1 and c < 2 and d >= 3 and d <= 4',
+        'select a from table where b = 3 and c = -1 or d = 1e-3 or e=-1.2e-3 or f!= -1.2e+3 or g =1.2e3',
+        'select a from b where i = 1 or i in (2,3, 4e2 ) and f in( .1, 1.2, -.1, +1.2, +1.2e+3, 1e-1, 1.2e-3, +1.2e-3,-4e2)',
+        'SELECT A from sys.blah where a in ("RED","GREEN", "BLUE")',
+        'select x from y where z between 10 and 30.5',
+        'select distinct a from b,x where ( c = 1 ) or ( d != 2 ) or e >= 3',
+        'select a from b where not c = 1 and ! (d = 1 or not not e = 2)',
+        'select a from b where c like \'%%blah%%\' and c like "l"',
+        'select a from b where c not like "x%" and not d not between 1 and 2',
+        'select x from y,z where y.a != z.a or ( y.a > 3 and y.b = 1 ) and ( y.x <= a.x or ( y.x = 1 or y.y = 3 )) and z in (2,4,6)',
+        'select A,b from table1,table2 where table1.id = table2.id -- ignored comment',
+        'Select A , b,c from Sys.blah # ignored comment',
+        'select a',
+        'select a from b where c = 1 order by a, b DESC, c asc limit 10 offset 20',
+        'select a from b order by a limit 5',
+    ]
+
+    INVALID_QUERIES = [
+        'select * from a .b',
+        'select 1 from a',
+        'select a from b where',
+        'select a from b where c = - 1',
+        'select a from b where c in ()',
+        'select a from b where (c = 1',
+        'select a from b where c like d',
+        'select a from b where c is 1',
+        'select a from b where c = 1 and',
+        'select a from b c',
+        'select a from b where c = "unterminated',
+        'delete from b',
+        'select a from b order a',
+        'select a from b limit -1',
+        'select a from b limit 1.5',
+        'select a from b order by a limit',
+    ]
+
+    def test_same_trees_as_pyparsing(self):
+        for query_string in self.VALID_QUERIES:
+            expected = sqlparse.parse_string(query_string)
+            actual = sqlparse.parse_string(query_string, backend='fast')
+
+            self.assertIsInstance(actual, nodes.Statement)
+            self.assertEqual(expected.options, actual.options, query_string)
+            self.assertEqual(dump(expected.columns), dump(actual.columns), query_string)
+            self.assertEqual(dump(expected.tables), dump(actual.tables), query_string)
+            self.assertEqual(dump(expected.where), dump(actual.where), query_string)
+            self.assertEqual(dump(expected.order), dump(actual.order), query_string)
+            self.assertEqual(dump(expected.limit), dump(actual.limit), query_string)
+            self.assertEqual(dump(expected.offset), dump(actual.offset), query_string)
+
+    def test_parse_errors(self):
+        for query_string in self.INVALID_QUERIES:
+            self.assertRaises(ParseException, sqlparse.parse_string, query_string)
+            self.assertRaises(ParseException, sqlparse.parse_string, query_string, backend='fast')
+
+    def test_error_location(self):
+        with self.assertRaises(ParseException) as ctx:
+            fastparser.parse('select a from b where c = 1 and d')
+        self.assertEqual(34, ctx.exception.col)
+
+    def test_long_chain(self):
+        # Deeper than the recursion limit
+        query_string = 'select a from b where ' + ' and '.join('c{0} = {0}'.format(i) for i in range(5000))
+        ast = fastparser.parse(query_string)
+
+        node = ast.where[0]
+        depth = 0
+        while node.name == 'and':
+            self.assertEqual('c{}'.format(depth), node.lhs.lhs.name)
+            node = node.rhs
+            depth += 1
+
+        self.assertEqual(4999, depth)
+        self.assertEqual('(= c4999 4999)', repr(node))
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, sqlparse.parse_string, 'select a from b', backend='nope')
@@ -0,0 +1,138 @@
+import itertools
+from decimal import Decimal
+
+import sqlparse
+from sqlparse import fingerprint, fingerprint_cache
+from sqlparse.builders import MongoQueryBuilder, PythonPredicateBuilder
+from sqlparse.prepared import PreparedQuery
+from .base import unittest, ParseException
+
+
+class FingerprintTest(unittest.TestCase):
+    QUERIES = [
+        'select * from User where age > 30 and name in ("a", "b")',
+        'select distinct a, b from c where d = -1 and (e like "f%" or g between 1.5 and 2) order by a desc limit 10',
+        'select a from b where not c is null xor d in (1, e) or f = g and h != "x"',
+        'select a from b where c = ? and d = :name and e = 1',
+        'select a from b',
+    ]
+
+    def setUp(self):
+        fingerprint_cache.clear()
+
+    def assertSameFingerprint(self, first, second):
+        self.assertEqual(fingerprint(first).hash, fingerprint(second).hash, (first, second))
+
+    def test_literals(self):
+        result = fingerprint(self.QUERIES[0])
+        self.assertEqual('select * from User where age > ? and name in (?)', result.normalized)
+        self.assertEqual([30, ['a', 'b']], result.parameters)
+
+        other = fingerprint('select * from User where name in ("c", "d", "e") and age > 20.5')
+        self.assertEqual(result.hash, other.hash)
+        self.assertEqual([Decimal('20.5'), ['c', 'd', 'e']], other.parameters)
+
+    def test_commutative_operands(self):
+        self.assertSameFingerprint(
+            'select a from b where c = 1 and (d = 2 or e = 3)',
+            'select a from b where (e = 4 or d = 5) and c = 6')
+        self.assertSameFingerprint(
+            'select a from b where (c = 1 and d = 2) and e = 3',
+            'select a from b where c = 1 and (d = 2 && e = 3)')
+        self.assertSameFingerprint('select a from b where c = d xor e > 1', 'select a from b where e > 2 xor d = c')
+        self.assertSameFingerprint('select a from b where c <> d', 'select a from b where d != c')
+
+        result = fingerprint('select a from b where e = "x" and c = 1 and d = 2')
+        self.assertEqual('select a from b where c = ? and d = ? and e = ?', result.normalized)
+        self.assertEqual([1, 2, 'x'], result.parameters)
+
+    def test_structure(self):
+        hashes = set(fingerprint(query_string).hash for query_string in [
+            'select a from b where c = 1',
+            'select a from b where c > 1',
+            'select a from b where d = 1',
+            'select b from b where c = 1',
+            'select a from b where c = 1 or d = 1',
+            'select a from b where c = 1 and d = 1',
+            'select a from b where c = 1 limit 5',
+            'select a from b where c = 1 limit 6',
+            'select a from b where c = d',
+            'select a from b where c = ?',
+            'select a from b where c in (1, d)',
+            'select a from b where c is null',
+            'select a from b where not c = 1',
+            'select a from b where c = ? and d = 1',
+            'select a from b where c = 1 and d = ?',
+        ])
+        self.assertEqual(15, len(hashes))
+
+    def test_case_and_whitespace(self):
+        self.assertSameFingerprint(
+            'select a from b where c in (1, 2) and d like "x%"',
+            'SELECT a\n  FROM b -- comment\n  WHERE c IN (3)  AND d LIKE "y%"')
+
+        # Columns spelled like keywords keep their case (also on the fast path)
+        fingerprint('select a from b where xor = 1')
+        self.assertEqual('select a from b where Xor = ?', fingerprint('select a from b where Xor = 2').normalized)
+
+    def test_same_as_parsed_query(self):
+        for query_string in self.QUERIES:
+            expected = fingerprint(query_string)
+            self.assertEqual(expected, fingerprint(sqlparse.parse_string(query_string)), query_string)
+            self.assertEqual(expected, fingerprint(sqlparse.parse_string(query_string, backend='fast')), query_string)
+
+    def test_fast_path(self):
+        fingerprint(self.QUERIES[1])
+        result = fingerprint(self.QUERIES[1].replace('-1', '7').replace('"f%"', '"g%"'))
+
+        self.assertEqual((1, 1, 1), fingerprint_cache.stats()[:3])
+        self.assertEqual(['g%', Decimal('1.5'), 2, 7], result.parameters)
+
+    def test_normalized_query(self):
+        builder = MongoQueryBuilder()
+        for query_string in [
+                self.QUERIES[0],
+                'select a from b where (d in ("x") or e >= 1.5) and c between 1 and 2 and not f = "y"']:
+            result = fingerprint(query_string)
+            query = PreparedQuery(result.normalized)
+            self.assertEqual(builder.parse_and_build(query_string), query.build(builder, *result.parameters))
+
+            # The ? placeholders of normalized queries are their own
+            normalized = result.normalized
+            for index in range(len(result.parameters)):
+                normalized = normalized.replace('?', ':__positional%d' % index, 1)
+            self.assertEqual(normalized, fingerprint(result.normalized).normalized)
+
+    def test_positional_placeholders(self):
+        builder = PythonPredicateBuilder()
+        records = [dict(zip('abcd', values)) for values in itertools.product([1, 2], 'xw', ['z', 2, 3], 'yv')]
+        query_string = 'select * from User where b = ? and a = 1 and (d = ? or c in (?, 2))'
+        predicate = PreparedQuery(query_string).build(builder, 'x', 'y', 'z')
+        expected = [record for record in records if predicate(record)]
+
+        for ast_or_string in [query_string, sqlparse.parse_string(query_string)]:
+            result = fingerprint(ast_or_string)
+            self.assertEqual(
+                'select * from User where (c in (:__positional2, ?) or d = :__positional1) and a = ? and '
+                'b = :__positional0', result.normalized)
+            self.assertEqual([2, 1], result.parameters)
+
+            predicate = PreparedQuery(result.normalized).build(
+                builder, *result.parameters, __positional0='x', __positional1='y', __positional2='z')
+            self.assertEqual(expected, [record for record in records if predicate(record)])
+
+        self.assertNotEqual(
+            fingerprint('select a from b where c = ? or d = ?').hash,
+            fingerprint('select a from b where d = ? or c = ?').hash)
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseException) as context:
+            fingerprint('select a from b where c in (1, )')
+        self.assertIn('(1, )', context.exception.line)
+
+        with self.assertRaises(ParseException):
+            fingerprint('select a from b where c = 1 and', backend='pyparsing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import subprocess
+import sys
+import unittest
+
+
+def imported_modules(code):
+    """
+    Names of the modules imported after running :code: in a fresh interpreter
+    """
+    output = subprocess.check_output([
+        sys.executable, '-c', code + '\nimport sys\nprint("\\n".join(sorted(sys.modules)))'])
+    return set(output.decode().split())
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_import_sqlparse(self):
+        modules = imported_modules('import sqlparse')
+
+        for name in ['sqlparse.builders', 'sqlparse.grammar', 'sqlalchemy', 'pyparsing', 'multiprocessing']:
+            self.assertNotIn(name, modules)
+
+    def test_parse_with_fast_backend(self):
+        modules = imported_modules('import sqlparse\nsqlparse.parse_string("select a from b", backend="fast")')
+        self.assertNotIn('sqlparse.grammar', modules)
+        self.assertNotIn('pyparsing', modules)
+
+    def test_builders_on_first_use(self):
+        modules = imported_modules('from sqlparse.builders import MongoQueryBuilder')
+        self.assertIn('sqlparse.builders.mongo_builder', modules)
+        self.assertNotIn('sqlparse.builders.sqlalchemy_builder', modules)
+        self.assertNotIn('sqlalchemy', modules)
+
+    def test_lazy_attributes(self):
+        import sqlparse
+        from sqlparse import grammar
+
+        self.assertIs(grammar.enable_packrat, sqlparse.enable_packrat)
+        self.assertIs(grammar.detach, sqlparse.detach)
+        self.assertIn('builders', dir(sqlparse))
+        self.assertRaises(AttributeError, getattr, sqlparse, 'no_such_attribute')
+        self.assertRaises(AttributeError, getattr, sqlparse.builders, 'NoSuchBuilder')
@@ -0,0 +1,80 @@
+import re
+import unittest
+
+from sqlparse.like import compile_like, pcre_regex, prefix_range, python_regex, like_cache
+
+
+class CompileLikeTest(unittest.TestCase):
+    def assertCompiles(self, regex, pattern):
+        self.assertEqual(regex, compile_like(pattern).regex)
+
+    def test_wildcards(self):
+        self.assertCompiles('^a.c.*d$', 'a_c%d')
+        self.assertCompiles('^a.*b$', 'a%%b')
+        self.assertCompiles('abc$', '%abc')
+        self.assertCompiles('a', '%a%')
+        self.assertCompiles('^', '%')
+
+    def test_prefix(self):
+        like = compile_like('ab%c')
+        self.assertEqual(('ab', False, False), (like.prefix, like.exact, like.prefix_only))
+
+        like = compile_like('abc%')
+        self.assertEqual(('abc', False, True, '^abc'), (like.prefix, like.exact, like.prefix_only, like.regex))
+
+        like = compile_like('abc')
+        self.assertEqual(('abc', True), (like.prefix, like.exact))
+
+    def test_escapes(self):
+        like = compile_like('50\\%_off%')
+        self.assertEqual('50%', like.prefix)
+        self.assertEqual('^50%.off', like.regex)
+
+        self.assertEqual('a.b', compile_like('a.b%').prefix)
+        self.assertCompiles('^a\\.b', 'a.b%')
+        self.assertEqual('x\\', compile_like('x\\').prefix)
+        self.assertEqual('a_', compile_like('a!_', escape='!').prefix)
+
+    def test_same_matches_as_LIKE(self):
+        strings = ['', 'a', 'ab', 'abc', 'xabc', 'a\nc', 'a.c', 'abcd']
+        cases = [
+            ('a%', ['a', 'ab', 'abc', 'a\nc', 'a.c', 'abcd']),
+            ('a_c', ['abc', 'a\nc', 'a.c']),
+            ('%c', ['abc', 'xabc', 'a\nc', 'a.c']),
+            ('a.c', ['a.c']),
+        ]
+        for pattern, expected in cases:
+            like = compile_like(pattern)
+            regex = re.compile(like.regex, re.DOTALL if like.dotall else 0)
+            self.assertEqual(expected, [s for s in strings if regex.search(s)], pattern)
+
+    def test_cached(self):
+        like_cache.clear()
+        first = compile_like('a%')
+        self.assertIs(first, compile_like('a%'))
+        self.assertEqual((1, 1), (like_cache.hits, like_cache.misses))
+
+
+class PythonRegexTest(unittest.TestCase):
+    def test_trailing_newline(self):
+        self.assertEqual(['ab'], [s for s in ['ab', 'ab\n', 'xab'] if python_regex('a_').search(s)])
+        self.assertEqual(['xab'], [s for s in ['xab', 'xab\n'] if python_regex('%ab').search(s)])
+        self.assertEqual(['ab$'], [s for s in ['ab$', 'ab$\n', 'ab'] if python_regex('a_$').search(s)])
+        self.assertEqual(['a\\'], [s for s in ['a\\', 'a\\\n'] if python_regex('_\\\\').search(s)])
+
+
+class PcreRegexTest(unittest.TestCase):
+    def test_end_anchor(self):
+        self.assertEqual('^a.\\z', pcre_regex('a_'))
+        self.assertEqual('ab\\z', pcre_regex('%ab'))
+        self.assertEqual('^a.\\$\\z', pcre_regex('a_$'))
+        self.assertEqual('^a.*\\\\\\z', pcre_regex('a%\\\\'))
+        self.assertEqual('^ab', pcre_regex('ab%'))
+
+
+class PrefixRangeTest(unittest.TestCase):
+    def test_range(self):
+        self.assertEqual(('abc', 'abd'), prefix_range('abc'))
+        self.assertEqual(('a\U0010ffff', 'b'), prefix_range('a\U0010ffff'))
+        self.assertEqual(('\U0010ffff', None), prefix_range('\U0010ffff'))
+        self.assertEqual(('a퟿', 'a'), prefix_range('a퟿'))
@@ -1,10 +1,12 @@
 import itertools
 import logging
+import warnings
 
 import pymongo
 
 from .base import BuilderTestCase
-from sqlparse.builders import MongoQueryBuilder
+from sqlparse.builders import MongoQueryBuilder, QuerySizeWarning
+from sqlparse.builders.mongo_builder import query_size
 
 logger = logging.getLogger(__name__)
 
@@ -61,28 +63,17 @@ class MongoQueryBuilderTest(BuilderTestCase):
             }
         }, options)
 
+        # NOTs are pushed down by the optimizer
         self.assertDictEqual({
             "$and": [
+                {"last_name": {"$ne": "Jacob"}},
                 {
-                    "$nor": [
-                        {
-                            "$or": [
-                                { "last_name": "Jacob" },
-                                {
-                                    "$and": [
-                                        {"first_name": {"$ne": "Chris"}},
-                                        {"last_name": {"$ne": "Lyon"}}
-                                    ]
-                                }
-                            ]
-                        }
+                    "$or": [
+                        {"first_name": "Chris"},
+                        {"last_name": "Lyon"}
                     ]
                 },
-                {
-                    "$nor": [
-                        {"is_active": 1}
-                    ]
-                }
+                {"is_active": {"$ne": 1}}
             ]
         }, query)
 
@@ -91,3 +82,200 @@ class MongoQueryBuilderTest(BuilderTestCase):
         #     print(json.dumps(result))
 
         self.assertEquals(4, results.count())
+
+    def test_LIKE(self):
+        # $ matches before a trailing newline in regexes, but LIKE doesn't
+        self.collection.insert({'_id': 'Bo', 'first_name': 'Bo\n'})
+        self.collection.insert({'_id': 'Bob', 'first_name': 'Bob\n'})
+        query, options = MongoQueryBuilder().parse_and_build('select _id from User where first_name like "%o_"')
+
+        results = self.collection.find(query, options)
+        self.assertEqual(['6', '7', '8', 'Bo'], sorted(result['_id'] for result in results))
+
+
+class MongoQueryPlanCacheTest(BuilderTestCase):
+    QUERY = "select a, b from User where last_name = 'Jacob' and age > 1"
+
+    def test_cache_hit(self):
+        builder = MongoQueryBuilder()
+        first = builder.parse_and_build(self.QUERY)
+        second = builder.parse_and_build('select a, b\n from User  where last_name = \'Jacob\' and age > 1 -- comment')
+
+        self.assertEqual(first, second)
+        self.assertEqual('User', builder.model_class)
+        self.assertEqual(['a', 'b'], builder.fields)
+        self.assertEqual((1, 1), (builder.plan_cache.hits, builder.plan_cache.misses))
+
+    def test_results_are_copies(self):
+        builder = MongoQueryBuilder()
+        query, options = builder.parse_and_build(self.QUERY)
+        query['$and'].append({'x': 1})
+        options['fields']['c'] = 1
+
+        query, options = builder.parse_and_build(self.QUERY)
+        self.assertEqual(2, len(query['$and']))
+        self.assertEqual({'fields': {'a': 1, 'b': 1}}, options)
+
+    def test_restores_builder_state(self):
+        builder = MongoQueryBuilder()
+        builder.parse_and_build(self.QUERY)
+        builder.parse_and_build('select c from Other where d = 1')
+        builder.parse_and_build(self.QUERY)
+
+        self.assertEqual('User', builder.model_class)
+        self.assertEqual(['User'], builder.class_names)
+        self.assertEqual(['a', 'b'], builder.fields)
+
+    def test_settings_are_part_of_key(self):
+        builder = MongoQueryBuilder()
+        settings = [
+            ('like_ranges', True),
+            ('optimize', False),
+            ('pipeline', True),
+        ]
+        query_string = 'select a from User where b like "ab%" and (c = 1 or c = 2)'
+
+        for name, value in settings:
+            builder.parse_and_build(query_string)
+            setattr(builder, name, value)
+
+            fresh = MongoQueryBuilder(plan_cache_size=0)
+            setattr(fresh, name, value)
+            self.assertEqual(fresh.parse_and_build(query_string), builder.parse_and_build(query_string), name)
+            setattr(builder, name, getattr(MongoQueryBuilder(), name))
+
+        builder.parse_and_build(query_string)
+        builder.max_query_size = 1
+        with self.assertWarns(QuerySizeWarning):
+            builder.parse_and_build(query_string)
+
+    def test_disabled(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        self.assertIsNone(builder.plan_cache)
+        self.assertEqual({'c': 1}, builder.parse_and_build('select * from User where c = 1')[0])
+
+
+class MongoQueryBuilderOfflineTest(BuilderTestCase):
+    def test_between(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        query, _ = builder.parse_and_build('select * from User where age between 18 and 65')
+        self.assertEqual({'$and': [{'age': {'$gte': 18}}, {'age': {'$lte': 65}}]}, query)
+
+    def test_LIKE(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        query, _ = builder.parse_and_build(
+            'select * from User where a like "ab%" and b like "a_c%" and c not like "x%" and d like "y"')
+        self.assertEqual({'$and': [
+            {'a': {'$regex': '^ab'}},
+            {'b': {'$regex': '^a.c', '$options': 's'}},
+            {'c': {'$not': {'$regex': '^x'}}},
+            {'d': 'y'},
+        ]}, query)
+
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        builder.like_ranges = True
+        query, _ = builder.parse_and_build('select * from User where a like "ab%" and b not like "x%z"')
+        self.assertEqual({'$and': [
+            {'a': {'$gte': 'ab', '$lt': 'ac'}},
+            {'b': {'$not': {'$regex': '^x.*z\\z', '$options': 's'}}},
+        ]}, query)
+
+        # $ matches before a trailing newline in regexes, but LIKE doesn't
+        query, _ = builder.parse_and_build('select * from User where a like "%o_"')
+        self.assertEqual({'a': {'$regex': 'o.\\z', '$options': 's'}}, query)
+
+    def test_ORDER_BY_LIMIT(self):
+        query, options = MongoQueryBuilder(plan_cache_size=0).parse_and_build(
+            'select a from User where b = 1 order by c desc, a limit 10 offset 5')
+        self.assertEqual({'b': 1}, query)
+        self.assertEqual({
+            'fields': {'a': 1},
+            'sort': [('c', -1), ('a', 1)],
+            'skip': 5,
+            'limit': 10,
+        }, options)
+
+        # Mongo doesn't take a limit of 0
+        query, options = MongoQueryBuilder(plan_cache_size=0).parse_and_build('select a from User limit 0')
+        self.assertEqual(({'_id': {'$exists': False}}, {'fields': {'a': 1}}), (query, options))
+
+    def test_pipeline(self):
+        builder = MongoQueryBuilder(pipeline=True, plan_cache_size=0)
+        pipeline = builder.parse_and_build('select a, b from User where b = 1 order by c desc limit 10 offset 5')
+        self.assertEqual([
+            {'$match': {'b': 1}},
+            {'$sort': {'c': -1}},
+            {'$skip': 5},
+            {'$limit': 10},
+            {'$project': {'a': 1, 'b': 1}},
+        ], pipeline)
+        self.assertEqual(['a', 'b'], builder.fields)
+
+        self.assertEqual([], builder.parse_and_build('select * from User'))
+
+        builder.pipeline = False
+        self.assertEqual(({}, {}), builder.parse_and_build('select * from User'))
+
+    def test_flat_AND(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        query, _ = builder.parse_and_build('select * from User where a = 1 and b = 2 and (c = 3 or d = 4 or e = 5)')
+        self.assertEqual({'$and': [
+            {'a': 1},
+            {'b': 2},
+            {'$or': [{'c': 3}, {'d': 4}, {'e': 5}]},
+        ]}, query)
+
+    def test_not_optimized(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        builder.optimize = False
+        query, _ = builder.parse_and_build('select * from User where not (a = 1 or a = 2)')
+        self.assertEqual({'$and': [{'a': {'$ne': 1}}, {'a': {'$ne': 2}}]}, query)
+
+    def test_NOT_pushdown(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        builder.optimize = False
+        query, _ = builder.parse_and_build("""
+            select * from User where not (
+                a in (1, 2) and b != "x" and not c = 3 and (d between 1 and 5 or e > 2))""")
+        self.assertEqual({'$or': [
+            {'a': {'$nin': [1, 2]}},
+            {'b': 'x'},
+            {'c': 3},
+            {'$and': [
+                {'$or': [{'d': {'$not': {'$gte': 1}}}, {'d': {'$not': {'$lte': 5}}}]},
+                {'e': {'$not': {'$gt': 2}}},
+            ]},
+        ]}, query)
+
+    def test_XOR(self):
+        query, _ = MongoQueryBuilder(plan_cache_size=0).parse_and_build('select * from User where a = 1 xor b > 2')
+        self.assertEqual({'$or': [
+            {'$and': [{'a': 1}, {'b': {'$not': {'$gt': 2}}}]},
+            {'$and': [{'a': {'$ne': 1}}, {'b': {'$gt': 2}}]},
+        ]}, query)
+
+    def test_nested_XOR(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        builder.parser_backend = 'fast'
+        terms = ['c%d = %d' % (i, i) for i in range(20)]
+        query_string = 'select * from User where ' + ' xor '.join(terms)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            query, _ = builder.parse_and_build(query_string)
+        self.assertEqual([QuerySizeWarning], [warning.category for warning in caught])
+        self.assertGreater(query_size(query), 2 ** 20)
+
+        builder.max_query_size = None
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', QuerySizeWarning)
+            builder.parse_and_build(query_string)
+
+    def test_contradiction(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        query, _ = builder.parse_and_build('select * from User where a = 1 and b = 2 and a = 3')
+        self.assertEqual({'_id': {'$exists': False}}, query)
+
+    def test_no_WHERE(self):
+        builder = MongoQueryBuilder(plan_cache_size=0)
+        self.assertEqual(({}, {'fields': {'a': 1}}), builder.parse_and_build('select a from User'))
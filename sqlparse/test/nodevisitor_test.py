@@ -0,0 +1,148 @@
+import unittest
+
+import sqlparse
+from sqlparse import nodes
+from sqlparse.builders.mongo_builder import MongoQueryVisitor
+from sqlparse.nodevisitor import ASTVisitor, NodeVisitor, NodeTransformer, walk, POST_ORDER
+from sqlparse.visitors import IdentifierAndValueVisitor
+
+
+def deep_query(n):
+    return 'select * from User where ' + ' and '.join('c%d = %d' % (i, i) for i in range(n))
+
+
+class WalkTest(unittest.TestCase):
+    def setUp(self):
+        self.where = sqlparse.parse_string('select * from User where a = 1 or b in (2, 3)', backend='fast').where[0]
+
+    def test_pre_order(self):
+        self.assertEqual(
+            ['(or (= a 1) (in b \'(2 3)))', '(= a 1)', 'a', '1', '(in b \'(2 3))', 'b', "'(2 3)", '2', '3'],
+            [repr(node) for node in walk(self.where)])
+
+    def test_post_order(self):
+        self.assertEqual(
+            ['a', '1', '(= a 1)', 'b', '2', '3', "'(2 3)", '(in b \'(2 3))', '(or (= a 1) (in b \'(2 3)))'],
+            [repr(node) for node in walk(self.where, POST_ORDER)])
+
+    def test_node_visitor(self):
+        self.assertEqual(list(walk(self.where))[1:], list(NodeVisitor().visit(self.where)))
+
+        # Lists and ParseResults of nodes can be walked too
+        ast = sqlparse.parse_string('select a, * from User')
+        self.assertEqual(['a', '*'], [str(node) for node in NodeVisitor().visit(ast.columns.values)])
+
+    def test_deep_tree(self):
+        where = sqlparse.parse_string(deep_query(5000), backend='fast').where[0]
+        self.assertEqual(4 * 5000 - 1, len(list(walk(where, POST_ORDER))))
+        self.assertEqual(4 * 5000 - 2, len(list(NodeVisitor().visit(where))))
+
+
+class ASTVisitorTest(unittest.TestCase):
+    def test_deep_tree(self):
+        where = sqlparse.parse_string(deep_query(5000), backend='fast').where[0]
+        criteria = MongoQueryVisitor().visit(where)
+
+        for i in range(4999):
+            self.assertEqual({'c%d' % i: i}, criteria['$and'][0])
+            criteria = criteria['$and'][1]
+        self.assertEqual({'c4999': 4999}, criteria)
+
+    def test_deferred_exceptions(self):
+        class SideVisitor(IdentifierAndValueVisitor):
+            def __init__(self, side):
+                self.side = side
+
+            def visit_BinaryOperator(self, node):
+                return self.visit(getattr(node, self.side))
+
+        # Visiting the unbound placeholder raises, but only if it's asked for
+        where = sqlparse.parse_string('select * from User where a between ? and 2', backend='fast').where[0]
+        self.assertEqual('a', SideVisitor('lhs').visit(where))
+        self.assertRaises(ValueError, SideVisitor('rhs').visit, where)
+
+    def test_not_iterative(self):
+        class DepthVisitor(ASTVisitor):
+            iterative = False
+
+            def __init__(self):
+                self.depth = 0
+
+            def visit_BinaryOperator(self, node):
+                self.depth += 1
+                try:
+                    return self.visit(node.rhs)
+                finally:
+                    self.depth -= 1
+
+            def visit_IntegerValue(self, node):
+                return self.depth
+
+        where = sqlparse.parse_string(deep_query(3), backend='fast').where[0]
+        self.assertEqual(3, DepthVisitor().visit(where))
+
+
+class DispatchTest(unittest.TestCase):
+    def test_base_class_fallback(self):
+        identifier = nodes.ModelIdentifier([['User']])
+        self.assertEqual('User', IdentifierAndValueVisitor().visit(identifier))
+
+        class ModelVisitor(IdentifierAndValueVisitor):
+            def visit_ModelIdentifier(self, node):
+                return 'model ' + node.name
+
+        self.assertEqual('model User', ModelVisitor().visit(identifier))
+        self.assertEqual('a', ModelVisitor().visit(nodes.Identifier([['a']])))
+
+    def test_tables_per_class(self):
+        class Visitor(ASTVisitor):
+            def visit_Value(self, node):
+                return node.value
+
+        class StringVisitor(Visitor):
+            def visit_StringValue(self, node):
+                return 'string ' + node.value
+
+        self.assertEqual('x', Visitor().visit(nodes.StringValue(['"x"'])))
+        self.assertEqual('string x', StringVisitor().visit(nodes.StringValue(['"x"'])))
+        self.assertEqual(1, StringVisitor().visit(nodes.IntegerValue(['1'])))
+
+        self.assertEqual(Visitor.visit_Value, Visitor._dispatch_table[nodes.StringValue])
+        self.assertEqual(StringVisitor.visit_StringValue, StringVisitor._dispatch_table[nodes.StringValue])
+
+    def test_generic_visit(self):
+        self.assertRaises(TypeError, ASTVisitor().visit, nodes.Identifier([['a']]))
+
+
+class NodeTransformerTest(unittest.TestCase):
+    class Increment(NodeTransformer):
+        def visit_IntegerValue(self, node):
+            return nodes.IntegerValue([str(node.value + 1)])
+
+        def visit_BinaryOperator(self, node):
+            # Children are transformed first
+            if node.name == '=' and isinstance(node.rhs, nodes.IntegerValue) and node.rhs.value > 2:
+                return nodes.BinaryOperator([[node.lhs, '>', node.rhs]])
+            return node
+
+    def test_transform(self):
+        ast = sqlparse.parse_string('select * from User where a = 1 or b = 2 and c in (3, 4)', backend='fast')
+        where = self.Increment().visit(ast.where[0])
+        self.assertEqual("(or (= a 2) (and (> b 3) (in c '(4 5))))", repr(where))
+
+    def test_copies_changed_nodes(self):
+        ast = sqlparse.parse_string('select * from User where a = "x" or b = 1', backend='fast')
+        where = self.Increment().visit(ast.where[0])
+
+        self.assertEqual('(or (= a "x") (= b 2))', repr(where))
+        self.assertEqual('(or (= a "x") (= b 1))', repr(ast.where[0]))
+        self.assertIs(ast.where[0].lhs, where.lhs)
+        self.assertEqual((where.lhs, where.rhs), where.args)
+
+    def test_deep_tree(self):
+        where = sqlparse.parse_string(deep_query(5000), backend='fast').where[0]
+        where = self.Increment().visit(where)
+
+        for i in range(4999):
+            self.assertEqual(i + 1, where.lhs.rhs.value)
+            where = where.rhs
@@ -0,0 +1,118 @@
+import itertools
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+from .base import BuilderTestCase
+from sqlparse.builders import NumpyQueryBuilder, PythonPredicateBuilder
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class NumpyQueryBuilderTest(BuilderTestCase):
+    def setUp(self):
+        names = list(itertools.product(['Chris', 'John', 'Bob', None], ['Jacob', 'Smith', 'Lyon', 'Sm\nith']))
+        self.records = [
+            dict(id=idx + 1, first_name=first_name, last_name=last_name,
+                 age=None if idx % 5 == 0 else 20 + idx, score=idx / 2.0)
+            for idx, (first_name, last_name) in enumerate(names)]
+
+        self.data = {
+            'id': numpy.arange(1, len(names) + 1),
+            'first_name': numpy.array([first_name for first_name, _ in names], dtype=object),
+            'last_name': numpy.array([last_name for _, last_name in names]),
+            'age': numpy.array([numpy.nan if record['age'] is None else record['age'] for record in self.records]),
+            'score': numpy.array([record['score'] for record in self.records]),
+        }
+
+        self.builder = NumpyQueryBuilder()
+        self.builder.parser_backend = 'fast'
+
+    def ids(self, query_string, data=None):
+        query = self.builder.parse_and_build(query_string)
+        mask = query.mask(self.data if data is None else data)
+        return [int(i) for i in self.data['id'][mask]] if mask is not None else list(self.data['id'])
+
+    def test_SELECT(self):
+        query = self.builder.parse_and_build('select id, age from User where last_name = "Smith"')
+        result = query(self.data)
+
+        self.assertEqual(['id', 'age'], self.builder.fields)
+        self.assertEqual(['id', 'age'], list(result.keys()))
+        self.assertEqual([2, 6, 10, 14], list(result['id']))
+
+    def test_operators(self):
+        self.assertEqual([1, 5], self.ids('select * from User where last_name = "Jacob" and first_name != "Bob"'))
+        self.assertEqual([2, 3, 4, 5], self.ids('select * from User where id > 1 and id < 6'))
+        self.assertEqual([5, 6, 7], self.ids('select * from User where id between 5 and 7'))
+        self.assertEqual([1, 16], self.ids('select * from User where id in (1, 16, 17)'))
+        self.assertEqual([1, 2, 3, 4, 9, 10], self.ids('select * from User where first_name in ("Chris", "Bob") and score < 5'))
+        self.assertEqual([1, 6, 11, 16], self.ids('select * from User where age is null'))
+        self.assertEqual(12, len(self.ids('select * from User where first_name is not null')))
+
+    def test_LIKE(self):
+        self.assertEqual([2, 6, 10, 14], self.ids('select * from User where last_name like "Smith"'))
+        self.assertEqual([2, 4, 6, 8, 10, 12, 14, 16], self.ids('select * from User where last_name like "Sm%"'))
+        self.assertEqual([4, 8, 12, 16], self.ids('select * from User where last_name like "Sm_ith"'))
+        self.assertEqual([9, 10, 11, 12], self.ids('select * from User where first_name like "B%"'))
+        self.assertEqual([1, 2, 3, 4], self.ids('select * from User where first_name like "%r_s"'))
+
+    def test_null(self):
+        self.assertEqual([], self.ids('select * from User where not age = score and not age != score'))
+        self.assertEqual(12, len(self.ids('select * from User where age > 0 or not age > 0')))
+        self.assertEqual(12, len(self.ids('select * from User where not first_name in ("x")')))
+
+    def test_no_WHERE(self):
+        query = self.builder.parse_and_build('select * from User')
+        self.assertIsNone(query.mask(self.data))
+        self.assertEqual(sorted(self.data), sorted(query(self.data)))
+
+    def test_only_needed_columns(self):
+        class Columns(dict):
+            def __getitem__(self, name):
+                read.append(name)
+                return super(Columns, self).__getitem__(name)
+
+        read = []
+        query = self.builder.parse_and_build('select last_name from User where id < 3')
+        result = query(Columns(self.data))
+
+        self.assertEqual(['id', 'last_name'], read)
+        self.assertEqual(['Jacob', 'Smith'], list(result['last_name']))
+
+    @unittest.skipIf(pandas is None, 'pandas is not installed')
+    def test_DataFrame(self):
+        frame = pandas.DataFrame(self.records)
+        query = self.builder.parse_and_build('select id, first_name from User where age > 25 and first_name like "%o%"')
+        result = query(frame)
+
+        self.assertIsInstance(result, pandas.DataFrame)
+        self.assertEqual(['id', 'first_name'], list(result.columns))
+        self.assertEqual([7, 8, 9, 10, 12], list(result['id']))
+
+    def test_same_rows_as_python_predicates(self):
+        python_builder = PythonPredicateBuilder()
+        records = [
+            dict((name, None if isinstance(value, float) and numpy.isnan(value) else value)
+                 for name, value in record.items())
+            for record in self.records]
+
+        for where in [
+                'not (age > 25 and first_name = "Bob")',
+                'not (age < 30 or last_name like "%b")',
+                'age > 25 xor first_name in ("Chris", "John")',
+                'not (age between 22 and 30 xor not last_name = "Lyon")',
+                'not (first_name = last_name or score >= 3.5)',
+                'first_name is null or not age is not null',
+                'not age between 22 and 30 or first_name like "_o%"']:
+            query_string = 'select id from User where ' + where
+            predicate = python_builder.parse_and_build(query_string)
+            expected = [record['id'] for record in records if predicate(record)]
+            self.assertEqual(expected, self.ids(query_string), where)
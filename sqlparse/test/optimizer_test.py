@@ -0,0 +1,75 @@
+import unittest
+
+import sqlparse
+from sqlparse import nodes
+from sqlparse.optimizer import optimize
+
+
+class OptimizerTest(unittest.TestCase):
+    def assertOptimizes(self, expected, where):
+        tree = sqlparse.parse_string('select * from User where ' + where, backend='fast').where[0]
+        self.assertEqual(expected, repr(optimize(tree)))
+
+    def test_unchanged(self):
+        self.assertOptimizes('(and (= a 1) (or (> b 2) (like c "x%")))', 'a = 1 and (b > 2 or c like "x%")')
+
+    def test_double_negation(self):
+        self.assertOptimizes('(in a \'(1 2))', 'not not a in (1, 2)')
+        self.assertOptimizes('(not (in a \'(1 2)))', 'not !not a in (1, 2)')
+
+    def test_de_morgan(self):
+        self.assertOptimizes(
+            '(and (!= a "x") (or (= b 1) (= c 2)) (< d 3))',
+            'not (a = "x" or (b != 1 and c <> 2)) and not d >= 3')
+        self.assertOptimizes('(or (not (like a "x%")) (not (between b 1...2)))', 'not (a like "x%" and b between 1 and 2)')
+
+    def test_null_safe_equal(self):
+        self.assertOptimizes('(not (<=> a 1))', 'not a <=> 1')
+
+    def test_IN(self):
+        self.assertOptimizes('(or (in a \'(1 "2" 3 4)) (= b 5))', 'a = 1 or a = "2" or b = 5 or a in (3, 1, 4)')
+        self.assertOptimizes('(= a 1)', 'a in (1) or a = 1')
+        self.assertOptimizes('(or (= a 1) (= a b))', 'a = 1 or a = b')
+
+    def test_range_bounds(self):
+        self.assertOptimizes('(and (between a 2...5) (= b 1))', 'a >= 1 and a <= 5 and b = 1 and a between 2 and 9')
+        self.assertOptimizes('(and (>= a 2) (< a 5))', 'a >= 1 and a < 5 and a between 2 and 9')
+        self.assertOptimizes('(and (> a 1) (= b 1))', 'a > 1 and b = 1 and a >= 1')
+        self.assertOptimizes('(and (> a 1) (> a b))', 'a > 1 and a > b')
+
+    def test_range_unions(self):
+        self.assertOptimizes(
+            '(or (between a 1...8) (between a 10...12) (= b 1))',
+            'a between 1 and 5 or b = 1 or a between 10 and 12 or a between 3 and 8')
+        self.assertOptimizes('(or (between a 1...5) (between a 6...8))', 'a between 1 and 5 or a between 6 and 8')
+
+    def test_duplicates(self):
+        self.assertOptimizes('(and (= a 1) (or (= b 1) (= c 2)))', 'a = 1 and (b = 1 or c = 2) and a = 1 and (c = 2 or b = 1 or c = 2)')
+
+    def test_contradictions(self):
+        self.assertOptimizes('false', 'a = 1 and b = 2 and a = "1" and a = 2')
+        self.assertOptimizes('false', 'a >= 5 and a <= 1')
+        self.assertOptimizes('(= c 1)', 'c = 1 or (a = 1 and a = 2)')
+
+        # UNKNOWN (not FALSE) when a is NULL, so the NOT would be wrong
+        self.assertOptimizes('(or (!= a 1) (!= a 2))', 'not (a = 1 and a = 2)')
+        self.assertOptimizes('(not (between a 5...1))', 'not a between 5 and 1')
+        self.assertOptimizes('(xor (and (= a 1) (= a 2)) (= b 1))', '(a = 1 and a = 2) xor b = 1')
+
+    def test_constant_folding(self):
+        where = nodes.BinaryOperator([[nodes.IntegerValue(['1']), '<', nodes.RealValue(['1.5'])]])
+        self.assertEqual('true', repr(optimize(where)))
+
+        where = nodes.BinaryOperator([[where, 'and', nodes.BinaryOperator([[nodes.Identifier([['a']]), '=', nodes.IntegerValue(['1'])]])]])
+        self.assertEqual('(= a 1)', repr(optimize(where)))
+
+        where = nodes.BinaryOperator([[nodes.BooleanValue(['true']), 'xor', nodes.Identifier([['a']])]])
+        self.assertEqual('(not a)', repr(optimize(where)))
+
+        where = nodes.UnaryOperator([['not', nodes.BinaryOperator([[nodes.StringValue(['"a"']), '=', nodes.StringValue(['"b"'])]])]])
+        self.assertEqual('true', repr(optimize(where)))
+
+    def test_original_unchanged(self):
+        tree = sqlparse.parse_string('select * from User where not (a = 1 or a = 2)', backend='fast').where[0]
+        optimize(tree)
+        self.assertEqual('(not (or (= a 1) (= a 2)))', repr(tree))
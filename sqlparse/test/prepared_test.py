@@ -0,0 +1,68 @@
+import unittest
+
+from sqlparse import PreparedQuery, nodes
+from sqlparse.builders import MongoQueryBuilder
+
+
+class PreparedQueryTest(unittest.TestCase):
+    def test_placeholders(self):
+        for backend in ('pyparsing', 'fast'):
+            query = PreparedQuery(
+                'select * from User where age > ? and (name = :name or name like :name) and id in (?, 3)',
+                backend=backend)
+
+            self.assertEqual(2, query.positional_count)
+            self.assertEqual(frozenset(['name']), query.names)
+            self.assertEqual(['?', ':name', ':name', '?'], [repr(p) for p in query.placeholders])
+            self.assertEqual([0, None, None, 1], [p.index for p in query.placeholders])
+
+    def test_bind(self):
+        query = PreparedQuery('select * from User where age > ? and name = :name or score between ? and 1.5')
+        tree = query.bind(30, 0.5, name='Chris')
+
+        self.assertEqual('(and (> age 30) (or (= name "Chris") (between score 0.5...1.5)))', repr(tree.where[0]))
+        self.assertIsInstance(tree.where[0].lhs.rhs, nodes.IntegerValue)
+        self.assertIsInstance(tree.where[0].rhs.rhs.rhs.begin, nodes.RealValue)
+        self.assertEqual(['User'], [t.name for t in tree.tables.values])
+
+        # Prepared tree is left alone
+        self.assertEqual('(and (> age ?) (or (= name :name) (between score ?...1.5)))', repr(query.where))
+
+    def test_bind_shares_unchanged_subtrees(self):
+        query = PreparedQuery('select * from User where a = 1 and b = ?')
+        tree = query.bind(2)
+
+        self.assertIs(query.where.lhs, tree.where[0].lhs)
+        self.assertIsNot(query.where.rhs, tree.where[0].rhs)
+
+    def test_bind_list_into_IN(self):
+        query = PreparedQuery('select * from User where id in (?, 4)')
+        tree = query.bind([1, 2, 3])
+
+        self.assertEqual("(in id '(1 2 3 4))", repr(tree.where[0]))
+
+    def test_bind_errors(self):
+        query = PreparedQuery('select * from User where a = ? and b = :b')
+
+        self.assertRaises(ValueError, query.bind, b=1)
+        self.assertRaises(ValueError, query.bind, 1, 2, b=1)
+        self.assertRaises(ValueError, query.bind, 1)
+        self.assertRaises(ValueError, query.bind, 1, b=1, c=2)
+        self.assertRaises(TypeError, query.bind, object(), b=1)
+
+    def test_unbound_placeholder(self):
+        builder = MongoQueryBuilder()
+        self.assertRaises(ValueError, builder.parse_and_build, 'select * from User where a = ?')
+
+    def test_build_mongo(self):
+        query = PreparedQuery('select name from User where age > ? and name in (:names)')
+        builder = MongoQueryBuilder()
+
+        for age, names in [(30, ['Chris', 'Bob']), (40, ['John'])]:
+            criteria, options = query.build(builder, age, names=names)
+            self.assertEqual({'$and': [
+                {'age': {'$gt': age}},
+                {'name': {'$in': names}}
+            ]}, criteria)
+            self.assertEqual({'fields': {'name': 1}}, options)
+            self.assertEqual('User', builder.model_class)
@@ -0,0 +1,139 @@
+import itertools
+
+import sqlalchemy
+
+from .base import BuilderTestCase
+from sqlparse import nodes
+from sqlparse.builders import PythonPredicateBuilder, SqlAlchemyCoreQueryBuilder
+from sqlparse.builders.python_builder import compile_predicate
+
+
+class PythonPredicateBuilderTest(BuilderTestCase):
+    def setUp(self):
+        names = itertools.product(['Chris', 'John', 'Bob', None], ['Jacob', 'Smith', 'Lyon', 'Sm\nith'])
+        self.records = [
+            dict(id=idx + 1, first_name=first_name, last_name=last_name, age=None if idx % 5 == 0 else 20 + idx)
+            for idx, (first_name, last_name) in enumerate(names)]
+
+        self.builder = PythonPredicateBuilder()
+        self.builder.parser_backend = 'fast'
+
+    def ids(self, query_string):
+        predicate = self.builder.parse_and_build(query_string)
+        return [record['id'] for record in self.records if predicate(record)]
+
+    def test_SELECT(self):
+        self.assertEqual([2, 6, 10, 14], self.ids('select id, age from User where last_name = "Smith"'))
+        self.assertEqual('User', self.builder.model_class)
+        self.assertEqual(['id', 'age'], self.builder.fields)
+
+    def test_operators(self):
+        self.assertEqual([1, 5], self.ids('select * from User where last_name = "Jacob" and first_name != "Bob"'))
+        self.assertEqual([2, 3, 4, 5], self.ids('select * from User where id > 1 and id < 6'))
+        self.assertEqual([5, 6, 7], self.ids('select * from User where id between 5 and 7'))
+        self.assertEqual([1, 16], self.ids('select * from User where id in (1, 16, 17)'))
+        self.assertEqual([1, 6, 11, 16], self.ids('select * from User where age is null'))
+        self.assertEqual(12, len(self.ids('select * from User where first_name is not null')))
+
+    def test_LIKE(self):
+        self.assertEqual([2, 6, 10, 14], self.ids('select * from User where last_name like "Smith"'))
+        self.assertEqual([2, 4, 6, 8, 10, 12, 14, 16], self.ids('select * from User where last_name like "Sm%"'))
+        self.assertEqual([4, 8, 12, 16], self.ids('select * from User where last_name like "Sm_ith"'))
+        self.assertEqual([2, 4, 6, 8, 10, 12, 14], self.ids('select * from User where last_name like "%ith" and id < 16'))
+
+        # $ matches before a trailing newline in regexes, but LIKE doesn't
+        predicate = compile_predicate(self.builder._parse('select * from T where a like "%o_"').where[0])
+        self.assertTrue(predicate({'a': 'Bob'}))
+        self.assertTrue(predicate({'a': 'Bo\n'}))
+        self.assertFalse(predicate({'a': 'Bob\n'}))
+
+    def test_null(self):
+        # Comparisons with null are unknown, and so is their negation
+        self.assertEqual([], self.ids('select * from User where age = null or not age = null'))
+        self.assertEqual(12, len(self.ids('select * from User where age > 0 or not age > 0')))
+        self.assertEqual(12, len(self.ids('select * from User where first_name = first_name')))
+
+        predicate = self.builder.parse_and_build('select * from T where not a in (1, 2)')
+        self.assertTrue(predicate({'a': 3}))
+        self.assertFalse(predicate({'a': None}))
+        self.assertFalse(predicate({}))
+
+        # Duplicate members aren't null
+        predicate = self.builder.parse_and_build('select * from T where not a in (3, 1, 1)')
+        self.assertTrue(predicate({'a': 2}))
+        self.assertFalse(predicate({'a': 1}))
+        self.assertFalse(self.builder.parse_and_build('select * from T where not a in (1, null)')({'a': 2}))
+
+    def test_no_WHERE(self):
+        self.assertEqual(16, len(self.ids('select * from User')))
+        self.assertEqual([], self.ids('select * from User where id = 1 and id = 2'))
+
+    def test_XOR(self):
+        query_string = 'select * from T where ' + ' xor '.join('c%d = 1' % i for i in range(40))
+        predicate = self.builder.parse_and_build(query_string)
+
+        self.assertLess(len(predicate.source), 400 * 40)
+        record = dict(('c%d' % i, 0) for i in range(40))
+        self.assertFalse(predicate(record))
+        record['c0'] = 1
+        self.assertTrue(predicate(record))
+        record['c39'] = 1
+        self.assertFalse(predicate(record))
+        del record['c20']
+        self.assertFalse(predicate(record))
+        self.assertFalse(self.builder.parse_and_build(query_string.replace('where', 'where not'))(record))
+
+    def test_predicate_cache(self):
+        query_string = 'select id from User where id = 1'
+        predicate = self.builder.parse_and_build(query_string)
+        self.assertIs(predicate, self.builder.parse_and_build('select id\n  from User where id = 1'))
+        self.assertEqual(['id'], self.builder.fields)
+
+        # Columns spelled like keywords are told apart by their case
+        self.assertTrue(self.builder.parse_and_build('select * from T where xor = 1')({'xor': 1}))
+        self.assertTrue(self.builder.parse_and_build('select * from T where Xor = 1')({'Xor': 1}))
+
+        query_string = 'select * from T where not (a = 1 or b = 2)'
+        for name, value in [('optimize', False), ('parser_backend', 'pyparsing')]:
+            self.builder.parse_and_build(query_string)
+            default = getattr(self.builder, name)
+            setattr(self.builder, name, value)
+
+            fresh = PythonPredicateBuilder(predicate_cache_size=0)
+            fresh.parser_backend = self.builder.parser_backend
+            setattr(fresh, name, value)
+            predicate = self.builder.parse_and_build(query_string)
+            self.assertEqual(fresh.parse_and_build(query_string).source, predicate.source)
+            setattr(self.builder, name, default)
+
+    def test_unsupported_operator(self):
+        plus = nodes.BinaryOperator([[nodes.Identifier([['id']]), '+', nodes.IntegerValue(['1'])]])
+        self.assertRaises(ValueError, compile_predicate, nodes.BinaryOperator([[plus, '=', nodes.IntegerValue(['2'])]]))
+        self.assertRaises(ValueError, compile_predicate, nodes.UnaryOperator([['-', nodes.Identifier([['id']])]]))
+        self.assertRaises(ValueError, compile_predicate, nodes.BinaryOperator([[
+            nodes.Identifier([['id']]), 'like', nodes.IntegerValue(['1'])]]))
+
+    def test_same_rows_as_sqlite(self):
+        engine = sqlalchemy.create_engine('sqlite://', echo=False)
+        metadata = sqlalchemy.MetaData()
+        users = sqlalchemy.Table(
+            'users', metadata,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column('first_name', sqlalchemy.String),
+            sqlalchemy.Column('last_name', sqlalchemy.String),
+            sqlalchemy.Column('age', sqlalchemy.Integer))
+        metadata.create_all(engine)
+        engine.execute(users.insert(), self.records)
+
+        core_builder = SqlAlchemyCoreQueryBuilder({'User': users})
+        for where in [
+                'not (age > 25 and first_name = "Bob")',
+                'not (age < 30 or last_name like "%b")',
+                'age > 25 xor first_name in ("Chris", "John")',
+                'not (age between 22 and 30 xor not last_name = "Lyon")',
+                'not first_name in ("Chris", last_name)',
+                'not (id in (3, 1, 1))',
+                'first_name is null or not age is not null']:
+            query_string = 'select id from User where ' + where
+            expected = [row[0] for row in engine.execute(core_builder.parse_and_build(query_string).order_by('id'))]
+            self.assertEqual(expected, self.ids(query_string), where)
@@ -0,0 +1,115 @@
+import pickle
+from decimal import Decimal
+
+import sqlparse
+from sqlparse import nodes, serialize
+from sqlparse.builders import MongoQueryBuilder
+from sqlparse.prepared import PreparedQuery
+from .base import unittest
+
+
+def slots(node):
+    names = []
+    for cls in type(node).__mro__:
+        names.extend(cls.__dict__.get('__slots__', ()))
+    return names
+
+
+class SerializeTest(unittest.TestCase):
+    QUERIES = [
+        'select * from User',
+        'select distinct a, b from c, d where d = -1 and (e like "f%" or g in (2, 3.5, null)) order by a desc, b limit 1 offset 2',
+        'select a from b where not c is not null xor d between 1.5e3 and "z" or e not like "x\\_%"',
+        'select a from b where c = true and d <=> false and e != 123456789012345678901234567890',
+        'select a from b where c = ? and d in (:names) and e like :pattern',
+        'select a from b where name = "été \U0001F600" and x = ""',
+    ]
+
+    def assertSameTree(self, expected, actual, path='ast'):
+        self.assertIs(type(expected), type(actual), path)
+
+        if isinstance(expected, (list, tuple)):
+            self.assertEqual(len(expected), len(actual), path)
+            for i, (e, a) in enumerate(zip(expected, actual)):
+                self.assertSameTree(e, a, '%s[%d]' % (path, i))
+        elif isinstance(expected, nodes.Statement):
+            self.assertEqual(sorted(vars(expected)), sorted(vars(actual)), path)
+            for name, value in vars(expected).items():
+                self.assertSameTree(value, getattr(actual, name), '%s.%s' % (path, name))
+        elif isinstance(expected, nodes.ASTNode):
+            for name in slots(expected):
+                self.assertSameTree(getattr(expected, name), getattr(actual, name), '%s.%s' % (path, name))
+        else:
+            self.assertEqual(expected, actual, path)
+
+    def test_round_trip(self):
+        for query_string in self.QUERIES:
+            for backend in ['pyparsing', 'fast']:
+                ast = sqlparse.parse_string(query_string, backend=backend, detach=True)
+                self.assertSameTree(ast, serialize.loads(serialize.dumps(ast)))
+
+    def test_pyparsing_results(self):
+        query_string = self.QUERIES[1]
+        ast = serialize.loads(serialize.dumps(sqlparse.parse_string(query_string)))
+
+        self.assertIsInstance(ast, nodes.Statement)
+        self.assertSameTree(sqlparse.parse_string(query_string, detach=True), ast)
+
+    def test_values(self):
+        ast = serialize.loads(serialize.dumps(sqlparse.parse_string(self.QUERIES[2], backend='fast')))
+        begin = ast.where[0].rhs.lhs.rhs.begin
+        self.assertEqual(Decimal('1.5e3'), begin.value)
+        self.assertEqual('1.5E+3', str(begin.value))
+
+        ast = serialize.loads(serialize.dumps(sqlparse.parse_string(self.QUERIES[3], backend='fast')))
+        self.assertEqual(
+            '(and (= c true) (and (<=> d false) (!= e 123456789012345678901234567890)))', repr(ast.where[0]))
+
+    def test_nodes(self):
+        operator = nodes.BooleanOperator([['and', [
+            nodes.UnaryOperator([['not', nodes.Identifier([['a']])]]),
+            nodes.BinaryOperator([[nodes.ModelIdentifier([['b']]), '=', nodes.NullValue()]])]]])
+        values = nodes.ListValue([[nodes.IntegerValue(['-70000']), nodes.StringValue(['"x"'])]])
+        values.frozen = True
+
+        for node in [operator, values, [operator, None, 'abc', values]]:
+            self.assertSameTree(node, serialize.loads(serialize.dumps(node)))
+
+    def test_placeholder_indexes(self):
+        query = PreparedQuery('select a from b where c = ? and d = ? and e = :e')
+        where = serialize.loads(serialize.dumps(query.parse_tree)).where[0]
+        self.assertEqual([0, 1, None], [where.lhs.rhs.index, where.rhs.lhs.rhs.index, where.rhs.rhs.rhs.index])
+        self.assertEqual([None, None, 'e'], [where.lhs.rhs.name, where.rhs.lhs.rhs.name, where.rhs.rhs.rhs.name])
+
+    def test_builds_same_query(self):
+        builder = MongoQueryBuilder()
+        for query_string in [
+                'select * from User',
+                'select a, b from c where d = 1 and (e like "f%" or g in (2, 3.5)) order by a desc limit 1',
+                'select a from b where c = true and d != false and e is not null']:
+            ast = serialize.loads(serialize.dumps(sqlparse.parse_string(query_string)))
+            self.assertEqual(builder.parse_and_build(query_string), builder.build(ast))
+
+    def test_compact(self):
+        ast = sqlparse.parse_string(self.QUERIES[1], detach=True)
+        data = serialize.dumps(ast)
+        self.assertLess(len(data) * 4, len(pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)))
+
+    def test_invalid_data(self):
+        data = serialize.dumps(sqlparse.parse_string(self.QUERIES[1], backend='fast'))
+
+        for invalid in [b'', b'{"a": 1}', serialize.HEADER, data[:-1], data[:len(data) // 2], data + b'\x00']:
+            self.assertRaises(ValueError, serialize.loads, invalid)
+
+        newer = serialize.MAGIC + bytes([serialize.VERSION + 1]) + data[len(serialize.HEADER):]
+        self.assertRaisesRegex(ValueError, 'version', serialize.loads, newer)
+
+        self.assertSameTree(serialize.loads(data), serialize.loads(memoryview(data)))
+
+    def test_unknown_type(self):
+        self.assertRaisesRegex(TypeError, 'dict', serialize.dumps, {'a': 1})
+        self.assertRaises(TypeError, serialize.dumps, [nodes.Identifier([['a']]), object()])
+
+
+if __name__ == '__main__':
+    unittest.main()
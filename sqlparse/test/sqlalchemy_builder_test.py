@@ -5,7 +5,9 @@ import sqlalchemy.orm
 import sqlalchemy.ext.declarative
 
 from .base import BuilderTestCase
+from sqlparse import PreparedQuery
 from sqlparse.builders import SqlAlchemyQueryBuilder
+from sqlparse.builders.sqlalchemy_builder import ModelRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -66,16 +68,128 @@ class SqlAlchemyQueryBuilderTest(BuilderTestCase):
     def test_SELECT(self):
         builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
         query = builder.parse_and_build("""
-            select a, b from User where
+            select first_name, last_name from User where
                 not (last_name = 'Jacob' or
                     (first_name != 'Chris' and last_name != 'Lyon')) and
                 not is_active = 1
             """)
 
-        self.assertEqual(['a', 'b'], builder.fields)
+        self.assertEqual(['first_name', 'last_name'], builder.fields)
 
         results = query.all()
         # for user in results:
         #     print(user.__dict__)
 
         self.assertEquals(2, len(results))
+
+    def test_SELECT_fast_backend(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        builder.parser_backend = 'fast'
+        query = builder.parse_and_build("""
+            select first_name, last_name from User where
+                not (last_name = 'Jacob' or
+                    (first_name != 'Chris' and last_name != 'Lyon')) and
+                not is_active = 1
+            """)
+
+        self.assertEqual(['first_name', 'last_name'], builder.fields)
+        self.assertEqual(2, len(query.all()))
+
+    def test_projection(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        query = builder.parse_and_build('select first_name from User where id < 3')
+        self.assertEqual(['id', 'first_name'], [column.name for column in query.statement.columns])
+        self.assertEqual(['Chris', 'Chris'], [user.first_name for user in query.all()])
+
+        builder.projection = 'with_entities'
+        query = builder.parse_and_build('select last_name, id from User where id < 3')
+        self.assertEqual([('Jacob', 1), ('Smith', 2)], [tuple(row) for row in query.all()])
+
+        builder.projection = None
+        query = builder.parse_and_build('select first_name from User')
+        self.assertEqual(4, len(query.statement.columns))
+
+    def test_star(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        query = builder.parse_and_build('select * from User where id = 1')
+        self.assertEqual(['id', 'first_name', 'last_name', 'is_active'], builder.fields)
+        self.assertEqual('Chris Jacob', str(query.one()))
+
+    def test_unmapped_column(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        self.assertRaises(ValueError, builder.parse_and_build, 'select a from User')
+
+    def test_between(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        query = builder.parse_and_build('select id from User where id between 2 and 4')
+        self.assertEqual([2, 3, 4], sorted(user.id for user in query.all()))
+
+    def test_NOT_LIKE(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        query = builder.parse_and_build('select id from User where last_name not like "%o%" or id not between 2 and 8')
+        self.assertEqual([1, 2, 5, 8, 9], sorted(user.id for user in query.all()))
+
+        # Backslash escapes wildcards, as in MySQL
+        query = builder.parse_and_build('select id from User where last_name like "S\\m\\%%"')
+        self.assertEqual([], query.all())
+        query = builder.parse_and_build('select id from User where last_name like "S\\mit\\h"')
+        self.assertEqual(3, query.count())
+
+    def test_IS(self):
+        self.session.query(self.User).filter(self.User.id > 6).update({'is_active': None})
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+
+        query = builder.parse_and_build('select id from User where is_active is null')
+        self.assertEqual([7, 8, 9], sorted(user.id for user in query.all()))
+        query = builder.parse_and_build('select id from User where is_active is not true')
+        self.assertEqual([4, 5, 6, 7, 8, 9], sorted(user.id for user in query.all()))
+
+    def test_ORDER_BY_LIMIT(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        query = builder.parse_and_build('select id from User where id > 2 order by last_name desc, id limit 3 offset 1')
+        self.assertEqual([8, 3, 6], [user.id for user in query.all()])
+
+    def test_flat_AND(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        builder.parser_backend = 'fast'  # pyparsing recurses too deeply
+        query = builder.parse_and_build(
+            'select id from User where ' + ' and '.join('id != %d' % i for i in range(100, 600)))
+
+        self.assertEqual(500, len(query.whereclause.clauses))
+        self.assertEqual(9, query.count())
+
+    def test_no_WHERE(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        self.assertEqual(9, builder.parse_and_build('select id from User').count())
+
+    def test_prepared_query(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        prepared = PreparedQuery('select first_name, last_name from User where first_name = ? and last_name in (:last_names)')
+
+        query = prepared.build(builder, 'Chris', last_names=['Jacob', 'Lyon'])
+        self.assertEqual(2, len(query.all()))
+
+        query = prepared.build(builder, 'Bob', last_names=['Smith'])
+        self.assertEqual(['Bob Smith'], [str(user) for user in query.all()])
+
+    def test_model_registry(self):
+        registry = ModelRegistry()
+        metadata = registry.get(self.User)
+
+        self.assertIs(metadata, registry.get(self.User))
+        self.assertEqual(frozenset(['id', 'first_name', 'last_name', 'is_active']), metadata.property_names)
+        self.assertIs(self.User.__table__.c.first_name, metadata.columns['first_name'])
+        self.assertEqual({}, metadata.relationships)
+
+        registry.invalidate(self.User)
+        self.assertIsNot(metadata, registry.get(self.User))
+
+        self.assertRaises(ValueError, registry.get, object)
+
+    def test_unmapped_property(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=self.model_scope)
+        self.assertRaises(ValueError, builder.parse_and_build, 'select id from User where metadata = 1')
+
+    def test_unmapped_model(self):
+        builder = SqlAlchemyQueryBuilder(self.session, model_scope=dict(User=object))
+        self.assertRaises(ValueError, builder.parse_and_build, 'select id from User where id = 1')
@@ -0,0 +1,96 @@
+import itertools
+
+import sqlalchemy
+import sqlalchemy.ext.declarative
+
+from .base import BuilderTestCase
+from sqlparse import PreparedQuery
+from sqlparse.builders import SqlAlchemyCoreQueryBuilder
+
+
+class SqlAlchemyCoreQueryBuilderTest(BuilderTestCase):
+    def setUp(self):
+        self.engine = sqlalchemy.create_engine('sqlite://', echo=False)
+        metadata = sqlalchemy.MetaData()
+
+        self.users = sqlalchemy.Table(
+            'users', metadata,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column('first_name', sqlalchemy.String),
+            sqlalchemy.Column('last_name', sqlalchemy.String))
+        metadata.create_all(self.engine)
+
+        names = itertools.product(['Chris', 'John', 'Bob'], ['Jacob', 'Smith', 'Lyon'])
+        self.engine.execute(self.users.insert(), [
+            dict(first_name=first_name, last_name=last_name) for first_name, last_name in names])
+
+        self.builder = SqlAlchemyCoreQueryBuilder({'User': self.users})
+
+    def execute(self, statement, **params):
+        return [tuple(row) for row in self.engine.execute(statement, **params)]
+
+    def test_SELECT(self):
+        statement = self.builder.parse_and_build(
+            'select id, last_name from User where first_name = "John" or id < 2 order by id desc limit 3')
+
+        self.assertEqual(['id', 'last_name'], self.builder.fields)
+        self.assertEqual(['id', 'last_name'], list(statement.columns.keys()))
+        self.assertEqual([(6, 'Lyon'), (5, 'Smith'), (4, 'Jacob')], self.execute(statement))
+
+    def test_star(self):
+        statement = self.builder.parse_and_build('select * from User where id = 1')
+        self.assertEqual(['id', 'first_name', 'last_name'], self.builder.fields)
+        self.assertEqual([(1, 'Chris', 'Jacob')], self.execute(statement))
+
+    def test_mapped_class(self):
+        Base = sqlalchemy.ext.declarative.declarative_base()
+
+        class User(Base):
+            __table__ = self.users
+            surname = self.users.c.last_name
+
+        builder = SqlAlchemyCoreQueryBuilder({'User': User})
+        statement = builder.parse_and_build('select surname from User where id between 2 and 3')
+        self.assertEqual([('Smith',), ('Lyon',)], self.execute(statement))
+
+    def test_statement_cache(self):
+        first = self.builder.parse_and_build('select id from User where last_name = :name and id > ?')
+        second = self.builder.parse_and_build('select id from User\n  where last_name = :name and id > ?  -- comment')
+
+        self.assertIs(first, second)
+        self.assertEqual(['id'], self.builder.fields)
+        self.assertEqual([(5,), (8,)], self.execute(first, name='Smith', p0=2))
+
+        self.assertIsNone(SqlAlchemyCoreQueryBuilder({}, statement_cache_size=0).statement_cache)
+
+    def test_statement_cache_settings(self):
+        query_string = 'select id from User where not (first_name = "Bob" or id > 2)'
+        for name, value in [('optimize', False), ('parser_backend', 'fast')]:
+            self.builder.parse_and_build(query_string)
+            setattr(self.builder, name, value)
+
+            fresh = SqlAlchemyCoreQueryBuilder({'User': self.users}, statement_cache_size=0)
+            setattr(fresh, name, value)
+            self.assertEqual(str(fresh.parse_and_build(query_string)), str(self.builder.parse_and_build(query_string)))
+            setattr(self.builder, name, getattr(SqlAlchemyCoreQueryBuilder, name))
+
+    def test_IN_placeholder(self):
+        statement = self.builder.parse_and_build('select id from User where last_name in (:names) and not id in (?)')
+        self.assertEqual([(2,), (3,), (8,), (9,)], self.execute(statement, names=['Smith', 'Lyon'], p0=[5, 6]))
+        self.assertEqual([(1,)], self.execute(statement, names=['Jacob'], p0=[4, 7]))
+
+    def test_placeholder_names(self):
+        self.assertRaises(ValueError, self.builder.parse_and_build, 'select id from User where id > ? and id < :p0')
+
+        statement = self.builder.parse_and_build('select id from User where id > ? and id < :p1')
+        self.assertEqual([(3,)], self.execute(statement, p0=2, p1=4))
+
+    def test_prepared_query(self):
+        query = PreparedQuery('select first_name from User where last_name in (:names) and id > ?')
+        statement = query.build(self.builder, 3, names=['Jacob', 'Lyon'])
+        self.assertEqual([('John',), ('John',), ('Bob',), ('Bob',)], self.execute(statement))
+
+    def test_unknown_column(self):
+        self.assertRaises(ValueError, self.builder.parse_and_build, 'select nope from User')
+        self.assertRaises(ValueError, self.builder.parse_and_build, 'select id from User where nope = 1')
+        self.assertRaises(ValueError, self.builder.parse_and_build, 'select id from Nope')
@@ -1,3 +1,9 @@
+import pickle
+
+from pyparsing import ParseException, ParseResults
+
+import sqlparse
+from sqlparse import grammar, nodes
 from .base import ParserTestCase, unittest
 
 
@@ -116,17 +122,48 @@ class TestSqlQueryGrammar(ParserTestCase):
     def test_GROUP_BY(self):
         pass
 
-    @unittest.skip('unimplemented')
     def test_ORDER_BY(self):
-        pass
+        results = list(self.assertParses([
+
+            'select a from b order by a',
+
+            'select a from b where c = 1 ORDER BY a desc, b ASC, c',
+
+            ]))
+        self.assertEqual("'(a asc)", repr(results[0].order))
+        self.assertEqual("'(a desc b asc c asc)", repr(results[1].order))
+        self.assertEqual('(= c 1)', repr(results[1].where[0]))
+
+        list(self.assertParses([
+
+            'select a from b order a',
+
+            'select a from b order by',
+
+            ], expect_error=True))
 
     @unittest.skip('unimplemented')
     def test_HAVING(self):
         pass
 
-    @unittest.skip('unimplemented')
     def test_LIMIT(self):
-        pass
+        results = list(self.assertParses([
+
+            'select a from b limit 10',
+
+            'select a from b where c = 1 order by a limit 10 offset 20',
+
+            ]))
+        self.assertEqual((10, ''), (results[0].limit.value, results[0].offset))
+        self.assertEqual((10, 20), (results[1].limit.value, results[1].offset.value))
+
+        list(self.assertParses([
+
+            'select a from b limit a',
+
+            'select a from b offset 1',
+
+            ], expect_error=True))
 
     @unittest.skip('unimplemented')
     def test_UNION_and_UNION_ALL(self):
@@ -165,6 +202,101 @@ class TestSqlQueryGrammar(ParserTestCase):
 
             ])
 
+
+class TestSqlQueryGrammarFastBackend(TestSqlQueryGrammar):
+    """
+    Runs the grammar test cases against the hand-written parser
+    """
+    BACKEND = 'fast'
+
+
+class TestPackratParsing(ParserTestCase):
+    """
+    Test cases for memoized (packrat) parsing
+    """
+    def tearDown(self):
+        sqlparse.disable_packrat()
+
+    def test_same_tree_as_plain_parsing(self):
+        query_string = 'select a from b where c = 1 and (d = 2 or e in (1, 2)) xor not f between 1 and 2'
+
+        plain = sqlparse.parse_string(query_string)
+        self.assertFalse(grammar.packrat_enabled())
+
+        packrat = sqlparse.parse_string(query_string, packrat=True)
+        self.assertEqual(repr(plain.where[0]), repr(packrat.where[0]))
+
+    def test_per_call_packrat_is_restored(self):
+        query_string = 'select a from b where c = 1 and (d = 2 or e = 3)'
+
+        sqlparse.parse_string(query_string, packrat=True)
+        self.assertFalse(grammar.packrat_enabled())
+
+        self.assertRaises(ParseException, sqlparse.parse_string, 'select a from b where', packrat=True)
+        self.assertFalse(grammar.packrat_enabled())
+
+        sqlparse.enable_packrat()
+        sqlparse.parse_string(query_string, packrat=True)
+        sqlparse.parse_string(query_string, packrat=False)
+        self.assertTrue(grammar.packrat_enabled())
+
+    def test_nested_AND_OR(self):
+        sqlparse.enable_packrat(cache_size=None)
+        depth = 12
+        query_string = 'select a from b where ' + ' and '.join(
+            '(c{0} = {0} or d{0} > {0})'.format(i) for i in range(depth))
+
+        result = self.assertParses(query_string)
+        self.assertEqual('and', result.where[0].name)
+
+    def test_disable(self):
+        sqlparse.enable_packrat()
+        sqlparse.disable_packrat()
+        self.assertFalse(grammar.packrat_enabled())
+        self.assertParses('select a from b where c = 1 or d = 2')
+
+
+class TestDetach(ParserTestCase):
+    """
+    Test cases for detaching parse trees from pyparsing
+    """
+    QUERY = 'select distinct a, * from b where not c is null and d in (1, 2) or e between 1 and "z"'
+
+    def test_detach(self):
+        ast = sqlparse.parse_string(self.QUERY, detach=True)
+
+        self.assertIsInstance(ast, nodes.Statement)
+        self.assertEqual('distinct', ast.options)
+        self.assertEqual("'(a *)", repr(ast.columns))
+        self.assertEqual(['b'], [t.name for t in ast.tables.values])
+        self.assertEqual(list, type(ast.where))
+
+        is_null = ast.where[0].lhs.rhs
+        self.assertEqual('(is c null)', repr(is_null))
+        self.assertIsInstance(is_null.rhs, nodes.NullValue)
+        self.assertEqual('(or (in d \'(1 2)) (between e 1..."z"))', repr(ast.where[0].rhs))
+
+    def test_missing_clauses(self):
+        ast = sqlparse.parse_string('select a', detach=True)
+        self.assertEqual('', ast.options)
+        self.assertEqual('', ast.tables)
+        self.assertEqual('', ast.where)
+
+    def test_no_pyparsing_left(self):
+        ast = sqlparse.parse_string(self.QUERY, detach=True)
+        self.assertNotIn(b'pyparsing', pickle.dumps(ast))
+
+    def test_fast_backend_unchanged(self):
+        ast = sqlparse.parse_string(self.QUERY, backend='fast')
+        self.assertIs(ast, sqlparse.detach(ast))
+
+    def test_compact_nodes(self):
+        ast = sqlparse.parse_string(self.QUERY)
+        self.assertIsInstance(ast, ParseResults)
+        self.assertFalse(hasattr(ast.where[0], '__dict__'))
+        self.assertFalse(hasattr(ast.columns.values[0], '__dict__'))
+
+
 if __name__ == '__main__':
     # import operator
     # import sqlalchemy
@@ -0,0 +1,78 @@
+import io
+import mmap
+import tempfile
+import unittest
+
+import sqlparse
+from sqlparse.stream import split_statements
+
+SCRIPT = '''
+-- leading comment; with a semicolon
+select a from b where c = 'x;y' and d = "it\\"s; here";
+# another comment with a 'quote
+select e from f where g = 'don''t;' ;;
+
+select h from i -- trailing; comment
+   where j like '%;%' ; -- comment-only statement
+;
+select k from l where m = -1'''
+
+STATEMENTS = [
+    '''-- leading comment; with a semicolon
+select a from b where c = 'x;y' and d = "it\\"s; here"''',
+    '''# another comment with a 'quote
+select e from f where g = 'don''t;\'''',
+    '''select h from i -- trailing; comment
+   where j like '%;%\'''',
+    '''select k from l where m = -1''',
+]
+
+
+class SplitStatementsTest(unittest.TestCase):
+    def test_string(self):
+        self.assertEqual(STATEMENTS, list(split_statements(SCRIPT)))
+
+    def test_chunk_boundaries(self):
+        # Every split point, including inside '--', quotes and escapes
+        for chunk_size in range(1, 12):
+            self.assertEqual(STATEMENTS, list(split_statements(SCRIPT, chunk_size=chunk_size)), chunk_size)
+
+    def test_text_file(self):
+        self.assertEqual(STATEMENTS, list(split_statements(io.StringIO(SCRIPT), chunk_size=5)))
+
+    def test_binary_file(self):
+        script = "select a from b where c = 'héllo; wörld';select d from e"
+        source = io.BytesIO(script.encode('utf-8'))
+
+        self.assertEqual([
+            "select a from b where c = 'héllo; wörld'",
+            'select d from e'
+        ], list(split_statements(source, chunk_size=1)))
+
+    def test_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(SCRIPT.encode('utf-8'))
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                self.assertEqual(STATEMENTS, list(split_statements(buf, chunk_size=7)))
+
+    def test_empty(self):
+        self.assertEqual([], list(split_statements('')))
+        self.assertEqual([], list(split_statements(' ; -- nothing\n;# here')))
+
+
+class IterStatementsTest(unittest.TestCase):
+    def test_iter_statements(self):
+        asts = list(sqlparse.iter_statements(io.StringIO(SCRIPT), chunk_size=16, backend='fast'))
+
+        self.assertEqual([
+            '(and (= c "x;y") (= d "it\\"s; here"))',
+            '(= g "don\'\'t;")',
+            '(like j "%;%")',
+            '(= m -1)',
+        ], [repr(ast.where[0]) for ast in asts])
+
+    def test_parse_error(self):
+        statements = sqlparse.iter_statements('select a from b; select')
+        self.assertEqual(['b'], [t.name for t in next(statements).tables.values])
+        self.assertRaises(sqlparse.grammar.ParseException, next, statements)
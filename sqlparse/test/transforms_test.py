@@ -0,0 +1,57 @@
+import unittest
+
+import sqlparse
+from sqlparse import nodes
+from sqlparse.transforms import flatten_boolean_operators
+
+
+def where(query_string):
+    return sqlparse.parse_string('select * from User where ' + query_string, backend='fast').where[0]
+
+
+class FlattenBooleanOperatorsTest(unittest.TestCase):
+    def test_chains(self):
+        self.assertEqual(
+            '(and (= a 1) (= b 2) (= c 3))',
+            repr(flatten_boolean_operators(where('a = 1 and b = 2 and c = 3'))))
+        self.assertEqual(
+            '(or (= a 1) (= b 2) (= c 3))',
+            repr(flatten_boolean_operators(where('a = 1 || b = 2 or c = 3'))))
+
+    def test_parentheses(self):
+        self.assertEqual(
+            '(and (= a 1) (= b 2) (= c 3) (= d 4))',
+            repr(flatten_boolean_operators(where('(a = 1 and b = 2) and (c = 3 && d = 4)'))))
+
+    def test_mixed_operators(self):
+        # AND and OR have equal precedence in the grammar, and are right-nested
+        self.assertEqual(
+            '(and (= a 1) (or (= b 2) (= c 3) (= d 4)))',
+            repr(flatten_boolean_operators(where('a = 1 and b = 2 or c = 3 or d = 4'))))
+
+    def test_nested_chains(self):
+        self.assertEqual(
+            '(xor (not (and (= a 1) (= b 2) (= c 3))) (= d 4))',
+            repr(flatten_boolean_operators(where('not (a = 1 and b = 2 and c = 3) xor d = 4'))))
+
+    def test_original_unchanged(self):
+        tree = where('a = 1 and b = 2 and c = 3')
+        flattened = flatten_boolean_operators(tree)
+
+        self.assertEqual('(and (= a 1) (and (= b 2) (= c 3)))', repr(tree))
+        self.assertIs(tree.lhs, flattened.operands[0])
+
+    def test_flattened_input(self):
+        tree = flatten_boolean_operators(where('a = 1 and b = 2'))
+        tree = nodes.BinaryOperator([[tree, 'and', flatten_boolean_operators(where('c = 3 and d = 4'))]])
+
+        flattened = flatten_boolean_operators(tree)
+        self.assertEqual('(and (= a 1) (= b 2) (= c 3) (= d 4))', repr(flattened))
+        self.assertEqual('(and (= a 1) (= b 2))', repr(tree.lhs))
+
+    def test_long_chain(self):
+        tree = where(' and '.join('c%d = %d' % (i, i) for i in range(5000)))
+        flattened = flatten_boolean_operators(tree)
+
+        self.assertIsInstance(flattened, nodes.BooleanOperator)
+        self.assertEqual(['(= c%d %d)' % (i, i) for i in range(5000)], [repr(o) for o in flattened.operands])
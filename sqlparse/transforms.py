@@ -0,0 +1,75 @@
+"""
+Rewrites parse trees into equivalent forms that are easier to build queries from
+"""
+from . import nodes
+from .nodevisitor import NodeTransformer
+
+# Chainable boolean operators, and the name of the BooleanOperator they become
+BOOLEAN_OPERATORS = {
+    'and': 'and',
+    '&&': 'and',
+    'or': 'or',
+    '||': 'or',
+}
+
+
+class BooleanOperatorFlattener(NodeTransformer):
+    """
+    Replaces chains of the same AND or OR operator, such as the right-nested
+    (and a (and b (and c d))) built by the grammar, with a single
+    BooleanOperator (and a b c d).
+
+    Chains are flattened in linear time: the operand lists of BooleanOperators
+    created here are built in reverse, so that absorbing a right-nested chain
+    only appends to its list, and are put in order at the end.
+    """
+    def visit(self, node):
+        # BooleanOperators created here (with reversed operands) that haven't
+        # been absorbed into a parent chain, by id
+        self._created = {}
+        try:
+            result = super(BooleanOperatorFlattener, self).visit(node)
+            for operator in self._created.values():
+                operator.operands.reverse()
+        finally:
+            self._created = None
+
+        return result
+
+    def visit_BinaryOperator(self, node):
+        name = BOOLEAN_OPERATORS.get(node.name)
+        if name is None:
+            return node
+
+        operands = None  # reversed
+        for operand in (node.rhs, node.lhs):
+            if not isinstance(operand, nodes.BooleanOperator) or operand.name != name:
+                if operands is None:
+                    operands = []
+                operands.append(operand)
+
+            elif id(operand) in self._created:
+                # Created here, so its list can be taken over
+                del self._created[id(operand)]
+                if operands is None:
+                    operands = operand.operands
+                else:
+                    operands.extend(operand.operands)
+
+            else:
+                # Shared with the original tree
+                if operands is None:
+                    operands = []
+                operands.extend(reversed(operand.operands))
+
+        operator = nodes.BooleanOperator([[name, operands]])
+        self._created[id(operator)] = operator
+        return operator
+
+
+def flatten_boolean_operators(node):
+    """
+    Returns :node: with AND and OR chains flattened into BooleanOperators.
+    :node: is left unchanged.
+    """
+    return BooleanOperatorFlattener().visit(node)
@@ -1,3 +1,4 @@
+from . import nodes
 from .nodevisitor import ASTVisitor
 
 
@@ -17,11 +18,21 @@ class ValueVisitor(ASTVisitor):
     def visit_RealValue(self, node):
         return str(node.value)  # str = no precision loss
 
+    def visit_BooleanValue(self, node):
+        return node.value
+
+    def visit_NullValue(self, node):
+        return None
+
     def visit_ListValue(self, node):
         return list(node.values)
 
     def visit_RangeValue(self, node):
-        raise NotImplementedError()
+        # Builders read the visited bounds from .begin and .end
+        return nodes.RangeValue([[self.visit(node.begin), self.visit(node.end)]])
+
+    def visit_Placeholder(self, node):
+        raise ValueError('Placeholder %r has no value bound to it (see PreparedQuery.bind)' % node)
 
 
 class IdentifierAndValueVisitor(IdentifierVisitor, ValueVisitor):